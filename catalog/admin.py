@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import Author, Genre, Book, BookInstance
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+from .models import Author, Genre, Book, BookInstance, Job
+from .pagination import EstimatedCountPaginator
 
 # admin.site.register(Book)
 # admin.site.register(Author)
@@ -7,9 +13,22 @@ admin.site.register(Genre)
 # admin.site.register(BookInstance)
 
 
-class AuthorAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelists that stay fast on tables with millions of rows.
+
+    The paginator takes the table statistics' row count instead of an exact
+    COUNT(*) for big unfiltered tables, and the second COUNT(*) behind the
+    "N total" link is not run at all.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class AuthorAdmin(LargeTableAdmin):
     list_display = ("last_name", "first_name", "date_of_birth", "date_of_death")
     fields = ["first_name", "last_name", ("date_of_birth", "date_of_death")]
+    search_fields = ("last_name", "first_name")
 
 
 admin.site.register(Author, AuthorAdmin)
@@ -17,24 +36,124 @@ admin.site.register(Author, AuthorAdmin)
 # Register the Admin classes for Book using the decorator
 
 
-class BooksInstanceInline(admin.TabularInline):
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Inline formset showing one page of the related objects at a time.
+
+    The page comes from the ``<prefix>-page`` query parameter. A save covers
+    the objects whose ids were posted, since renewals or new copies since
+    the form was shown may have moved them to another page.
+    """
+
+    per_page = 20
+    request = None
+
+    def get_queryset(self):
+        if not hasattr(self, "page"):
+            queryset = super().get_queryset()
+            self.paginator = Paginator(queryset, self.per_page)
+            self.page = self.paginator.get_page(
+                self.request.GET.get(self.page_param) if self.request else None
+            )
+            if self.is_bound:
+                self._queryset = queryset.filter(pk__in=self.posted_pks())
+            else:
+                self._queryset = self.page.object_list
+        return self._queryset
+
+    def posted_pks(self):
+        pk = self.model._meta.pk
+        pks = []
+        for i in range(self.initial_form_count()):
+            value = self.data.get(self.add_prefix(f"{i}-{pk.name}"))
+            try:
+                value = pk.to_python(value)
+            except ValidationError:
+                # Tampered with; the form reports it
+                continue
+            if value is not None:
+                pks.append(value)
+        return pks
+
+    @property
+    def page_param(self):
+        return f"{self.prefix}-page"
+
+    def page_query(self, number):
+        query = self.request.GET.copy()
+        query[self.page_param] = number
+        return query.urlencode()
+
+    def previous_page_query(self):
+        return self.page_query(self.page.previous_page_number())
+
+    def next_page_query(self):
+        return self.page_query(self.page.next_page_number())
+
+
+class PaginatedTabularInline(admin.TabularInline):
+    formset = PaginatedInlineFormSet
+    template = "admin/edit_inline/paginated_tabular.html"
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        # A new class on every call, so the request does not leak between them
+        formset.request = request
+        return formset
+
+
+class BooksInstanceInline(PaginatedTabularInline):
     model = BookInstance
+    autocomplete_fields = ("borrower",)
+    ordering = ("due_back", "id")
+
+
+class BookChangeList(ChangeList):
+    def get_queryset(self, request):
+        # One query for the genres of the whole page, see Book.display_genre
+        return super().get_queryset(request).prefetch_related("genre")
 
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LargeTableAdmin):
     list_display = ("title", "author", "display_genre")
+    list_select_related = ("author",)
+    search_fields = ("title", "=isbn")
+    # The changelist's own order, which also pages the autocomplete results
+    ordering = ("-id",)
+    autocomplete_fields = ("author",)
     inlines = [BooksInstanceInline]
 
+    def get_changelist(self, request, **kwargs):
+        return BookChangeList
+
 
 # Register the Admin classes for BookInstance using the decorator
 
 
 @admin.register(BookInstance)
-class BookInstanceAdmin(admin.ModelAdmin):
+class BookInstanceAdmin(LargeTableAdmin):
     list_display = ("book", "status", "borrower", "due_back", "id")
     list_filter = ("status", "due_back")
+    list_select_related = ("book", "borrower")
+    # With the primary key the order is total, so the admin does not add "-pk",
+    # which would stop the due_back index from serving it
+    ordering = ("due_back", "id")
+    autocomplete_fields = ("book", "borrower")
     fieldsets = (
         (None, {"fields": ("book", "imprint", "id")}),
         ("Availability", {"fields": ("status", "due_back", "borrower")}),
     )
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ("name", "queue", "status", "attempts", "run_at", "locked_by")
+    list_filter = ("status", "queue")
+    readonly_fields = ("created_at", "locked_at", "locked_by", "last_error")
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now()
+        )
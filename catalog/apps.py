@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.contrib.admin.apps import AdminConfig
 
 
 class CatalogConfig(AppConfig):
     name = 'catalog'
+
+    def ready(self):
+        from catalog import signals  # noqa: F401
+
+
+class CatalogAdminConfig(AdminConfig):
+    default_site = "catalog.sites.CatalogAdminSite"
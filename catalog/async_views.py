@@ -0,0 +1,170 @@
+"""Async versions of the read-heavy catalog views, for ASGI servers.
+
+With ``CATALOG_ASYNC_VIEWS`` on (the default when ``DJANGO_ASGI=1``)
+``catalog.urls`` routes the home page, the book and author lists and details
+and "my borrowed" here instead of to ``catalog.views``. They reuse the sync
+views' querysets, validators, templates and query budgets; only the I/O
+changes. Queries go through the async ORM. Template rendering stays on the
+request's sync thread, since the user and perms context can still query the
+database. While a request waits on the database or a slow client, the
+worker's event loop serves the others.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.utils.translation import gettext
+
+from catalog import views
+from catalog.models import CatalogCounter
+from catalog.pagination import CursorPaginator, InvalidCursor
+from catalog.query_budget import query_budget
+
+arender = sync_to_async(render)
+
+
+async def load_user(request):
+    """Resolve the lazy ``request.user`` where its queries may run.
+
+    Returns whether the user is authenticated.
+    """
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def setup_view(view_class, request, **kwargs):
+    """An instance of a sync view, for its querysets and settings."""
+    view = view_class()
+    view.setup(request, **kwargs)
+    return view
+
+
+async def conditional(view, respond):
+    """A 304 when the client's copy is current, else ``await respond()``."""
+    response, headers = view.check_validators(await view.aget_validators())
+    if response is None:
+        response = await respond()
+    return view.add_validator_headers(response, headers)
+
+
+async def paginate(view, queryset):
+    """``view.paginate_queryset()`` through the async ORM."""
+    request = view.request
+    if view.use_cursor_pagination():
+        paginator = CursorPaginator(
+            queryset, view.paginate_by, view.get_cursor_ordering()
+        )
+        cursor = request.GET.get(view.cursor_query_param)
+        try:
+            page = await sync_to_async(paginator.page)(cursor)
+        except InvalidCursor:
+            raise Http404(gettext("Invalid cursor"))
+        return paginator, page
+    paginator = Paginator(queryset, view.paginate_by)
+    paginator.count = await queryset.acount()
+    number = request.GET.get(view.page_kwarg) or 1
+    try:
+        page = paginator.page(paginator.num_pages if number == "last" else number)
+    except InvalidPage as exc:
+        message = gettext("Invalid page (%(page_number)s): %(message)s")
+        raise Http404(message % {"page_number": number, "message": str(exc)})
+    page.object_list = [obj async for obj in page.object_list]
+    return paginator, page
+
+
+async def render_list(view):
+    queryset = view.object_list = view.get_queryset()
+    paginator, page = await paginate(view, queryset)
+    context = {
+        "paginator": paginator,
+        "page_obj": page,
+        "is_paginated": page.has_other_pages(),
+        "object_list": page.object_list,
+        view.get_context_object_name(queryset): page.object_list,
+        "view": view,
+    }
+    return await arender(view.request, view.get_template_names(), context)
+
+
+async def get_object(view):
+    try:
+        view.object = await view.get_queryset().aget(pk=view.kwargs["pk"])
+    except view.model.DoesNotExist:
+        raise Http404(
+            gettext("No %(verbose_name)s found matching the query")
+            % {"verbose_name": view.model._meta.verbose_name}
+        )
+    return view.object
+
+
+async def render_detail(view, **extra_context):
+    obj = view.object
+    context = {"object": obj, view.get_context_object_name(obj): obj, "view": view}
+    context.update(extra_context)
+    return await arender(view.request, view.get_template_names(), context)
+
+
+@query_budget(5)
+async def index(request):
+    """Async ``views.index``."""
+    counter = await CatalogCounter.aload()
+    # Only visitors with a pre-cookie session make get_visits() query
+    num_visits = await sync_to_async(views.get_visits)(request)
+    context = views.home_context(request, counter, num_visits)
+    response = await arender(request, "index.html", context)
+    views.set_visits_cookie(request, response, num_visits + 1)
+    return response
+
+
+@query_budget(views.BookListView.query_budget)
+async def book_list(request):
+    """Async ``views.BookListView``."""
+    await load_user(request)
+    view = setup_view(views.BookListView, request)
+    return await conditional(view, lambda: render_list(view))
+
+
+@query_budget(views.BookDetailView.query_budget)
+async def book_detail(request, pk):
+    """Async ``views.BookDetailView``."""
+    await load_user(request)
+    view = setup_view(views.BookDetailView, request, pk=pk)
+
+    async def respond():
+        book = await get_object(view)
+        copies = book.bookinstance_set.order_by("-due_back")
+        return await render_detail(view, book_instance=[copy async for copy in copies])
+
+    return await conditional(view, respond)
+
+
+@query_budget(views.AuthorListView.query_budget)
+async def author_list(request):
+    """Async ``views.AuthorListView``."""
+    await load_user(request)
+    view = setup_view(views.AuthorListView, request)
+    return await conditional(view, lambda: render_list(view))
+
+
+@query_budget(views.AuthorDetailView.query_budget)
+async def author_detail(request, pk):
+    """Async ``views.AuthorDetailView``."""
+    await load_user(request)
+    view = setup_view(views.AuthorDetailView, request, pk=pk)
+
+    async def respond():
+        author = await get_object(view)
+        books = author.book_set.with_availability().order_by("title", "pk")
+        return await render_detail(view, books=[book async for book in books])
+
+    return await conditional(view, respond)
+
+
+@query_budget(views.LoanedBooksByUserListView.query_budget)
+async def my_borrowed(request):
+    """Async ``views.LoanedBooksByUserListView``."""
+    if not await load_user(request):
+        return redirect_to_login(request.get_full_path())
+    view = setup_view(views.LoanedBooksByUserListView, request)
+    return await render_list(view)
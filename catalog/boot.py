@@ -0,0 +1,269 @@
+"""The steps ``manage.py boot`` runs before the server starts.
+
+Each step fingerprints its inputs (a SHA-256 over file contents and the
+settings that shape its output) and is skipped when that matches the stamp
+stored with its output: in the database for ``migrate`` and ``loaddata``,
+in a file next to the generated files for ``collectstatic`` and
+``compilemessages``. Wiping an output (a new database, an empty static
+volume) wipes its stamp too, so the step runs again.
+"""
+
+import abc
+import hashlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.loader import MigrationLoader
+from django.utils import timezone
+
+from catalog.models import BootStamp
+
+
+class Fingerprint:
+    def __init__(self):
+        self._hash = hashlib.sha256()
+
+    def add(self, *values):
+        for value in values:
+            self._hash.update(repr(value).encode())
+            self._hash.update(b"\0")
+
+    def add_file(self, path):
+        with open(path, "rb") as file:
+            while chunk := file.read(1 << 16):
+                self._hash.update(chunk)
+        self._hash.update(b"\0")
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class Step(abc.ABC):
+    """One boot step. ``fingerprint()`` returning None means "always run"."""
+
+    name = None
+
+    def __str__(self):
+        return self.name
+
+    def fingerprint(self):
+        return None
+
+    def missing_output(self):
+        """True when an output is gone although its inputs did not change."""
+        return False
+
+    def read_stamp(self):
+        return None
+
+    def write_stamp(self, fingerprint):
+        pass
+
+    @abc.abstractmethod
+    def run(self, stdout):
+        pass
+
+
+class DatabaseStampMixin:
+    using = DEFAULT_DB_ALIAS
+
+    def has_stamp_table(self):
+        connection = connections[self.using]
+        return BootStamp._meta.db_table in connection.introspection.table_names()
+
+    def read_stamp(self):
+        if not self.has_stamp_table():
+            return None
+        stamp = BootStamp.objects.using(self.using).filter(step=self.name).first()
+        return stamp.fingerprint if stamp else None
+
+    def write_stamp(self, fingerprint):
+        BootStamp.objects.using(self.using).update_or_create(
+            step=self.name, defaults={"fingerprint": fingerprint}
+        )
+
+
+class FileStampMixin(abc.ABC):
+    @abc.abstractmethod
+    def stamp_path(self):
+        """Where the stamp is kept, next to the step's output."""
+
+    def read_stamp(self):
+        try:
+            with open(self.stamp_path(), encoding="utf-8") as file:
+                return json.load(file)["fingerprint"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write_stamp(self, fingerprint):
+        path = self.stamp_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(
+                {"fingerprint": fingerprint, "finished_at": timezone.now().isoformat()},
+                file,
+            )
+        os.replace(tmp, path)
+
+
+class MakeMigrations(Step):
+    """Development only: production containers apply the committed migrations."""
+
+    name = "makemigrations"
+
+    def run(self, stdout):
+        call_command("makemigrations", interactive=False, stdout=stdout)
+
+
+class Migrate(DatabaseStampMixin, Step):
+    name = "migrate"
+
+    def fingerprint(self):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        fingerprint = Fingerprint()
+        for key, migration in sorted(loader.disk_migrations.items()):
+            fingerprint.add(*key)
+            fingerprint.add_file(sys.modules[migration.__module__].__file__)
+        return fingerprint.hexdigest()
+
+    def run(self, stdout):
+        call_command("migrate", database=self.using, interactive=False, stdout=stdout)
+
+
+class LoadData(DatabaseStampMixin, Step):
+    name = "loaddata"
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def fixture_paths(self, label):
+        if os.path.isabs(label):
+            return [Path(label)]
+        dirs = [Path(app.path) / "fixtures" for app in apps.get_app_configs()]
+        dirs += [Path(path) for path in settings.FIXTURE_DIRS]
+        found = [path / label for path in dirs if (path / label).is_file()]
+        if not found:
+            raise CommandError(f"No fixture named {label!r} found.")
+        return found
+
+    def fingerprint(self):
+        fingerprint = Fingerprint()
+        for label in self.fixtures:
+            for path in self.fixture_paths(label):
+                fingerprint.add(label)
+                fingerprint.add_file(path)
+        return fingerprint.hexdigest()
+
+    def run(self, stdout):
+        call_command("loaddata", *self.fixtures, database=self.using, stdout=stdout)
+
+
+class CollectStatic(FileStampMixin, Step):
+    name = "collectstatic"
+
+    def stamp_path(self):
+        return Path(settings.STATIC_ROOT) / ".boot-collectstatic"
+
+    def fingerprint(self):
+        fingerprint = Fingerprint()
+        fingerprint.add(
+            getattr(settings, "STATICFILES_STORAGE", None),
+            getattr(settings, "STORAGES", {}).get("staticfiles"),
+            settings.STATIC_URL,
+            getattr(settings, "RESPONSIVE_IMAGES", None),
+        )
+        ignore_patterns = apps.get_app_config("staticfiles").ignore_patterns
+        files = {}
+        for finder in get_finders():
+            for path, storage in finder.list(ignore_patterns):
+                prefix = getattr(storage, "prefix", None) or ""
+                # The first finder to list a path wins, as in collectstatic
+                files.setdefault(os.path.join(prefix, path), storage.path(path))
+        for path, full_path in sorted(files.items()):
+            fingerprint.add(path)
+            fingerprint.add_file(full_path)
+        return fingerprint.hexdigest()
+
+    def run(self, stdout):
+        call_command(
+            "collectstatic", interactive=False, clear=True, verbosity=0, stdout=stdout
+        )
+
+
+class CompileMessages(FileStampMixin, Step):
+    """Compile the ``.po`` files under one app's ``locale`` directory."""
+
+    name = "compilemessages"
+
+    def __init__(self, app_path):
+        self.app_path = Path(app_path)
+
+    def __str__(self):
+        return f"{self.name} ({self.app_path.name})"
+
+    def po_files(self):
+        return sorted((self.app_path / "locale").rglob("*.po"))
+
+    def stamp_path(self):
+        return self.app_path / "locale" / ".boot-compilemessages"
+
+    def fingerprint(self):
+        fingerprint = Fingerprint()
+        for path in self.po_files():
+            fingerprint.add(str(path.relative_to(self.app_path)))
+            fingerprint.add_file(path)
+        return fingerprint.hexdigest()
+
+    def missing_output(self):
+        return not all(path.with_suffix(".mo").exists() for path in self.po_files())
+
+    def run(self, stdout):
+        # compilemessages works below the current directory, like the
+        # `cd catalog && django-admin compilemessages` this replaces
+        cwd = os.getcwd()
+        os.chdir(self.app_path)
+        try:
+            call_command("compilemessages", verbosity=0, stdout=stdout)
+        finally:
+            os.chdir(cwd)
+
+
+def project_apps_with_locale():
+    base = Path(settings.BASE_DIR).resolve()
+    for app in apps.get_app_configs():
+        path = Path(app.path).resolve()
+        if base in path.parents and (path / "locale").is_dir():
+            yield path
+
+
+def get_steps(production, fixtures):
+    steps = [] if production else [MakeMigrations()]
+    steps += [Migrate(), LoadData(fixtures), CollectStatic()]
+    steps += [CompileMessages(path) for path in project_apps_with_locale()]
+    return steps
+
+
+def run_step(step, force=False, stdout=None):
+    """Run ``step`` unless its stamp says it is up to date; return what happened."""
+    fingerprint = step.fingerprint()
+    if (
+        not force
+        and fingerprint is not None
+        and fingerprint == step.read_stamp()
+        and not step.missing_output()
+    ):
+        return "up to date"
+    step.run(stdout or io.StringIO())
+    if fingerprint is not None:
+        step.write_stamp(fingerprint)
+    return "ran"
@@ -0,0 +1,14 @@
+"""MySQL with a per-process connection pool (``catalog.db.pool``)."""
+
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from catalog.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, MySQLDatabaseWrapper):
+    def is_raw_usable(self, connection):
+        try:
+            connection.ping()
+        except Exception:
+            return False
+        return True
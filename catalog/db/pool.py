@@ -0,0 +1,274 @@
+"""A connection pool shared by the threads of one process.
+
+Django keeps one connection per thread. That is fine for a few long-lived
+WSGI threads with ``CONN_MAX_AGE``, but under ASGI every request runs in a
+new thread and opens a new connection. The pooled backends in
+``catalog.db`` take their connections from a ``ConnectionPool`` instead
+and give them back when Django closes them at the end of the request.
+
+Configure it with a ``POOL`` entry in the database settings::
+
+    "POOL": {"SIZE": 10, "TIMEOUT": 5, "MAX_LIFETIME": 1800,
+             "CHECK_AFTER": 30, "LEAK_TIMEOUT": 60, "LEAK_TRACEBACKS": False}
+"""
+
+import logging
+import os
+import threading
+import time
+import traceback
+
+from django.db.utils import OperationalError
+
+from catalog.metrics import (
+    DB_POOL_CHECKOUTS,
+    DB_POOL_CONNECTIONS,
+    DB_POOL_LEAKS,
+    DB_POOL_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """No connection came free within the pool's timeout."""
+
+
+class Checkout:
+    __slots__ = ("created", "since", "thread", "stack", "reported")
+
+    def __init__(self, created, stack):
+        self.created = created
+        self.since = time.monotonic()
+        self.thread = threading.current_thread().name
+        self.stack = stack
+        self.reported = False
+
+
+class ConnectionPool:
+    """Hand out at most ``size`` connections made by ``connect()``.
+
+    Idle connections are reused newest first and pinged with ``is_usable``
+    when they sat idle for more than ``check_after`` seconds; connections
+    older than ``max_lifetime`` are closed instead of reused. A checkout
+    held longer than ``leak_timeout`` is logged once as a probable leak.
+    """
+
+    def __init__(
+        self,
+        connect,
+        size=10,
+        timeout=5.0,
+        max_lifetime=1800,
+        check_after=30,
+        leak_timeout=60,
+        leak_tracebacks=False,
+        is_usable=None,
+        alias="default",
+    ):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.leak_timeout = leak_timeout
+        self.leak_tracebacks = leak_tracebacks
+        self.is_usable = is_usable or (lambda connection: True)
+        self.alias = alias
+        self._condition = threading.Condition()
+        self._idle = []  # (connection, created, returned), newest last
+        self._checked_out = {}
+        self._opening = 0
+        self._pid = os.getpid()
+        self._inherited = []
+
+    @property
+    def total(self):
+        return len(self._idle) + len(self._checked_out) + self._opening
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            connection, created, returned = self._take(deadline)
+            if connection is None:
+                try:
+                    connection = self.connect()
+                except BaseException:
+                    with self._condition:
+                        self._opening -= 1
+                        self._condition.notify()
+                    raise
+                created, outcome = time.monotonic(), "new"
+                break
+            if time.monotonic() - returned <= self.check_after or self.is_usable(
+                connection
+            ):
+                outcome = "reused"
+                break
+            self._close(connection)
+        stack = "".join(traceback.format_stack()[:-1]) if self.leak_tracebacks else ""
+        with self._condition:
+            if outcome == "new":
+                self._opening -= 1
+            self._checked_out[id(connection)] = Checkout(created, stack)
+            self._update_gauges()
+        DB_POOL_CHECKOUTS.labels(self.alias, outcome).inc()
+        DB_POOL_WAIT.labels(self.alias).observe(time.monotonic() - start)
+        return connection
+
+    def _take(self, deadline):
+        """Pop an idle connection, or reserve a slot for a new one (None)."""
+        expired = []
+        try:
+            with self._condition:
+                self._check_fork()
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        connection, created, returned = self._idle.pop()
+                        if now - created < self.max_lifetime:
+                            return connection, created, returned
+                        expired.append(connection)
+                    if self.total < self.size:
+                        self._opening += 1
+                        return None, None, None
+                    self.report_leaks()
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        DB_POOL_CHECKOUTS.labels(self.alias, "timeout").inc()
+                        raise PoolTimeout(
+                            f"No connection to {self.alias!r} came free within "
+                            f"{self.timeout}s ({self.size} in use)."
+                        )
+                    self._condition.wait(remaining)
+        finally:
+            for connection in expired:
+                self._close(connection)
+
+    def release(self, connection, discard=False):
+        """Give a connection back; ``discard`` closes it instead of reusing it."""
+        with self._condition:
+            checkout = self._checked_out.pop(id(connection), None)
+            if checkout is not None and not discard:
+                now = time.monotonic()
+                discard = now - checkout.created >= self.max_lifetime
+                if not discard:
+                    self._idle.append((connection, checkout.created, now))
+            self.report_leaks()
+            self._update_gauges()
+            self._condition.notify()
+        if checkout is None or discard:
+            self._close(connection)
+
+    def report_leaks(self):
+        now = time.monotonic()
+        for checkout in self._checked_out.values():
+            if checkout.reported or now - checkout.since < self.leak_timeout:
+                continue
+            checkout.reported = True
+            DB_POOL_LEAKS.labels(self.alias).inc()
+            logger.warning(
+                "Connection to %r checked out by thread %s %.0fs ago and not "
+                "returned; is it closed at the end of the request?%s",
+                self.alias,
+                checkout.thread,
+                now - checkout.since,
+                "\n" + checkout.stack if checkout.stack else "",
+            )
+
+    def close_idle(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._update_gauges()
+        for connection, _, _ in idle:
+            self._close(connection)
+
+    def _check_fork(self):
+        # A forked worker must not use the parent's sockets, nor close them:
+        # keep references so garbage collection does not either
+        if self._pid != os.getpid():
+            self._inherited += [connection for connection, _, _ in self._idle]
+            self._idle = []
+            self._checked_out = {}
+            self._opening = 0
+            self._pid = os.getpid()
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _update_gauges(self):
+        DB_POOL_CONNECTIONS.labels(self.alias, "idle").set(len(self._idle))
+        DB_POOL_CONNECTIONS.labels(self.alias, "in_use").set(len(self._checked_out))
+
+
+def get_pool(alias, factory):
+    """The process-wide pool for ``alias``, made by ``factory()`` on first use."""
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = factory()
+        return _pools[alias]
+
+
+def close_pools():
+    """Close every idle pooled connection, e.g. in the master before forking."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_idle()
+
+
+class PooledDatabaseWrapperMixin:
+    """Take raw connections from the alias's pool and give them back on close.
+
+    Put it before a backend's ``DatabaseWrapper`` and set ``CONN_MAX_AGE`` to
+    0, so that Django "closes" the connection after every request.
+    """
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get("POOL", {})
+        return get_pool(
+            self.alias,
+            lambda: ConnectionPool(
+                lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(
+                    conn_params
+                ),
+                size=options.get("SIZE", 10),
+                timeout=options.get("TIMEOUT", 5.0),
+                max_lifetime=options.get("MAX_LIFETIME", 1800),
+                check_after=options.get("CHECK_AFTER", 30),
+                leak_timeout=options.get("LEAK_TIMEOUT", 60),
+                leak_tracebacks=options.get("LEAK_TRACEBACKS", False),
+                is_usable=self.is_raw_usable,
+                alias=self.alias,
+            ),
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        return self.pool.acquire()
+
+    def is_raw_usable(self, connection):
+        try:
+            connection.cursor().execute("SELECT 1")
+        except Exception:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Never hand on a connection in an unknown transaction state
+        discard = (
+            self.in_atomic_block
+            or self.errors_occurred
+            or self.autocommit != self.settings_dict["AUTOCOMMIT"]
+        )
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, discard=discard)
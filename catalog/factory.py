@@ -28,23 +28,23 @@ class AuthorFactory(DjangoModelFactory):
     class Meta:
         model = Author
 
-    first_name = randomWord(5)
-    last_name = randomWord(8)
+    first_name = factory.Faker("first_name")
+    last_name = factory.Faker("last_name")
 
 
 class GenreFactory(DjangoModelFactory):
     class Meta:
         model = Genre
 
-    name = randomWord(10)
+    name = factory.Faker("word")
 
 
 class BookFactory(DjangoModelFactory):
     class Meta:
         model = Book
 
-    title = randomWord(10)
-    summary = randomWord(10)
+    title = factory.Faker("sentence", nb_words=4)
+    summary = factory.Faker("paragraph")
     isbn = factory.Sequence("123456{}".format)
 
     @factory.post_generation
@@ -60,7 +60,22 @@ class BookInstanceFactory(DjangoModelFactory):
     class Meta:
         model = BookInstance
 
-    imprint = randomWord(10)
+    imprint = factory.LazyFunction(lambda: randomWord(10))
     due_back = datetime.strptime("2023-01-01", "%Y-%m-%d").date()
     # borrower = factory.RelatedFactory(UserFactory, is_superuser=True)
     status = "o"
+
+
+def create_batch_bulk(factory_class, size, batch_size=1000, **kwargs):
+    """Like ``factory_class.create_batch`` with one INSERT per ``batch_size`` rows.
+
+    Declarations and overrides work as usual, but signals and
+    ``post_generation`` hooks do not run, and on MySQL the returned objects
+    have no primary key.
+    """
+    manager = factory_class._meta.model._default_manager
+    created = []
+    for start in range(0, size, batch_size):
+        batch = factory_class.build_batch(min(batch_size, size - start), **kwargs)
+        created += manager.bulk_create(batch)
+    return created
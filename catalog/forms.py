@@ -1,23 +1,29 @@
 import datetime
+import uuid
 from django import forms
 from django.forms import ModelForm
 from bootstrap_datepicker_plus.widgets import DatePickerInput
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from catalog.constant import LOAN_STATUS
+from catalog.exporter import FORMATS
 from catalog.models import BookInstance
 
 
+def validate_renewal_date(data):
+    # Check if a date is not in the past.
+    if data < datetime.date.today():
+        raise ValidationError(_("Invalid date - renewal in past"))
+
+    # Check if a date is in the allowed range (+4 weeks from today).
+    if data > datetime.date.today() + datetime.timedelta(weeks=4):
+        raise ValidationError(_("Invalid date - renewal more than 4 weeks ahead"))
+
+
 class RenewBookModelForm(ModelForm):
     def clean_due_back(self):
         data = self.cleaned_data["due_back"]
-
-        # Check if a date is not in the past.
-        if data < datetime.date.today():
-            raise ValidationError(_("Invalid date - renewal in past"))
-
-        # Check if a date is in the allowed range (+4 weeks from today).
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(_("Invalid date - renewal more than 4 weeks ahead"))
+        validate_renewal_date(data)
         # Remember to always return the cleaned data.
         return data
 
@@ -29,3 +35,110 @@ class RenewBookModelForm(ModelForm):
             "due_back": _("Enter a date between now and 4 weeks (default 3).")
         }
         widgets = {"due_back": DatePickerInput()}
+
+
+class BookSearchForm(forms.Form):
+    q = forms.CharField(
+        label=_("Search"),
+        max_length=200,
+        widget=forms.TextInput(
+            attrs={"type": "search", "placeholder": _("Title, author or ISBN")}
+        ),
+    )
+
+
+class UUIDListField(forms.Field):
+    """Any number of UUIDs, e.g. from a column of checkboxes."""
+
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {"invalid": _("Invalid copy id.")}
+
+    def to_python(self, value):
+        try:
+            return [uuid.UUID(str(item)) for item in value or []]
+        except ValueError:
+            raise ValidationError(self.error_messages["invalid"], code="invalid")
+
+
+class BulkLoanForm(forms.Form):
+    RETURN = "return"
+    RENEW = "renew"
+    SELECTED = "selected"
+    OVERDUE = "overdue"
+    ALL = "all"
+    # Copies named in one request; whole scopes are unlimited
+    MAX_SELECTED = 5000
+
+    action = forms.ChoiceField(
+        label=_("Action"),
+        choices=[(RETURN, _("Mark returned")), (RENEW, _("Renew"))],
+    )
+    scope = forms.ChoiceField(
+        label=_("Apply to"),
+        choices=[
+            (SELECTED, _("Selected copies")),
+            (OVERDUE, _("All overdue copies")),
+            (ALL, _("All copies on loan")),
+        ],
+        initial=SELECTED,
+    )
+    copies = UUIDListField(required=False)
+    due_back = forms.DateField(
+        label=_("Renewal date"), required=False, widget=DatePickerInput()
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("action") == self.RENEW:
+            due_back = cleaned_data.get("due_back")
+            if due_back is None:
+                self.add_error("due_back", _("Enter a renewal date."))
+            else:
+                try:
+                    validate_renewal_date(due_back)
+                except ValidationError as error:
+                    self.add_error("due_back", error)
+        if cleaned_data.get("scope") == self.SELECTED:
+            copies = cleaned_data.get("copies") or []
+            if not copies:
+                self.add_error("copies", _("Select at least one copy."))
+            elif len(copies) > self.MAX_SELECTED:
+                self.add_error(
+                    "copies",
+                    _("Select at most %(max)d copies.") % {"max": self.MAX_SELECTED},
+                )
+        return cleaned_data
+
+    def get_queryset(self):
+        """The copies on loan the chosen action applies to."""
+        copies = BookInstance.objects.filter(status__exact="o")
+        scope = self.cleaned_data["scope"]
+        if scope == self.SELECTED:
+            return copies.filter(pk__in=self.cleaned_data["copies"])
+        if scope == self.OVERDUE:
+            return copies.filter(due_back__lt=datetime.date.today())
+        return copies
+
+
+class LoanExportForm(forms.Form):
+    format = forms.ChoiceField(
+        choices=[(format, format.upper()) for format in FORMATS],
+        initial="csv",
+        required=False,
+    )
+    status = forms.ChoiceField(
+        label=_("Status"), choices=[("", _("Any"))] + list(LOAN_STATUS), required=False
+    )
+    due_after = forms.DateField(label=_("Due from"), required=False)
+    due_before = forms.DateField(label=_("Due until"), required=False)
+    borrower = forms.CharField(label=_("Borrower"), max_length=150, required=False)
+
+    def clean_format(self):
+        return self.cleaned_data["format"] or "csv"
+
+    def filters(self):
+        """The cleaned filters, as keyword arguments for exporter.filter_copies."""
+        return {
+            name: self.cleaned_data[name]
+            for name in ("status", "due_after", "due_before", "borrower")
+        }
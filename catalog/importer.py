@@ -0,0 +1,326 @@
+"""Streaming import of books and copies from CSV or JSON Lines files.
+
+One record per book, with these fields (CSV header or JSON keys):
+
+- ``isbn`` and ``title`` (required), ``summary``
+- ``author_first_name``, ``author_last_name``
+- ``genres``: a list in JSON, ``;``-separated in CSV
+- ``copies``: how many copies the book has, with ``imprint`` and ``status``
+  (default ``a``) for all of them
+
+Records are read lazily and written in fixed-size batches, one transaction
+per batch, so memory stays flat whatever the file size. Authors and genres
+are matched by name, ignoring case and accents as MySQL compares them, and
+books by ISBN. Copies get ids derived from the ISBN, so importing the same
+file again (or resuming after a failure) does not duplicate anything.
+
+Other databases (SQLite) fold only ASCII case when looking up the authors
+already stored, so there an accented last name in the table is found only
+when the file spells it the same way or without its accents.
+"""
+
+import csv
+import gzip
+import itertools
+import json
+import unicodedata
+import uuid
+from collections import Counter, namedtuple
+
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from catalog.constant import LOAN_STATUS
+from catalog.models import Author, Book, BookInstance, CatalogCounter, Genre
+
+COPY_NAMESPACE = uuid.UUID("6f1c52a8-3d0e-4a8e-9a43-2f7c0b1d5e90")
+STATUSES = {code for code, _ in LOAN_STATUS}
+FORMATS = ("csv", "jsonl")
+
+Record = namedtuple(
+    "Record",
+    "line isbn title summary author genres copies imprint status",
+)
+
+
+class InvalidRecord(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def detect_format(path):
+    name = path.removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}, pass it explicitly.")
+
+
+def open_source(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_rows(file, format):
+    """Yield ``(line, dict)`` for every record in ``file``."""
+    if format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise InvalidRecord(line, f"invalid JSON ({exc.msg})") from None
+        if not isinstance(row, dict):
+            raise InvalidRecord(line, "not a JSON object")
+        yield line, row
+
+
+def parse_record(line, row):
+    def text(name, max_length=None):
+        value = str(row.get(name) or "").strip()
+        if max_length and len(value) > max_length:
+            raise InvalidRecord(line, f"{name} is longer than {max_length}")
+        return value
+
+    isbn = text("isbn", 13)
+    title = text("title", 200)
+    if not isbn or not title:
+        raise InvalidRecord(line, "isbn and title are required")
+    first_name = text("author_first_name", 100)
+    last_name = text("author_last_name", 100)
+    genres = row.get("genres") or []
+    if isinstance(genres, str):
+        genres = genres.split(";")
+    if not isinstance(genres, list) or not all(isinstance(n, str) for n in genres):
+        raise InvalidRecord(line, "genres must be a list of names")
+    genres = tuple(dict.fromkeys(name.strip() for name in genres if name.strip()))
+    try:
+        copies = int(row.get("copies") or 0)
+    except (TypeError, ValueError):
+        raise InvalidRecord(line, "copies must be a number") from None
+    status = text("status") or "a"
+    if status not in STATUSES:
+        raise InvalidRecord(line, f"unknown status {status!r}")
+    return Record(
+        line=line,
+        isbn=isbn,
+        title=title,
+        summary=text("summary"),
+        author=(first_name, last_name) if first_name or last_name else None,
+        genres=genres,
+        copies=copies,
+        imprint=text("imprint", 200),
+        status=status,
+    )
+
+
+def read_records(file, format, skip=0):
+    """Parsed records from ``file``, after skipping the first ``skip``."""
+    rows = itertools.islice(read_rows(file, format), skip, None)
+    return (parse_record(line, row) for line, row in rows)
+
+
+def name_key(name):
+    """``name`` as MySQL's default utf8mb4_0900_ai_ci collation compares it."""
+    decomposed = unicodedata.normalize("NFKD", name.strip())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def author_key(author):
+    first_name, last_name = author
+    return name_key(first_name), name_key(last_name)
+
+
+def author_candidates(last_names):
+    """Authors whose last name may have the ``name_key`` of one of ``last_names``."""
+    if connection.vendor == "mysql":
+        # The column's collation already compares like name_key
+        return Author.objects.filter(last_name__in=last_names)
+    folded = {name.lower() for name in last_names}
+    folded.update(name_key(name) for name in last_names)
+    return Author.objects.alias(last_name_lower=Lower("last_name")).filter(
+        last_name_lower__in=folded
+    )
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def copy_id(isbn, number):
+    return uuid.uuid5(COPY_NAMESPACE, f"{isbn}/{number}")
+
+
+class CatalogImporter:
+    """Write batches of records; ``stats`` counts what was created or updated.
+
+    A record can have any number of copies and genres, so their rows go to
+    the database ``batch_size`` at a time.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        # Genres are few; every other lookup is scoped to the current batch
+        self.genres = {
+            name_key(name): pk for name, pk in Genre.objects.values_list("name", "pk")
+        }
+        self.stats = Counter()
+
+    def import_batch(self, records):
+        # Later records win when a batch repeats an ISBN
+        records = list({record.isbn: record for record in records}.values())
+        with transaction.atomic():
+            authors = self.save_authors(records)
+            books = self.save_books(records, authors)
+            self.save_genres(records, books)
+            self.save_copies(records, books)
+        self.stats["records"] += len(records)
+
+    def save_authors(self, records):
+        """Insert the batch's missing authors; return ``{author_key: pk}``."""
+        names = {}
+        for record in records:
+            if record.author:
+                # The first spelling in the file is the one stored
+                names.setdefault(author_key(record.author), record.author)
+        if not names:
+            return {}
+        existing = {
+            author_key(author): pk
+            for *author, pk in author_candidates(
+                {last_name for _, last_name in names.values()}
+            ).values_list("first_name", "last_name", "pk")
+        }
+        missing = [names[key] for key in names.keys() - existing.keys()]
+        if missing:
+            Author.objects.bulk_create(
+                Author(first_name=first_name, last_name=last_name)
+                for first_name, last_name in missing
+            )
+            existing.update(
+                (author_key(author), pk)
+                for *author, pk in Author.objects.filter(
+                    last_name__in={last_name for _, last_name in missing}
+                ).values_list("first_name", "last_name", "pk")
+            )
+            self.stats["authors created"] += len(missing)
+            CatalogCounter.increment(num_authors=len(missing))
+        return existing
+
+    def save_books(self, records, authors):
+        """Insert or update the batch's books; return ``{isbn: pk}``."""
+        existing = Book.objects.filter(
+            isbn__in=[record.isbn for record in records]
+        ).in_bulk(field_name="isbn")
+        now = timezone.now()
+        new, changed = [], []
+        for record in records:
+            author_id = record.author and authors[author_key(record.author)]
+            book = existing.get(record.isbn)
+            if book is None:
+                new.append(
+                    Book(
+                        isbn=record.isbn,
+                        title=record.title,
+                        summary=record.summary,
+                        author_id=author_id,
+                    )
+                )
+            elif (book.title, book.summary, book.author_id) != (
+                record.title,
+                record.summary,
+                author_id,
+            ):
+                book.title, book.summary, book.author_id = (
+                    record.title,
+                    record.summary,
+                    author_id,
+                )
+                book.updated_at = now
+                changed.append(book)
+        if new:
+            Book.objects.bulk_create(new)
+            CatalogCounter.increment(num_books=len(new))
+        if changed:
+            Book.objects.bulk_update(
+                changed, ["title", "summary", "author", "updated_at"]
+            )
+        self.stats["books created"] += len(new)
+        self.stats["books updated"] += len(changed)
+        books = {isbn: book.pk for isbn, book in existing.items()}
+        # MySQL does not return the ids of bulk-inserted rows
+        books.update(
+            Book.objects.filter(isbn__in=[book.isbn for book in new]).values_list(
+                "isbn", "pk"
+            )
+        )
+        return books
+
+    def save_genres(self, records, books):
+        names = {}
+        for record in records:
+            for name in record.genres:
+                names.setdefault(name_key(name), name)
+        missing = [names[key] for key in names.keys() - self.genres.keys()]
+        if missing:
+            Genre.objects.bulk_create(Genre(name=name) for name in missing)
+            self.genres.update(
+                (name_key(name), pk)
+                for name, pk in Genre.objects.filter(name__in=missing).values_list(
+                    "name", "pk"
+                )
+            )
+            self.stats["genres created"] += len(missing)
+        Through = Book.genre.through
+        Through.objects.bulk_create(
+            (
+                Through(book_id=books[record.isbn], genre_id=self.genres[key])
+                for record in records
+                for key in {name_key(name) for name in record.genres}
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+    def save_copies(self, records, books):
+        wanted = {
+            copy_id(record.isbn, number): record
+            for record in records
+            for number in range(record.copies)
+        }
+        if not wanted:
+            return
+        existing = set()
+        for pks in batched(wanted, self.batch_size):
+            existing.update(
+                BookInstance.objects.filter(pk__in=pks).values_list("pk", flat=True)
+            )
+        copies = [
+            BookInstance(
+                id=pk,
+                book_id=books[record.isbn],
+                imprint=record.imprint,
+                status=record.status,
+            )
+            for pk, record in wanted.items()
+            if pk not in existing
+        ]
+        BookInstance.objects.bulk_create(copies, batch_size=self.batch_size)
+        available = sum(copy.status == "a" for copy in copies)
+        CatalogCounter.increment(
+            num_instances=len(copies), num_instances_available=available
+        )
+        # Book pages show their copies; see catalog.signals
+        Book.objects.filter(pk__in={copy.book_id for copy in copies}).touch()
+        self.stats["copies created"] += len(copies)
@@ -0,0 +1,273 @@
+"""Background jobs stored in the database, run by ``manage.py run_worker``.
+
+A job names a module-level function by its dotted path and carries its
+keyword arguments as JSON::
+
+    jobs.enqueue("catalog.mail.send_email", message=...)
+
+``enqueue`` is a plain INSERT, so a job enqueued inside a transaction only
+becomes visible to workers when that transaction commits. Workers claim jobs
+with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of them can poll
+the same table without handing a job out twice. A failing job is retried
+with exponential backoff until ``max_attempts``. While a job runs its lock
+is refreshed every third of ``JOB_LOCK_TIMEOUT``; a job whose worker died
+stops being refreshed and is put back in the queue once its lock is older
+than that. A worker that lost its lock leaves the job to the one holding it.
+
+A task decorated with ``scrub_on_failure`` keeps only ``scrub(payload)`` once
+its job has failed for good, so secrets in the payload do not stay in the
+table and the admin.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from catalog.metrics import JOB_DURATION, JOBS_PROCESSED
+from catalog.models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "default"
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def task_name(task):
+    if isinstance(task, str):
+        return task
+    return f"{task.__module__}.{task.__qualname__}"
+
+
+def enqueue(task, *, queue=DEFAULT_QUEUE, delay=0, max_attempts=None, **kwargs):
+    """Store a call of ``task`` (a function or its dotted path) for a worker."""
+    return Job.objects.create(
+        queue=queue,
+        name=task_name(task),
+        payload=kwargs,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or get_setting("JOB_MAX_ATTEMPTS", 5),
+    )
+
+
+def scrub_on_failure(scrub):
+    """Decorate a task so its failed jobs keep ``scrub(payload)`` instead."""
+
+    def decorator(task):
+        task.scrub_payload = scrub
+        return task
+
+    return decorator
+
+
+def failed_payload(job):
+    try:
+        task = import_string(job.name)
+    except ImportError:
+        return job.payload
+    scrub = getattr(task, "scrub_payload", None)
+    return job.payload if scrub is None else scrub(job.payload)
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``, with jitter."""
+    base = get_setting("JOB_BACKOFF_BASE", 10)
+    ceiling = get_setting("JOB_BACKOFF_MAX", 3600)
+    return min(ceiling, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+
+
+def claim(worker_id, queues=(DEFAULT_QUEUE,)):
+    """Lock the next due job for ``worker_id``; None when there is nothing to do."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, queue__in=queues, run_at__lte=now)
+            .order_by("run_at", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.locked_by = worker_id
+        # The status check keeps the claim safe on backends that ignore
+        # FOR UPDATE (SQLite): a job another worker took is not updated.
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=job.status,
+            attempts=job.attempts,
+            locked_at=now,
+            locked_by=worker_id,
+        )
+    return job if claimed else None
+
+
+def requeue_stale():
+    """Put back jobs whose worker stopped without finishing them."""
+    timeout = get_setting("JOB_LOCK_TIMEOUT", 600)
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=Job.QUEUED, locked_at=None, locked_by="")
+
+
+def heartbeat(job):
+    """Refresh the lock of a running job; False if it was taken away."""
+    return bool(
+        Job.objects.filter(
+            pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+        ).update(locked_at=timezone.now())
+    )
+
+
+@contextmanager
+def keep_locked(job):
+    """Refresh ``job``'s lock from another thread while the block runs.
+
+    Without it ``requeue_stale`` would hand a job that runs longer than
+    ``JOB_LOCK_TIMEOUT`` to a second worker, e.g. sending a bulk mail twice.
+    """
+    interval = get_setting("JOB_LOCK_TIMEOUT", 600) / 3
+    done = threading.Event()
+
+    def beat():
+        try:
+            while not done.wait(interval):
+                try:
+                    heartbeat(job)
+                except DatabaseError:
+                    logger.exception("Job %s heartbeat failed", job.pk)
+                    connection.close()
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def run(job):
+    """Run a claimed job, then delete it or schedule its retry."""
+    start = time.perf_counter()
+    try:
+        with keep_locked(job):
+            import_string(job.name)(**job.payload)
+    except Exception as exc:
+        outcome = retry_or_fail(job, exc)
+    else:
+        deleted, _ = Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+        if not deleted:
+            logger.warning("Job %s finished after losing its lock", job.pk)
+        outcome = "done"
+    JOBS_PROCESSED.labels(job.queue, job.name, outcome).inc()
+    JOB_DURATION.labels(job.queue, job.name).observe(time.perf_counter() - start)
+    return outcome
+
+
+def retry_or_fail(job, exc):
+    worker_id = job.locked_by
+    job.last_error = "".join(traceback.format_exception(exc))
+    job.locked_at = None
+    job.locked_by = ""
+    if job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        outcome = "retry"
+        logger.warning("Job %s failed, retrying at %s", job.pk, job.run_at)
+    else:
+        job.status = Job.FAILED
+        job.payload = failed_payload(job)
+        outcome = "failed"
+        logger.error("Job %s failed after %d attempts", job.pk, job.attempts)
+    # Another worker may have taken over the job since; its run decides
+    if not Job.objects.filter(pk=job.pk, locked_by=worker_id).update(
+        status=job.status,
+        run_at=job.run_at,
+        payload=job.payload,
+        last_error=job.last_error,
+        locked_at=None,
+        locked_by="",
+    ):
+        logger.warning("Job %s failed after losing its lock", job.pk)
+    return outcome
+
+
+class Worker:
+    """Run jobs from ``queues`` on ``concurrency`` threads until stopped.
+
+    Each thread claims one job at a time on its own database connection. With
+    ``burst`` the worker exits once no job is due instead of polling.
+    """
+
+    def __init__(self, queues, concurrency=1, poll_interval=1.0, burst=False):
+        self.queues = tuple(queues)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def start(self):
+        requeue_stale()
+        if self.concurrency == 1:
+            self.loop(0)
+            return
+        threads = [
+            threading.Thread(target=self.thread_main, args=(n,), name=f"worker-{n}")
+            for n in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def thread_main(self, number):
+        try:
+            self.loop(number)
+        finally:
+            # Connections are per thread; don't leave this one to the server
+            connection.close()
+
+    def loop(self, number):
+        worker_id = f"{self.name}/{number}"
+        last_requeue = time.monotonic()
+        while not self.stopping.is_set():
+            close_old_connections()
+            try:
+                job = claim(worker_id, self.queues)
+                if job is not None:
+                    run(job)
+                if number == 0 and time.monotonic() - last_requeue > 60:
+                    requeue_stale()
+                    last_requeue = time.monotonic()
+            except DatabaseError:
+                # Lost connection, deadlock victim...: retry on a new connection.
+                # A job claimed before the error is requeued once its lock is stale.
+                logger.exception("Job queue query failed")
+                connection.close()
+                self.stopping.wait(self.poll_interval)
+                continue
+            if job is None:
+                if self.burst:
+                    return
+                self.stopping.wait(self.poll_interval)
@@ -0,0 +1,8 @@
+"""Load tests for the whole site, run with ``manage.py loadtest``.
+
+``dataset`` seeds the catalog with the factories, ``scenarios`` describes
+what anonymous visitors, members and librarians do, ``runner`` plays them
+against a running server with one thread per virtual user, and ``report``
+turns the timings and the server's /metrics into per-route throughput,
+latency percentiles and queries per request.
+"""
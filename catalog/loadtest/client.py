@@ -0,0 +1,93 @@
+import collections
+import http.client
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+Response = collections.namedtuple("Response", "status content location")
+
+
+class RequestFailed(Exception):
+    pass
+
+
+class Session:
+    """One browser: a keep-alive connection, its cookies and its timings.
+
+    Every request is recorded under a label, the URL name it exercises, in
+    ``recorder``, a ``report.Recorder`` shared by all sessions.
+    """
+
+    def __init__(self, base_url, recorder, timeout=30):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.recorder = recorder
+        self.cookies = {}
+        self.connection = None
+
+    def get(self, label, path, params=None):
+        if params:
+            path = f"{path}?{urlencode(params, doseq=True)}"
+        return self.request(label, "GET", path)
+
+    def post(self, label, path, data):
+        data = dict(data, csrfmiddlewaretoken=self.cookies.get("csrftoken", ""))
+        return self.request(label, "POST", path, urlencode(data, doseq=True))
+
+    def request(self, label, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            response = self.send(method, path, body)
+        except (OSError, http.client.HTTPException) as exc:
+            self.recorder.error(label, type(exc).__name__)
+            raise RequestFailed(label) from exc
+        elapsed = time.perf_counter() - start
+        if response.status >= 400:
+            self.recorder.error(label, response.status)
+            raise RequestFailed(f"{label}: {response.status}")
+        self.recorder.record(label, elapsed)
+        return response
+
+    def send(self, method, path, body):
+        headers = {"User-Agent": "catalog-loadtest"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        # The server closes idle keep-alive connections: reconnect once
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.close()
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0":
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+        return Response(response.status, content, response.getheader("Location"))
+
+    def login(self, username, password):
+        self.get("login", "/accounts/login/")
+        self.post(
+            "login", "/accounts/login/", {"username": username, "password": password}
+        )
+        if "sessionid" not in self.cookies:
+            raise RequestFailed(f"login as {username} failed")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
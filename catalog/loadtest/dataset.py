@@ -0,0 +1,130 @@
+"""The data a load test runs against, made with the catalog factories."""
+
+import datetime
+import random
+import uuid
+
+from django.contrib.auth.models import Permission, User
+
+from catalog.constant import LOAN_STATUS
+from catalog.factory import (
+    AuthorFactory,
+    BookFactory,
+    BookInstanceFactory,
+    GenreFactory,
+    UserFactory,
+)
+from catalog.models import Author, Book, BookInstance, Genre
+
+SIZES = {
+    "small": {"genres": 10, "authors": 50, "books": 500, "copies": 2000, "members": 10},
+    "medium": {
+        "genres": 20,
+        "authors": 500,
+        "books": 5000,
+        "copies": 20000,
+        "members": 50,
+    },
+}
+PASSWORD = "loadtest-password"
+MEMBER_PREFIX = "loadtest-member-"
+LIBRARIAN = "loadtest-librarian"
+LIBRARIAN_PERMISSIONS = [
+    "view_list_on_loan",
+    "can_mark_returned",
+    "add_author",
+    "change_author",
+    "delete_author",
+]
+WORDS = (
+    "night garden river city stone winter silver letters house journey fire "
+    "island secret voyage shadow light empire storm dream forest"
+).split()
+
+
+def title(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).capitalize()
+
+
+def seed(counts, rng=None, stdout=None):
+    """Top the catalog up to ``counts`` (see ``SIZES``); return what was added."""
+    rng = rng or random.Random()
+    added = {}
+
+    def missing(name, queryset):
+        added[name] = max(0, counts[name] - queryset.count())
+        return range(added[name])
+
+    for _ in missing("genres", Genre.objects.all()):
+        GenreFactory(name=f"{title(rng)} {uuid.uuid4().hex[:6]}")
+    genres = list(Genre.objects.all())
+
+    for _ in missing("authors", Author.objects.all()):
+        AuthorFactory(first_name=rng.choice(WORDS).title(), last_name=title(rng))
+    authors = list(Author.objects.values_list("pk", flat=True))
+
+    for n in missing("books", Book.objects.all()):
+        BookFactory(
+            title=title(rng),
+            summary=title(rng),
+            isbn=f"9{uuid.uuid4().int % 10 ** 12:012d}",
+            author_id=rng.choice(authors),
+            genres=rng.sample(genres, min(len(genres), 2)),
+        )
+        if stdout and n % 1000 == 999:
+            stdout.write(f"  {n + 1} books")
+
+    members = list(User.objects.filter(username__startswith=MEMBER_PREFIX))
+    for _ in missing(
+        "members", User.objects.filter(username__startswith=MEMBER_PREFIX)
+    ):
+        members.append(
+            UserFactory(
+                username=f"{MEMBER_PREFIX}{uuid.uuid4().hex[:8]}",
+                password=PASSWORD,
+                is_staff=False,
+            )
+        )
+    if not User.objects.filter(username=LIBRARIAN).exists():
+        librarian = UserFactory(username=LIBRARIAN, password=PASSWORD)
+        librarian.user_permissions.set(
+            Permission.objects.filter(codename__in=LIBRARIAN_PERMISSIONS)
+        )
+
+    books = list(Book.objects.values_list("pk", flat=True))
+    statuses = [code for code, _ in LOAN_STATUS]
+    today = datetime.date.today()
+    for n in missing("copies", BookInstance.objects.all()):
+        status = rng.choice(statuses)
+        BookInstanceFactory(
+            book_id=rng.choice(books),
+            imprint=title(rng),
+            status=status,
+            borrower=rng.choice(members) if status == "o" and members else None,
+            due_back=today + datetime.timedelta(days=rng.randint(-30, 30)),
+        )
+        if stdout and n % 1000 == 999:
+            stdout.write(f"  {n + 1} copies")
+    return added
+
+
+class Targets:
+    """Ids and words the scenarios pick from, read once before the run."""
+
+    def __init__(self, sample=2000):
+        self.books = list(Book.objects.values_list("pk", flat=True)[:sample])
+        self.authors = list(Author.objects.values_list("pk", flat=True)[:sample])
+        self.loans = [
+            str(pk)
+            for pk in BookInstance.objects.filter(status="o").values_list(
+                "pk", flat=True
+            )[:sample]
+        ]
+        self.members = list(
+            User.objects.filter(username__startswith=MEMBER_PREFIX).values_list(
+                "username", flat=True
+            )
+        )
+        self.librarian = LIBRARIAN
+        self.book_pages = max(1, Book.objects.count() // 10)
+        self.author_pages = max(1, Author.objects.count() // 10)
@@ -0,0 +1,124 @@
+import collections
+import json
+import threading
+
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def percentile(samples, fraction):
+    """``fraction`` percentile of sorted ``samples``, nearest rank."""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Recorder:
+    """Latencies and errors by label, shared by every session's thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.defaultdict(collections.Counter)
+
+    def record(self, label, seconds):
+        with self.lock:
+            self.latencies[label].append(seconds)
+
+    def error(self, label, reason):
+        with self.lock:
+            self.errors[label][str(reason)] += 1
+
+
+def query_totals(metrics_text):
+    """{route: (queries, requests)} from the site's /metrics output."""
+    totals = collections.defaultdict(lambda: [0.0, 0.0])
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name != "django_db_queries_per_request":
+            continue
+        for sample in family.samples:
+            route = sample.labels.get("route")
+            if sample.name.endswith("_sum"):
+                totals[route][0] += sample.value
+            elif sample.name.endswith("_count"):
+                totals[route][1] += sample.value
+    return totals
+
+
+def queries_per_request(before, after):
+    """Average SQL queries per request by route between two scrapes."""
+    result = {}
+    for route, (queries, requests) in after.items():
+        old_queries, old_requests = before.get(route, (0, 0))
+        if requests > old_requests:
+            result[route] = (queries - old_queries) / (requests - old_requests)
+    return result
+
+
+def stats(latencies, errors, duration, queries=None):
+    samples = sorted(seconds * 1000 for seconds in latencies)
+    row = {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "throughput": len(samples) / duration,
+        "queries_per_request": queries,
+    }
+    if samples:
+        row.update(
+            mean_ms=sum(samples) / len(samples),
+            p50_ms=percentile(samples, 0.5),
+            p95_ms=percentile(samples, 0.95),
+            p99_ms=percentile(samples, 0.99),
+        )
+    if errors:
+        row["error_reasons"] = dict(errors)
+    return row
+
+
+def summarize(recorder, duration, queries):
+    routes = {
+        label: stats(
+            recorder.latencies[label],
+            recorder.errors[label],
+            duration,
+            queries.get(label),
+        )
+        for label in sorted(set(recorder.latencies) | set(recorder.errors))
+    }
+    everything = [s for samples in recorder.latencies.values() for s in samples]
+    errors = sum(recorder.errors.values(), collections.Counter())
+    return {"routes": routes, "total": stats(everything, errors, duration)}
+
+
+def format_row(label, row):
+    if not row["requests"]:
+        return f"{label:<24} no successful requests, {row['errors']} errors"
+    queries = row["queries_per_request"]
+    return (
+        f"{label:<24} {row['requests']:7d} {row['throughput']:8.1f}/s  "
+        f"p50 {row['p50_ms']:7.1f}  p95 {row['p95_ms']:7.1f}  "
+        f"p99 {row['p99_ms']:7.1f} ms  "
+        + (f"{queries:5.1f} q/req  " if queries is not None else " " * 13)
+        + f"errors {row['errors']}"
+    )
+
+
+def format_comparison(label, row, baseline):
+    """How ``row`` moved against the same route in an earlier run."""
+
+    def change(key):
+        if not baseline.get(key) or row.get(key) is None:
+            return "    n/a"
+        return f"{(row[key] - baseline[key]) / baseline[key]:+7.0%}"
+
+    return (
+        f"{label:<24} throughput {change('throughput')}  p50 {change('p50_ms')}  "
+        f"p95 {change('p95_ms')}  p99 {change('p99_ms')}"
+    )
+
+
+def save(result, path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
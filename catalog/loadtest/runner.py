@@ -0,0 +1,97 @@
+import random
+import threading
+import time
+import urllib.request
+
+from django.urls import URLPattern
+
+from catalog import urls as catalog_urls
+from catalog.loadtest.client import RequestFailed, Session
+from catalog.loadtest.dataset import PASSWORD
+from catalog.loadtest.report import (
+    Recorder,
+    query_totals,
+    queries_per_request,
+    summarize,
+)
+from catalog.loadtest.scenarios import MIXES, VISITORS
+
+
+def assign_kinds(mix, users):
+    """Split ``users`` between the visitor kinds of ``mix``, largest first."""
+    shares = sorted(MIXES[mix].items(), key=lambda item: -item[1])
+    kinds = []
+    for kind, share in shares:
+        kinds += [kind] * round(share * users)
+    kinds = (kinds + [shares[0][0]] * users)[:users]
+    return kinds
+
+
+def scrape_queries(base_url):
+    try:
+        with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as response:
+            return query_totals(response.read().decode())
+    except OSError:
+        return {}
+
+
+def visit(session, kind, targets, deadline, think, rng):
+    actions = VISITORS[kind]
+    try:
+        if kind == "member":
+            session.login(rng.choice(targets.members), PASSWORD)
+        elif kind == "librarian":
+            session.login(targets.librarian, PASSWORD)
+    except RequestFailed:
+        return
+    functions, weights = list(actions), list(actions.values())
+    while time.perf_counter() < deadline:
+        action = rng.choices(functions, weights)[0]
+        try:
+            action(session, targets, rng)
+        except RequestFailed:
+            # Recorded by the session; start over with the next action
+            pass
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+    session.close()
+
+
+def run(base_url, targets, mix="mixed", users=10, duration=30, think=0, seed=None):
+    """Run ``users`` virtual users of ``mix`` for ``duration`` seconds."""
+    base_url = base_url.rstrip("/")
+    recorder = Recorder()
+    rng = random.Random(seed)
+    before = scrape_queries(base_url)
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=visit,
+            args=(
+                Session(base_url, recorder),
+                kind,
+                targets,
+                start + duration,
+                think,
+                random.Random(rng.random()),
+            ),
+        )
+        for kind in assign_kinds(mix, users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    queries = queries_per_request(before, scrape_queries(base_url))
+    return summarize(recorder, elapsed, queries)
+
+
+def uncovered_routes(result):
+    """Named routes of ``catalog/urls.py`` the run did not request."""
+    names = {
+        pattern.name
+        for pattern in catalog_urls.urlpatterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    }
+    return sorted(names - set(result["routes"]))
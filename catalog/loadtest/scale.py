@@ -0,0 +1,304 @@
+"""Seed millions of catalog rows quickly, for ``manage.py seed_scale``.
+
+Genres, authors and borrowers go through the factories in bulk mode
+(``catalog.factory.create_batch_bulk``). Books, their genres and their
+copies, nearly all of the rows, are built as plain model instances, which
+is several times faster than a factory build, and inserted in batches,
+optionally from several processes.
+
+Popularity follows Zipf's law: a few authors wrote many of the books, a
+few books have many of the copies and a few members borrow most of them.
+"""
+
+import datetime
+import itertools
+import multiprocessing
+import random
+import time
+
+import factory
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from faker import Faker
+
+from catalog.factory import (
+    AuthorFactory,
+    GenreFactory,
+    UserFactory,
+    create_batch_bulk,
+)
+from catalog.models import Author, Book, BookInstance, CatalogCounter, Genre
+
+# Share of copies in each status, and the loan period around today
+STATUSES = {"a": 0.55, "o": 0.3, "r": 0.1, "m": 0.05}
+LOAN_DAYS = (-30, 28, 14)  # triangular: min, max, most likely
+USER_PREFIX = "scale-"
+
+# What the worker processes need, inherited from the parent when it forks
+_plan = {}
+
+
+def zipf_cum_weights(size, exponent):
+    """Cumulative weights for ``random.choices``; rank 1 is the most popular."""
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, size + 1)))
+
+
+class ZipfChoice:
+    """Pick from ``population`` with Zipf popularity in a random order."""
+
+    def __init__(self, population, exponent, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = zipf_cum_weights(len(self.population), exponent)
+
+    def sample(self, rng, k):
+        return rng.choices(self.population, cum_weights=self.cum_weights, k=k)
+
+
+def isbn_prefix(rng):
+    """A 5 digit ISBN prefix no earlier run used; each run numbers books after it."""
+    while True:
+        prefix = f"2{rng.randrange(10000):04d}"
+        if not Book.objects.filter(isbn__startswith=prefix).exists():
+            return prefix
+
+
+def name_pool(method, size, seed):
+    faker = Faker()
+    faker.seed_instance(seed)
+    return list({getattr(faker, method)() for _ in range(size)})
+
+
+def insert_books(start, count, seed):
+    rng = random.Random(seed)
+    plan = _plan
+    authors = plan["authors"]
+    authors = authors.sample(rng, count) if authors.population else [None] * count
+    words = plan["words"]
+    books = [
+        Book(
+            title=" ".join(rng.sample(words, rng.randint(1, 5))).capitalize(),
+            summary=" ".join(rng.choices(words, k=rng.randint(12, 40))).capitalize(),
+            isbn=f"{plan['isbn_prefix']}{n:08d}",
+            author_id=author,
+        )
+        for n, author in zip(range(start, start + count), authors)
+    ]
+    with transaction.atomic():
+        Book.objects.bulk_create(books, batch_size=plan["batch_size"])
+    return count
+
+
+def insert_book_genres(start, count, seed):
+    rng = random.Random(seed)
+    plan = _plan
+    through = Book.genre.through
+    links = []
+    for book in plan["books"][start : start + count]:
+        genres = set(plan["genres"].sample(rng, rng.randint(1, 3)))
+        links += [through(book_id=book, genre_id=genre) for genre in genres]
+    with transaction.atomic():
+        through.objects.bulk_create(links, batch_size=plan["batch_size"])
+    return len(links)
+
+
+def insert_copies(start, count, seed):
+    rng = random.Random(seed)
+    plan = _plan
+    books = plan["books"]
+    # Every book gets one copy first, then popular books get the rest
+    first = max(0, min(count, len(books) - start))
+    book_ids = books[start : start + first] + plan["popular_books"].sample(
+        rng, count - first
+    )
+    statuses = rng.choices(list(STATUSES), weights=list(STATUSES.values()), k=count)
+    borrowers = plan["borrowers"]
+    borrowers = borrowers.sample(rng, count) if borrowers.population else []
+    imprints = plan["imprints"]
+    today = datetime.date.today()
+    copies = []
+    for n, (book, status) in enumerate(zip(book_ids, statuses)):
+        due_back = borrower = None
+        if status == "o":
+            due_back = today + datetime.timedelta(
+                days=round(rng.triangular(*LOAN_DAYS))
+            )
+            borrower = borrowers[n] if borrowers else None
+        elif status == "r":
+            due_back = today + datetime.timedelta(days=rng.randint(1, 14))
+        copies.append(
+            BookInstance(
+                book_id=book,
+                imprint=rng.choice(imprints),
+                status=status,
+                due_back=due_back,
+                borrower_id=borrower,
+            )
+        )
+    with transaction.atomic():
+        BookInstance.objects.bulk_create(copies, batch_size=plan["batch_size"])
+    return count
+
+
+def _run_chunk(task):
+    function, start, count, seed = task
+    return function(start, count, seed)
+
+
+class ScaleSeeder:
+    """Add ``counts`` rows (genres, authors, users, books, copies)."""
+
+    def __init__(
+        self,
+        counts,
+        workers=1,
+        batch_size=5000,
+        chunk_size=50000,
+        exponent=1.1,
+        seed=None,
+        stdout=None,
+    ):
+        self.counts = counts
+        self.workers = workers
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.exponent = exponent
+        self.rng = random.Random(seed)
+        self.stdout = stdout
+        self.timings = {}
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def run(self):
+        _plan.clear()
+        _plan["batch_size"] = self.batch_size
+        self.phase("genres", self.seed_genres)
+        self.phase("authors", self.seed_authors)
+        self.phase("users", self.seed_users)
+        self.phase("books", self.seed_books)
+        self.phase("book genres", self.seed_book_genres)
+        self.phase("copies", self.seed_copies)
+        # bulk_create skips the signals that keep the home page counters
+        CatalogCounter.reconcile()
+        return self.timings
+
+    def phase(self, name, function):
+        start = time.perf_counter()
+        rows = function()
+        elapsed = time.perf_counter() - start
+        self.timings[name] = (rows, elapsed)
+        if rows:
+            self.log(f"{name}: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f}/s)")
+
+    def seed_genres(self):
+        count = self.counts["genres"]
+        if not count:
+            return 0
+        names = [word.title() for word in name_pool("word", 500, self.rng.random())]
+        create_batch_bulk(
+            GenreFactory,
+            count,
+            name=factory.Iterator(names),
+            batch_size=self.batch_size,
+        )
+        return count
+
+    def seed_authors(self):
+        count = self.counts["authors"]
+        if not count:
+            return 0
+        # Cycling two pools of names pairs them up in many combinations
+        # without calling Faker for every author
+        create_batch_bulk(
+            AuthorFactory,
+            count,
+            first_name=factory.Iterator(
+                name_pool("first_name", 997, self.rng.random())
+            ),
+            last_name=factory.Iterator(name_pool("last_name", 2999, self.rng.random())),
+            batch_size=self.batch_size,
+        )
+        return count
+
+    def seed_users(self):
+        count = self.counts["users"]
+        if not count:
+            return 0
+        run = f"{USER_PREFIX}{self.rng.randrange(16**6):06x}-"
+        create_batch_bulk(
+            UserFactory,
+            count,
+            username=factory.Sequence(f"{run}{{}}".format),
+            email=factory.Sequence(f"{run}{{}}@example.com".format),
+            # Hashing a password costs a quarter second; these never log in
+            password=factory.PostGenerationMethodCall("set_unusable_password"),
+            is_staff=False,
+            batch_size=self.batch_size,
+        )
+        return count
+
+    def seed_books(self):
+        _plan["authors"] = ZipfChoice(
+            Author.objects.values_list("pk", flat=True), 1.0, self.rng
+        )
+        _plan["words"] = name_pool("word", 2000, self.rng.random())
+        _plan["isbn_prefix"] = isbn_prefix(self.rng)
+        count = self.parallel(insert_books, self.counts["books"])
+        _plan["books"] = list(
+            Book.objects.filter(isbn__startswith=_plan["isbn_prefix"])
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        return count
+
+    def seed_book_genres(self):
+        _plan["genres"] = ZipfChoice(
+            Genre.objects.values_list("pk", flat=True), 1.0, self.rng
+        )
+        if not _plan["genres"].population or not _plan["books"]:
+            return 0
+        return self.parallel(insert_book_genres, len(_plan["books"]))
+
+    def seed_copies(self):
+        books = _plan.get("books") or list(Book.objects.values_list("pk", flat=True))
+        if not books:
+            return 0
+        _plan["books"] = books
+        _plan["popular_books"] = ZipfChoice(books, self.exponent, self.rng)
+        borrowers = User.objects.filter(username__startswith=USER_PREFIX)
+        _plan["borrowers"] = ZipfChoice(
+            borrowers.values_list("pk", flat=True), 0.8, self.rng
+        )
+        _plan["imprints"] = name_pool("company", 500, self.rng.random())
+        return self.parallel(insert_copies, self.counts["copies"])
+
+    def parallel(self, function, total):
+        """Run ``function`` over ``total`` items in chunks; return the rows added."""
+        tasks = [
+            (function, start, min(self.chunk_size, total - start), self.rng.random())
+            for start in range(0, total, self.chunk_size)
+        ]
+        if self.workers > 1 and len(tasks) > 1:
+            # Children inherit _plan; they must not share the parent's socket
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with context.Pool(self.workers) as pool:
+                return self.progress(pool.imap_unordered(_run_chunk, tasks), tasks)
+        return self.progress(map(_run_chunk, tasks), tasks)
+
+    def progress(self, results, tasks):
+        rows = 0
+        for done, added in enumerate(results, 1):
+            rows += added
+            if len(tasks) > 1:
+                self.log(f"  {done}/{len(tasks)} chunks")
+        return rows
+
+
+def can_fork():
+    """Several processes only help a server database; SQLite takes one writer."""
+    return connection.vendor != "sqlite" and "fork" in (
+        multiprocessing.get_all_start_methods()
+    )
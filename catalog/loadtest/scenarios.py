@@ -0,0 +1,138 @@
+"""What each kind of visitor does, and the mixes of visitors to run.
+
+An action makes one or more requests, each recorded under the URL name of
+the page it hits. Every named route in ``catalog/urls.py`` is used by at
+least one action.
+"""
+
+import datetime
+
+from django.urls import reverse
+
+from catalog.loadtest.dataset import WORDS
+
+
+def home(session, targets, rng):
+    session.get("index", reverse("index"))
+
+
+def book_list(session, targets, rng):
+    params = {"page": rng.randint(1, min(targets.book_pages, 20))}
+    if rng.random() < 0.2:
+        params["available"] = 1
+    session.get("books", reverse("books"), params)
+
+
+def book_detail(session, targets, rng):
+    session.get("book-detail", reverse("book-detail", args=[rng.choice(targets.books)]))
+
+
+def author_list(session, targets, rng):
+    params = {"page": rng.randint(1, min(targets.author_pages, 20))}
+    session.get("authors", reverse("authors"), params)
+
+
+def author_detail(session, targets, rng):
+    pk = rng.choice(targets.authors)
+    session.get("author-detail", reverse("author-detail", args=[pk]))
+
+
+def search(session, targets, rng):
+    session.get("book-search", reverse("book-search"), {"q": rng.choice(WORDS)})
+
+
+def autocomplete(session, targets, rng):
+    word = rng.choice(WORDS)
+    session.get(
+        "autocomplete", reverse("autocomplete"), {"q": word[: rng.randint(2, 4)]}
+    )
+
+
+def switch_language(session, targets, rng):
+    session.post(
+        "set_language",
+        reverse("set_language"),
+        {"language": rng.choice(["en", "vi"]), "next": reverse("index")},
+    )
+
+
+def my_borrowed(session, targets, rng):
+    session.get("my-borrowed", reverse("my-borrowed"))
+
+
+def manage_loans(session, targets, rng):
+    session.get("bookinst-manage", reverse("bookinst-manage"))
+
+
+def renew(session, targets, rng):
+    url = reverse("renew-book-librarian", args=[rng.choice(targets.loans)])
+    session.get("renew-book-librarian", url)
+    due_back = datetime.date.today() + datetime.timedelta(days=rng.randint(7, 21))
+    session.post("renew-book-librarian", url, {"due_back": due_back.isoformat()})
+
+
+def bulk_renew(session, targets, rng):
+    due_back = datetime.date.today() + datetime.timedelta(days=rng.randint(7, 21))
+    session.post(
+        "bookinst-manage-bulk",
+        reverse("bookinst-manage-bulk"),
+        {
+            "action": "renew",
+            "scope": "selected",
+            "copies": rng.sample(targets.loans, min(len(targets.loans), 5)),
+            "due_back": due_back.isoformat(),
+        },
+    )
+
+
+def export(session, targets, rng):
+    session.get(
+        "bookinst-export", reverse("bookinst-export"), {"format": "csv", "status": "o"}
+    )
+
+
+def edit_author(session, targets, rng):
+    """Create an author, rename them, then delete them again."""
+    fields = {
+        "first_name": "Load",
+        "last_name": "Test",
+        "date_of_birth": "",
+        "date_of_death": "",
+    }
+    location = session.post("author-create", reverse("author-create"), fields).location
+    pk = int(location.rstrip("/").rsplit("/", 1)[-1])
+    update = reverse("author-update", args=[pk])
+    session.get("author-update", update)
+    session.post("author-update", update, dict(fields, last_name="Tested"))
+    session.post("author-delete", reverse("author-delete", args=[pk]), {})
+
+
+BROWSING = {
+    home: 15,
+    book_list: 20,
+    book_detail: 25,
+    author_list: 8,
+    author_detail: 10,
+    search: 10,
+    autocomplete: 10,
+    switch_language: 2,
+}
+VISITORS = {
+    "anonymous": BROWSING,
+    "member": {**BROWSING, my_borrowed: 20},
+    "librarian": {
+        manage_loans: 30,
+        renew: 20,
+        bulk_renew: 10,
+        export: 5,
+        edit_author: 10,
+        book_detail: 15,
+        author_detail: 10,
+    },
+}
+# Share of the virtual users of each kind
+MIXES = {
+    "browse": {"anonymous": 1},
+    "mixed": {"anonymous": 0.7, "member": 0.2, "librarian": 0.1},
+    "staff": {"librarian": 1},
+}
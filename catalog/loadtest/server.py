@@ -0,0 +1,33 @@
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+CONFIG = str(settings.BASE_DIR / "gunicorn.conf.py")
+
+
+def start_server(args, port, env, label="server"):
+    """Start ``gunicorn args`` on 127.0.0.1:``port``; return once it accepts."""
+    command = [sys.executable, "-m", "gunicorn", *args]
+    command += ["--bind", f"127.0.0.1:{port}"]
+    command += ["--backlog", "4096", "--log-level", "warning"]
+    server = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f"{label} exited with {server.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise CommandError(f"{label} did not start")
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait()
@@ -0,0 +1,38 @@
+"""Bulk loan changes for the librarian console.
+
+Each function takes a queryset of copies and changes them all with one
+``UPDATE`` inside a transaction, whatever the number of rows. ``update()``
+skips the model signals, so the book ``updated_at`` and the counter row are
+kept up to date here instead.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.models import Book, CatalogCounter
+
+ON_LOAN = "o"
+AVAILABLE = "a"
+
+
+def mark_returned(copies):
+    """Put the copies on loan among ``copies`` back on the shelf."""
+    copies = copies.filter(status=ON_LOAN)
+    with transaction.atomic():
+        Book.objects.filter(pk__in=copies.values("book_id")).touch()
+        returned = copies.update(
+            status=AVAILABLE,
+            borrower=None,
+            due_back=None,
+            updated_at=timezone.now(),
+        )
+        CatalogCounter.increment(num_instances_available=returned)
+    return returned
+
+
+def renew(copies, due_back):
+    """Move the due date of the copies on loan among ``copies``."""
+    copies = copies.filter(status=ON_LOAN)
+    with transaction.atomic():
+        Book.objects.filter(pk__in=copies.values("book_id")).touch()
+        return copies.update(due_back=due_back, updated_at=timezone.now())
@@ -0,0 +1,246 @@
+"""Logging that keeps file and stream writes off the request thread.
+
+``BackgroundHandler`` only puts records on a queue; a listener thread
+formats and writes them, to stdout or a rotating file. Records carry the
+id and URL name of the request that logged them (see
+``catalog.middleware.RequestLogMiddleware``), which ``JsonFormatter``
+writes out as one JSON object per line. The module only needs the
+standard library, so ``settings.LOGGING`` can load it before the apps.
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_context = ContextVar("log_context", default=None)
+_handlers = weakref.WeakSet()
+# Types of values that cannot change once logged: a record whose arguments
+# are all of these exact types (a subclass could add mutable state) can have
+# its message rendered later, on the listener thread
+_IMMUTABLE = frozenset(
+    {
+        str,
+        int,
+        float,
+        bool,
+        bytes,
+        type(None),
+        decimal.Decimal,
+        datetime.date,
+        datetime.datetime,
+        datetime.time,
+        datetime.timedelta,
+        uuid.UUID,
+    }
+)
+
+
+class LogContext:
+    """What records logged while handling a request are tagged with."""
+
+    __slots__ = ("request_id", "route")
+
+    def __init__(self, request_id, route=None):
+        self.request_id = request_id
+        self.route = route
+
+
+@contextmanager
+def log_context(request_id=None):
+    """Tag the records logged inside the block; yield the ``LogContext``."""
+    context = LogContext(request_id or os.urandom(16).hex())
+    token = _context.set(context)
+    try:
+        yield context
+    finally:
+        _context.reset(token)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep ``rate`` of the records below WARNING and every other record."""
+
+    def __init__(self, rate=1.0, name=""):
+        super().__init__(name)
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the ``extra`` fields it was given."""
+
+    # Attributes of every LogRecord; the others came from ``extra``
+    reserved = frozenset(
+        vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+        | {"message", "asctime", "request_id", "route"}
+    )
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in self.reserved and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class Listener(logging.handlers.QueueListener):
+    def handle(self, record):
+        if isinstance(record, threading.Event):
+            record.set()  # see BackgroundHandler.flush
+        else:
+            super().handle(record)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """Hand records to a listener thread that writes them.
+
+    The listener writes to ``stream`` (stdout by default) or, with
+    ``filename``, to a file rotated every ``max_bytes`` or, with ``when``,
+    on a schedule (see ``TimedRotatingFileHandler``). ``{pid}`` in the
+    filename gives every process its own file, which several gunicorn
+    workers need to rotate safely.
+
+    When ``queue_size`` records are waiting, records below WARNING are
+    dropped and counted in ``dropped``.
+    """
+
+    def __init__(
+        self,
+        filename=None,
+        max_bytes=0,
+        when=None,
+        backup_count=5,
+        stream=None,
+        queue_size=10000,
+    ):
+        super().__init__(queue.SimpleQueue())
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.when = when
+        self.backup_count = backup_count
+        self.stream = stream
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.closed = False
+        self.target = self.open_target()
+        self.start()
+        _handlers.add(self)
+
+    def open_target(self):
+        if not self.filename:
+            return logging.StreamHandler(self.stream or sys.stdout)
+        filename = self.filename.format(pid=os.getpid())
+        if self.when:
+            return logging.handlers.TimedRotatingFileHandler(
+                filename, when=self.when, backupCount=self.backup_count, delay=True
+            )
+        return logging.handlers.RotatingFileHandler(
+            filename,
+            maxBytes=self.max_bytes,
+            backupCount=self.backup_count,
+            delay=True,
+        )
+
+    def start(self):
+        self.listener = Listener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Add the request context to ``record`` and return it for the queue.
+
+        The record is changed in place, without QueueHandler's copy: the root
+        logger has no other handler, and nothing here alters the formatted
+        output.
+        """
+        # django.request logs error responses after the middleware returned,
+        # passing the request along
+        context = _context.get() or getattr(
+            getattr(record, "request", None), "log_context", None
+        )
+        record.request_id = context.request_id if context else None
+        record.route = context.route if context else None
+        # Formatting, tracebacks included, is left to the listener. Only a
+        # message with arguments that may change once the caller moves on
+        # (a list of SQL parameters, a model instance) is rendered here.
+        args = record.args or ()
+        if type(args) is dict:
+            args = args.values()
+        if type(record.msg) is not str or not _IMMUTABLE.issuperset(map(type, args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        if record.levelno < logging.WARNING and self.queue.qsize() >= self.queue_size:
+            self.dropped += 1
+        else:
+            self.queue.put(record)
+
+    def flush(self, timeout=10):
+        """Wait until the listener has written everything queued so far."""
+        if not self.closed:
+            written = threading.Event()
+            self.queue.put(written)
+            written.wait(timeout)
+            self.target.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.listener.stop()
+            self.target.close()
+        super().close()
+
+    def after_fork(self):
+        if self.closed:
+            return
+        # The parent's listener thread is gone, and may have held the
+        # queue's lock when the process forked
+        self.queue = queue.SimpleQueue()
+        if self.filename and "{pid}" in self.filename:
+            formatter = self.target.formatter
+            self.target.close()
+            self.target = self.open_target()
+            self.target.setFormatter(formatter)
+        self.start()
+
+
+def _restart_listeners():
+    for handler in list(_handlers):
+        handler.after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners)
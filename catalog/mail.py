@@ -0,0 +1,99 @@
+"""Email sent from background jobs instead of the request cycle.
+
+With ``EMAIL_BACKEND = "catalog.mail.QueuedEmailBackend"`` sending a message
+only stores a job; ``manage.py run_worker`` delivers it later through
+``QUEUED_EMAIL_BACKEND`` (SMTP in production) and retries on failure.
+"""
+
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from catalog import jobs
+
+EMAIL_QUEUE = "email"
+# What a message that could not be delivered keeps, see scrub()
+ENVELOPE = ("subject", "from_email", "to", "cc", "bcc", "reply_to")
+
+
+def serialize(message):
+    """A JSON-safe dict with everything needed to rebuild ``message``."""
+    return {
+        "subject": message.subject,
+        "body": message.body,
+        "from_email": message.from_email,
+        "to": message.to,
+        "cc": message.cc,
+        "bcc": message.bcc,
+        "reply_to": message.reply_to,
+        "headers": message.extra_headers,
+        "content_subtype": message.content_subtype,
+        "alternatives": getattr(message, "alternatives", []),
+        "attachments": [
+            serialize_attachment(attachment) for attachment in message.attachments
+        ],
+    }
+
+
+def serialize_attachment(attachment):
+    if not isinstance(attachment, tuple):
+        raise ValueError(
+            "Only (filename, content, mimetype) attachments can be queued."
+        )
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode()
+    return filename, base64.b64encode(content).decode(), mimetype
+
+
+def deserialize(data):
+    data = dict(data)
+    content_subtype = data.pop("content_subtype")
+    attachments = data.pop("attachments")
+    # JSON turned the (content, mimetype) tuples into lists
+    data["alternatives"] = [tuple(alternative) for alternative in data["alternatives"]]
+    message = EmailMultiAlternatives(**data)
+    message.content_subtype = content_subtype
+    for filename, content, mimetype in attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def scrub(payload):
+    """Drop the content of a message that failed for good, keep the envelope.
+
+    Password reset mails carry the reset link in their body, which must not
+    stay readable in the jobs table and the admin.
+    """
+    message = payload["message"]
+    return dict(payload, message={key: message[key] for key in ENVELOPE})
+
+
+@jobs.scrub_on_failure(scrub)
+def send_email(message, fail_silently=False):
+    """Job: deliver a serialized message; an exception makes the job retry."""
+    if "body" not in message:
+        raise ValueError("The message was scrubbed after failing, send it again.")
+    connection = get_connection(
+        getattr(
+            settings,
+            "QUEUED_EMAIL_BACKEND",
+            "django.core.mail.backends.smtp.EmailBackend",
+        ),
+        fail_silently=fail_silently,
+    )
+    connection.send_messages([deserialize(message)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            jobs.enqueue(
+                send_email,
+                queue=EMAIL_QUEUE,
+                message=serialize(message),
+                fail_silently=self.fail_silently,
+            )
+        return len(email_messages)
@@ -0,0 +1,86 @@
+"""Helpers shared by the benchmark management commands."""
+
+import datetime
+import random
+import statistics
+import time
+import uuid
+
+from catalog.constant import LOAN_STATUS
+from catalog.models import Author, Book, BookInstance
+
+STATUSES = [code for code, _ in LOAN_STATUS]
+
+
+def seed_book_instances(
+    total, batch_size=10000, books=1000, borrower_ids=(), stdout=None
+):
+    """Top the BookInstance table up to ``total`` rows with bulk inserts.
+
+    Copies on loan get a random borrower from ``borrower_ids``. Signals are
+    bypassed, so run ``reconcile_counters`` afterwards.
+    """
+    missing = total - BookInstance.objects.count()
+    if missing <= 0:
+        return 0
+    author, _ = Author.objects.get_or_create(first_name="Bench", last_name="Seed")
+    book_ids = list(Book.objects.values_list("id", flat=True)[:books])
+    if len(book_ids) < books:
+        Book.objects.bulk_create(
+            Book(
+                title=f"Benchmark book {n}",
+                summary="Seeded for benchmarks",
+                isbn=f"9{uuid.uuid4().int % 10 ** 12:012d}",
+                author=author,
+            )
+            for n in range(books - len(book_ids))
+        )
+        book_ids = list(Book.objects.values_list("id", flat=True)[:books])
+    today = datetime.date.today()
+    created = 0
+    while created < missing:
+        size = min(batch_size, missing - created)
+        instances = []
+        for _ in range(size):
+            status = random.choice(STATUSES)
+            instances.append(
+                BookInstance(
+                    book_id=random.choice(book_ids),
+                    imprint="Benchmark imprint",
+                    status=status,
+                    borrower_id=(
+                        random.choice(borrower_ids)
+                        if status == "o" and borrower_ids
+                        else None
+                    ),
+                    due_back=today + datetime.timedelta(days=random.randint(-60, 60)),
+                )
+            )
+        BookInstance.objects.bulk_create(instances)
+        created += size
+        if stdout:
+            stdout.write(f"  seeded {created}/{missing} copies")
+    return created
+
+
+def timed(func, repeat):
+    """Run ``func`` ``repeat`` times and return timing stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def format_stats(label, stats):
+    return (
+        f"{label:<28} mean {stats['mean']:8.3f} ms  p50 {stats['p50']:8.3f} ms  "
+        f"p95 {stats['p95']:8.3f} ms  max {stats['max']:8.3f} ms"
+    )
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from catalog.admin import BookAdmin, BookInstanceAdmin, LargeTableAdmin
+from catalog.models import Book, BookInstance, CatalogCounter
+from catalog.pagination import estimated_count
+from catalog.query_budget import count_queries
+from ._bench import format_stats, seed_book_instances, timed
+
+
+def old_display_genre(book):
+    return ", ".join(genre.name for genre in book.genre.all()[:3])
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the Book and BookInstance admin changelists as they were (a query "
+        "per row, exact counts) against the current ones. Seeds BookInstance "
+        "rows up to --instances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instances", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Benchmark the existing data without inserting rows.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["no_seed"]:
+            self.stdout.write(f"Seeding up to {options['instances']} copies...")
+            seed_book_instances(options["instances"], stdout=self.stdout)
+            CatalogCounter.reconcile()
+        if connection.vendor == "sqlite":
+            # MySQL keeps table statistics by itself
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        admin_user, _ = User.objects.get_or_create(
+            username="benchmark-admin", defaults={"is_staff": True}
+        )
+        admin_user.is_superuser = admin_user.is_staff = True
+        admin_user.save()
+        client = Client()
+        client.force_login(admin_user)
+
+        self.stdout.write(
+            f"{BookInstance._meta.db_table}: estimated "
+            f"{estimated_count(BookInstance)} rows"
+        )
+        pages = {
+            "books": reverse("admin:catalog_book_changelist"),
+            "copies": reverse("admin:catalog_bookinstance_changelist"),
+            "copies on loan": reverse("admin:catalog_bookinstance_changelist")
+            + "?status__exact=o",
+        }
+        before = [
+            mock.patch.multiple(
+                LargeTableAdmin, paginator=Paginator, show_full_result_count=True
+            ),
+            mock.patch.multiple(
+                BookInstanceAdmin, list_select_related=False, ordering=None
+            ),
+            mock.patch.multiple(
+                BookAdmin,
+                list_select_related=False,
+                get_changelist=LargeTableAdmin.get_changelist,
+            ),
+            mock.patch.object(Book, "display_genre", old_display_genre),
+        ]
+        for label, patches in (("before", before), ("after", [])):
+            for patch in patches:
+                patch.start()
+            try:
+                for page, url in pages.items():
+                    self.run_page(client, f"{page} ({label})", url, options["repeat"])
+            finally:
+                for patch in patches:
+                    patch.stop()
+
+    def run_page(self, client, label, url, repeat):
+        with count_queries() as queries:
+            response = client.get(url)
+        assert response.status_code == 200, response.status_code
+        stats = timed(lambda: client.get(url), repeat)
+        self.stdout.write(format_stats(f"{label}, {queries.count} queries", stats))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from unittest import mock
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from catalog.models import CatalogCounter
+from ._bench import format_stats, seed_book_instances, timed
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the four COUNT queries the home page used to run with the "
+        "denormalized counter row. Seeds BookInstance rows up to --instances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instances", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Benchmark the existing data without inserting rows.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["no_seed"]:
+            self.stdout.write(f"Seeding up to {options['instances']} copies...")
+            seed_book_instances(options["instances"], stdout=self.stdout)
+        CatalogCounter.reconcile()
+        repeat = options["repeat"]
+
+        with CaptureQueriesContext(connection) as count_queries:
+            CatalogCounter.compute()
+        with CaptureQueriesContext(connection) as counter_queries:
+            CatalogCounter.load()
+
+        self.stdout.write(
+            format_stats(
+                f"COUNT queries ({len(count_queries)})",
+                timed(CatalogCounter.compute, repeat),
+            )
+        )
+        self.stdout.write(
+            format_stats(
+                f"counter row ({len(counter_queries)})",
+                timed(CatalogCounter.load, repeat),
+            )
+        )
+
+        client = Client()
+        url = reverse("index")
+        client.get(url)
+        # The pre-counter view, reproduced by serving the counts from COUNT(*)
+        with mock.patch.object(
+            CatalogCounter,
+            "load",
+            lambda: CatalogCounter(**CatalogCounter.compute()),
+        ):
+            self.stdout.write(
+                format_stats(
+                    "index view (COUNT queries)",
+                    timed(lambda: client.get(url), repeat),
+                )
+            )
+        self.stdout.write(
+            format_stats(
+                "index view (counter row)", timed(lambda: client.get(url), repeat)
+            )
+        )
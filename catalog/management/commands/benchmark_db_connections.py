@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.utils import ConnectionHandler
+
+from catalog.management.commands._bench import format_stats
+
+POOLED_ENGINES = {
+    "django.db.backends.mysql": "catalog.db.mysql",
+    "django.db.backends.sqlite3": "catalog.db.sqlite3",
+}
+MODES = ["close", "persistent", "pool"]
+
+
+def stats(samples):
+    samples = sorted(samples)
+    return {
+        "mean": sum(samples) / len(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time simulated requests (connection checks at request start and end "
+        "around a few queries) against the default database with a new "
+        "connection per request (close), CONN_MAX_AGE (persistent) and the "
+        "connection pool (pool)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            action="append",
+            dest="modes",
+            choices=MODES,
+            help="Connection handling to time (repeatable). Default: all.",
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--queries", type=int, default=3)
+        parser.add_argument(
+            "--thread-per-request",
+            action="store_true",
+            help="Run every request in a new thread, as under ASGI.",
+        )
+
+    def handle(self, *args, **options):
+        base = settings.DATABASES["default"]
+        self.stdout.write(
+            f"{options['requests']} requests of {options['queries']} queries on "
+            f"{base['ENGINE']}, {options['threads']} threads"
+            + (", a new thread per request" if options["thread_per_request"] else "")
+        )
+        for mode in options["modes"] or MODES:
+            database = dict(base, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=True)
+            if mode == "persistent":
+                database["CONN_MAX_AGE"] = 60
+            elif mode == "pool":
+                database["ENGINE"] = POOLED_ENGINES[base["ENGINE"]]
+                database["POOL"] = dict(base.get("POOL", {}), SIZE=options["threads"])
+            # Its own alias, so it gets its own pool
+            alias = f"benchmark_{mode}"
+            connections = ConnectionHandler({"default": base, alias: database})
+            samples = self.run(connections, alias, options)
+            self.stdout.write(format_stats(mode, stats(samples)))
+
+    def run(self, connections, alias, options):
+        samples = []
+        lock = threading.Lock()
+
+        def request():
+            connection = connections[alias]
+            start = time.perf_counter()
+            # What django.db.close_old_connections does on request_started
+            # and request_finished
+            connection.close_if_unusable_or_obsolete()
+            with connection.cursor() as cursor:
+                for _ in range(options["queries"]):
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                samples.append(elapsed)
+
+        def thread_requests(count):
+            try:
+                for _ in range(count):
+                    request()
+            finally:
+                connections[alias].close()
+
+        per_thread = options["requests"] // options["threads"]
+        with ThreadPoolExecutor(options["threads"]) as executor:
+            if options["thread_per_request"]:
+                # Thread-local connections die with their thread, as an
+                # ASGI request's do
+                for _ in range(per_thread):
+                    list(
+                        executor.map(
+                            lambda _: self.in_new_thread(thread_requests),
+                            range(options["threads"]),
+                        )
+                    )
+            else:
+                list(executor.map(thread_requests, [per_thread] * options["threads"]))
+        return samples
+
+    def in_new_thread(self, thread_requests):
+        thread = threading.Thread(target=thread_requests, args=(1,))
+        thread.start()
+        thread.join()
@@ -0,0 +1,132 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+from catalog.models import BookInstance
+from ._bench import format_stats, seed_book_instances, timed
+
+# The indexes the loan queries were tuned with; the others stay in place
+LOAN_INDEXES = ("bookinst_borrower_status_due", "bookinst_status_due")
+# Stands in for the borrower foreign key index while the composite that
+# replaced it is dropped: MySQL refuses to drop the only index backing a
+# foreign key, and it is the index the table had before the loan indexes
+BORROWER_INDEX = models.Index(fields=["borrower"], name="bookinst_bench_borrower")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed BookInstance rows, then print EXPLAIN output and timings of the "
+        "loan queries without and with the composite loan indexes. The indexes "
+        "are dropped and rebuilt, so only run this against a benchmark database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instances", type=int, default=1_000_000)
+        parser.add_argument("--borrowers", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--no-seed", action="store_true")
+
+    def handle(self, *args, **options):
+        borrowers = self.get_borrowers(options["borrowers"])
+        if not options["no_seed"]:
+            self.stdout.write(f"Seeding up to {options['instances']} copies...")
+            seed_book_instances(
+                options["instances"], borrower_ids=borrowers, stdout=self.stdout
+            )
+        self.analyze()
+        borrower = (
+            BookInstance.objects.filter(status="o", borrower__isnull=False)
+            .values_list("borrower_id", flat=True)
+            .first()
+        )
+        queries = {
+            "my-borrowed": lambda: list(
+                BookInstance.objects.filter(borrower=borrower, status="o").order_by(
+                    "due_back", "pk"
+                )[:10]
+            ),
+            "bookinst-manage": lambda: list(
+                BookInstance.objects.filter(status="o").order_by("-due_back", "-pk")[
+                    :10
+                ]
+            ),
+            "available count": lambda: BookInstance.objects.filter(
+                status__exact="a"
+            ).count(),
+        }
+
+        indexes = [
+            index for index in BookInstance._meta.indexes if index.name in LOAN_INDEXES
+        ]
+        try:
+            self.drop_indexes(indexes)
+            self.report("without loan indexes", queries, options["repeat"])
+        finally:
+            self.create_indexes(indexes)
+        self.analyze()
+        self.report("with loan indexes", queries, options["repeat"])
+
+    def get_borrowers(self, count):
+        existing = list(
+            User.objects.filter(username__startswith="bench-borrower-").values_list(
+                "id", flat=True
+            )
+        )
+        User.objects.bulk_create(
+            User(username=f"bench-borrower-{n}") for n in range(len(existing), count)
+        )
+        return list(
+            User.objects.filter(username__startswith="bench-borrower-").values_list(
+                "id", flat=True
+            )
+        )
+
+    def existing_indexes(self):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(
+                cursor, BookInstance._meta.db_table
+            )
+
+    def drop_indexes(self, indexes):
+        existing = self.existing_indexes()
+        with connection.schema_editor() as editor:
+            if BORROWER_INDEX.name not in existing:
+                editor.add_index(BookInstance, BORROWER_INDEX)
+            for index in indexes:
+                if index.name in existing:
+                    editor.remove_index(BookInstance, index)
+
+    def create_indexes(self, indexes):
+        existing = self.existing_indexes()
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                if index.name not in existing:
+                    editor.add_index(BookInstance, index)
+            if BORROWER_INDEX.name in existing:
+                editor.remove_index(BookInstance, BORROWER_INDEX)
+
+    def analyze(self):
+        table = connection.ops.quote_name(BookInstance._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+            elif connection.vendor == "sqlite":
+                cursor.execute(f"ANALYZE {table}")
+
+    def explain(self, func):
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        sql = captured.captured_queries[-1]["sql"]
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+            return "\n".join(
+                "    " + " | ".join(str(col) for col in row)
+                for row in cursor.fetchall()
+            )
+
+    def report(self, title, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for label, func in queries.items():
+            self.stdout.write(format_stats(label, timed(func, repeat)))
+            self.stdout.write(self.explain(func))
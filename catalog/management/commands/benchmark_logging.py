@@ -0,0 +1,111 @@
+import logging
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from catalog.log import BackgroundHandler, JsonFormatter, SamplingFilter
+from catalog.middleware import RequestLogMiddleware
+from ._bench import format_stats, timed
+
+OLD_FORMAT = "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time what logging costs the thread that logs: the old synchronous "
+        "FileHandler against the queued BackgroundHandler, per record and for "
+        "a request through RequestLogMiddleware."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix="benchmark-logging-")
+        try:
+            self.per_record(directory, options["records"])
+            self.per_request(directory, options["repeat"])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def handlers(self, directory):
+        old = logging.FileHandler(f"{directory}/old.log")
+        old.setFormatter(logging.Formatter(OLD_FORMAT))
+        background = BackgroundHandler(filename=f"{directory}/new.log", max_bytes=0)
+        background.setFormatter(JsonFormatter())
+        sampled = BackgroundHandler(filename=f"{directory}/sampled.log")
+        sampled.setFormatter(JsonFormatter())
+        sampled.addFilter(SamplingFilter(0.01))
+        return {
+            "FileHandler": old,
+            "queued, JSON": background,
+            "queued, 1% sampled": sampled,
+        }
+
+    def per_record(self, directory, records):
+        logger = logging.getLogger("benchmark_logging")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        handlers = self.handlers(directory)
+        paused = BackgroundHandler(filename=f"{directory}/paused.log", max_bytes=0)
+        paused.setFormatter(JsonFormatter())
+        paused.queue_size = records
+        # With one core the listener takes turns with the logging thread;
+        # stopped, it leaves the caller's own cost
+        paused.listener.stop()
+        handlers["queued, listener paused"] = paused
+        for label, handler in handlers.items():
+            logger.handlers = [handler]
+            start = time.perf_counter()
+            for n in range(records):
+                logger.debug("(%.3f) SELECT %s FROM catalog_book", 0.001, n)
+            caller = time.perf_counter() - start
+            if handler is paused:
+                handler.start()
+            handler.flush()
+            written = time.perf_counter() - start
+            handler.close()
+            dropped = getattr(handler, "dropped", 0)
+            self.stdout.write(
+                f"{label:<24} {caller / records * 1e6:7.2f} us per record on the "
+                f"caller, {written / records * 1e6:7.2f} us written"
+                + (f", {dropped} dropped" if dropped else "")
+            )
+        logger.handlers = []
+
+    def per_request(self, directory, repeat):
+        factory = RequestFactory()
+
+        def view(request):
+            return HttpResponse()
+
+        middleware = RequestLogMiddleware(view)
+        self.stdout.write(
+            format_stats("view alone", timed(lambda: view(factory.get("/")), repeat))
+        )
+        access_logger = logging.getLogger("catalog.access")
+        level = access_logger.level
+        access_logger.setLevel(logging.WARNING)
+        self.stdout.write(
+            format_stats(
+                "+ middleware, no log",
+                timed(lambda: middleware(factory.get("/")), repeat),
+            )
+        )
+        access_logger.setLevel(logging.INFO)
+        try:
+            for label, handler in self.handlers(directory).items():
+                with mock.patch.multiple(
+                    access_logger, handlers=[handler], propagate=False
+                ):
+                    stats = timed(lambda: middleware(factory.get("/")), repeat)
+                handler.close()
+                self.stdout.write(format_stats(f"+ access log, {label}", stats))
+        finally:
+            access_logger.setLevel(level)
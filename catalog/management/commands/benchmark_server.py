@@ -0,0 +1,190 @@
+import asyncio
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.loadtest.report import percentile
+from catalog.loadtest.server import CONFIG, start_server, stop_server
+
+SERVERS = {
+    # The compose command before gunicorn.conf.py: one sync worker, no preload
+    "legacy": ["--config", os.devnull, "locallibrary.wsgi"],
+    "wsgi": ["--config", CONFIG],
+    "asgi": ["--config", CONFIG],
+}
+
+
+class SlowClient:
+    """Request ``paths`` in a loop, trickling each request out in pieces.
+
+    Sending the headers takes ``pieces * delay`` seconds, like a client on a
+    slow mobile link: a sync worker is stuck reading it all that time.
+    """
+
+    def __init__(self, host, port, paths, pieces, delay, think=0, timeout=30):
+        self.host = host
+        self.port = port
+        self.paths = paths
+        self.pieces = pieces
+        self.delay = delay
+        self.think = think
+        self.timeout = timeout
+        self.latencies = []
+        self.waits = []
+        self.errors = 0
+
+    async def request(self, path):
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            data = (
+                f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                "User-Agent: benchmark_server\r\nConnection: close\r\n\r\n"
+            ).encode()
+            step = -(-len(data) // self.pieces)
+            for offset in range(0, len(data), step):
+                writer.write(data[offset : offset + step])
+                await writer.drain()
+                await asyncio.sleep(self.delay)
+            sent = time.perf_counter()
+            status = await reader.readline()
+            first_byte = time.perf_counter()
+            await reader.read()
+        finally:
+            writer.close()
+        if status.split()[1:2] != [b"200"]:
+            raise ValueError(status)
+        self.latencies.append(time.perf_counter() - start)
+        self.waits.append(first_byte - sent)
+
+    async def run(self, deadline):
+        # Start out of step with the other clients, as real ones would
+        await asyncio.sleep(random.uniform(0, self.pieces * self.delay + self.think))
+        n = 0
+        while time.perf_counter() < deadline:
+            try:
+                await asyncio.wait_for(
+                    self.request(self.paths[n % len(self.paths)]), self.timeout
+                )
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+                self.errors += 1
+            await asyncio.sleep(self.think)
+            n += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the site under gunicorn with each --mode (legacy: the old "
+        "one-sync-worker command, wsgi/asgi: gunicorn.conf.py with DJANGO_ASGI "
+        "off/on) and compare throughput and p99 latency with many slow clients. "
+        "Uses the current database; seed it first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            action="append",
+            dest="modes",
+            choices=list(SERVERS),
+            help="Server setup to test (repeatable). Default: wsgi and asgi.",
+        )
+        parser.add_argument(
+            "--workers", type=int, help="Default: what gunicorn.conf.py picks."
+        )
+        parser.add_argument("--clients", type=int, default=200, help="Slow clients.")
+        parser.add_argument(
+            "--fast-clients",
+            type=int,
+            default=0,
+            help="Clients sending each request at once, reported separately.",
+        )
+        parser.add_argument(
+            "--think",
+            type=float,
+            default=0,
+            help="Seconds each client waits between requests.",
+        )
+        parser.add_argument("--duration", type=float, default=20)
+        parser.add_argument(
+            "--pieces", type=int, default=5, help="Packets each request is sent in."
+        )
+        parser.add_argument(
+            "--delay",
+            type=float,
+            default=0.1,
+            help="Seconds between the packets of a request.",
+        )
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Page to request (repeatable). Default: home, book and author lists.",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or [
+            "/catalog/",
+            "/catalog/books/",
+            "/catalog/authors/",
+        ]
+        modes = options["modes"] or ["wsgi", "asgi"]
+        self.stdout.write(
+            f"{options['clients']} slow clients sending each request in "
+            f"{options['pieces']} pieces {options['delay'] * 1000:.0f} ms apart, "
+            f"{options['fast_clients']} fast clients, {options['think']}s think "
+            f"time, {options['duration']:.0f}s per mode"
+        )
+        for mode in modes:
+            server = self.start_server(mode, options["workers"], options["port"])
+            try:
+                groups = {
+                    "slow": self.clients(
+                        options["clients"], paths, options, options["pieces"]
+                    ),
+                    "fast": self.clients(options["fast_clients"], paths, options, 1),
+                }
+                everyone = [client for group in groups.values() for client in group]
+                asyncio.run(self.load(everyone, options["duration"]))
+            finally:
+                stop_server(server)
+            for name, clients in groups.items():
+                if clients:
+                    self.report(f"{mode} {name}", clients, options["duration"])
+
+    def clients(self, count, paths, options, pieces):
+        delay = options["delay"] if pieces > 1 else 0
+        return [
+            SlowClient(
+                "127.0.0.1", options["port"], paths, pieces, delay, options["think"]
+            )
+            for _ in range(count)
+        ]
+
+    def start_server(self, mode, workers, port):
+        env = dict(os.environ, DJANGO_ASGI="1" if mode == "asgi" else "0")
+        args = list(SERVERS[mode])
+        if workers:
+            args += ["--workers", str(workers)]
+        return start_server(args, port, env, label=f"{mode} server")
+
+    async def load(self, clients, duration):
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client.run(deadline) for client in clients))
+
+    def report(self, label, clients, duration):
+        latencies = sorted(s * 1000 for client in clients for s in client.latencies)
+        waits = sorted(s * 1000 for client in clients for s in client.waits)
+        errors = sum(client.errors for client in clients)
+        if not latencies:
+            self.stdout.write(f"{label}: no successful requests, {errors} errors")
+            return
+        self.stdout.write(
+            f"{label:<12} {len(latencies) / duration:8.1f} req/s  "
+            f"latency p50 {percentile(latencies, 0.5):7.0f} ms  "
+            f"p99 {percentile(latencies, 0.99):7.0f} ms  "
+            f"server wait p50 {percentile(waits, 0.5):7.0f} ms  "
+            f"p99 {percentile(waits, 0.99):7.0f} ms  errors {errors}"
+        )
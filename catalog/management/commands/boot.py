@@ -0,0 +1,78 @@
+import contextlib
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from catalog.boot import MakeMigrations, get_steps, run_step
+
+LOCK_NAME = "catalog.boot"
+
+
+@contextlib.contextmanager
+def boot_lock(timeout):
+    """Keep two containers starting together from migrating at the same time."""
+    if connection.vendor != "mysql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", [LOCK_NAME, timeout])
+        if cursor.fetchone()[0] != 1:
+            raise CommandError(f"Another boot held the lock for {timeout}s.")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", [LOCK_NAME])
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepare the site to serve: migrate, load fixtures, collect static files "
+        "and compile messages, skipping each step whose inputs did not change "
+        "since it last ran. makemigrations only runs outside production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fixture",
+            action="append",
+            dest="fixtures",
+            help="Fixture to load (repeatable). Default: seeder.json.",
+        )
+        parser.add_argument(
+            "--skip",
+            action="append",
+            default=[],
+            help="Step to leave out (repeatable), e.g. --skip loaddata.",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Run every step, even up to date."
+        )
+        parser.add_argument(
+            "--lock-timeout",
+            type=int,
+            default=300,
+            help="Seconds to wait for another container's boot (MySQL only).",
+        )
+
+    def handle(self, *args, **options):
+        production = settings.IS_PRODUCT
+        steps = get_steps(production, options["fixtures"] or ["seeder.json"])
+        start = time.perf_counter()
+        if production:
+            self.stdout.write(f"{MakeMigrations.name}: skipped (production)")
+        with boot_lock(options["lock_timeout"]):
+            for step in steps:
+                if step.name in options["skip"]:
+                    self.stdout.write(f"{step}: skipped")
+                    continue
+                step_start = time.perf_counter()
+                result = run_step(step, force=options["force"])
+                self.stdout.write(
+                    f"{step}: {result} in {time.perf_counter() - step_start:.2f}s"
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f"Ready in {time.perf_counter() - start:.2f}s")
+        )
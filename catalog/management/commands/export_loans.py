@@ -0,0 +1,36 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from catalog import exporter
+from catalog.constant import LOAN_STATUS
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream copies with their book, author and borrower as CSV or JSON Lines "
+        "to a file or stdout, in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=exporter.FORMATS, default="csv")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout).")
+        parser.add_argument("--status", choices=[code for code, _ in LOAN_STATUS])
+        parser.add_argument("--due-after", type=datetime.date.fromisoformat)
+        parser.add_argument("--due-before", type=datetime.date.fromisoformat)
+        parser.add_argument("--borrower", help="Username of the borrower.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        copies = exporter.filter_copies(
+            status=options["status"],
+            due_after=options["due_after"],
+            due_before=options["due_before"],
+            borrower=options["borrower"],
+        )
+        chunks = exporter.render(copies, options["format"], options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as file:
+                file.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,97 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from catalog.importer import (
+    FORMATS,
+    CatalogImporter,
+    InvalidRecord,
+    batched,
+    detect_format,
+    open_source,
+    read_records,
+)
+
+PROGRESS_INTERVAL = 5  # seconds
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books, authors, genres and copies from a CSV or JSON Lines file "
+        "(optionally gzipped), upserting books by ISBN. Progress is checkpointed "
+        "after every batch; rerun with --resume to continue after a failure."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--checkpoint", help="Progress file (default: PATH.checkpoint)."
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the records a previous run already committed.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            format = options["format"] or detect_format(path)
+        except ValueError as exc:
+            raise CommandError(exc)
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        size = os.path.getsize(path)
+        done = self.read_checkpoint(checkpoint, size) if options["resume"] else 0
+        if done:
+            self.stdout.write(f"Resuming after {done} records.")
+
+        importer = CatalogImporter(batch_size=options["batch_size"])
+        start = last_report = time.monotonic()
+        imported = 0
+        with open_source(path) as file:
+            try:
+                for batch in batched(
+                    read_records(file, format, skip=done), options["batch_size"]
+                ):
+                    importer.import_batch(batch)
+                    imported += len(batch)
+                    self.write_checkpoint(checkpoint, size, done + imported)
+                    if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                        last_report = time.monotonic()
+                        self.report(done + imported, imported, last_report - start)
+            except InvalidRecord as exc:
+                raise CommandError(
+                    f"{exc}. {done + imported} records are imported; fix the "
+                    f"file from that line on and rerun with --resume."
+                )
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.report(done + imported, imported, time.monotonic() - start)
+        for name, count in sorted(importer.stats.items()):
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Import finished."))
+
+    def report(self, total, imported, elapsed):
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(f"{total} records imported, {rate:.0f} records/s")
+
+    def read_checkpoint(self, checkpoint, size):
+        try:
+            with open(checkpoint) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return 0
+        if state["size"] > size:
+            raise CommandError(
+                f"{checkpoint} belongs to a larger file; delete it to start over."
+            )
+        return state["records"]
+
+    def write_checkpoint(self, checkpoint, size, records):
+        # Replace atomically so a crash never leaves a half-written file
+        with open(f"{checkpoint}.tmp", "w") as file:
+            json.dump({"size": size, "records": records}, file)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
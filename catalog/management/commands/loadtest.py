@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from catalog.loadtest import dataset, report, runner
+from catalog.loadtest.scenarios import MIXES
+from catalog.loadtest.server import CONFIG, start_server, stop_server
+from catalog.models import Author, Book, BookInstance
+
+
+class Command(BaseCommand):
+    help = (
+        "Play a mix of anonymous visitors, members and librarians against the "
+        "site and report throughput, p50/p95/p99 latency and SQL queries per "
+        "request for every route. Starts gunicorn on the configured database "
+        "unless --url points at a running server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            choices=list(dataset.SIZES),
+            help="Top the database up to this dataset size first.",
+        )
+        parser.add_argument("--mix", choices=list(MIXES), default="mixed")
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--duration", type=float, default=30)
+        parser.add_argument(
+            "--think",
+            type=float,
+            default=0,
+            help="Average seconds a user waits between actions.",
+        )
+        parser.add_argument("--url", help="Test this server instead of starting one.")
+        parser.add_argument("--port", type=int, default=8780)
+        parser.add_argument(
+            "--workers", type=int, help="Default: what gunicorn.conf.py picks."
+        )
+        parser.add_argument("--random-seed", type=int)
+        parser.add_argument("--output", help="Save the results to this JSON file.")
+        parser.add_argument("--compare", help="JSON results of an earlier run.")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self.stdout.write(f"Seeding the {options['seed']} dataset...")
+            added = dataset.seed(dataset.SIZES[options["seed"]], stdout=self.stdout)
+            self.stdout.write(f"Added {added}")
+        targets = dataset.Targets()
+        if not (
+            targets.books and targets.authors and targets.loans and targets.members
+        ):
+            raise CommandError("Not enough data to test; run with --seed small first.")
+
+        server = tmp = None
+        url = options["url"]
+        if not url:
+            # Merge every worker's metrics, for the queries per request
+            tmp = tempfile.mkdtemp(prefix="loadtest-metrics-")
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=tmp)
+            args = ["--config", CONFIG]
+            if options["workers"]:
+                args += ["--workers", str(options["workers"])]
+            server = start_server(args, options["port"], env)
+            url = f"http://127.0.0.1:{options['port']}"
+        self.stdout.write(
+            f"{options['users']} {options['mix']} users for "
+            f"{options['duration']:.0f}s against {url}"
+        )
+        try:
+            result = runner.run(
+                url,
+                targets,
+                mix=options["mix"],
+                users=options["users"],
+                duration=options["duration"],
+                think=options["think"],
+                seed=options["random_seed"],
+            )
+        finally:
+            if server:
+                stop_server(server)
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        result["config"] = {
+            key: options[key]
+            for key in ("mix", "users", "duration", "think", "workers", "random_seed")
+        }
+        result["config"]["url"] = url
+        result["dataset"] = {
+            "authors": Author.objects.count(),
+            "books": Book.objects.count(),
+            "copies": BookInstance.objects.count(),
+        }
+        result["started_at"] = timezone.now().isoformat()
+        result["uncovered_routes"] = runner.uncovered_routes(result)
+        self.print_result(result)
+        if options["compare"]:
+            self.print_comparison(result, report.load(options["compare"]))
+        if options["output"]:
+            report.save(result, options["output"])
+            self.stdout.write(f"Saved to {options['output']}")
+
+    def print_result(self, result):
+        for label, row in result["routes"].items():
+            self.stdout.write(report.format_row(label, row))
+        self.stdout.write(report.format_row("total", result["total"]))
+        if result["uncovered_routes"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Not exercised: {', '.join(result['uncovered_routes'])}"
+                )
+            )
+
+    def print_comparison(self, result, baseline):
+        self.stdout.write("Against the earlier run:")
+        for label, row in result["routes"].items():
+            if label in baseline["routes"]:
+                self.stdout.write(
+                    report.format_comparison(label, row, baseline["routes"][label])
+                )
+        self.stdout.write(
+            report.format_comparison("total", result["total"], baseline["total"])
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from catalog.models import CatalogCounter
+
+
+class Command(BaseCommand):
+    help = "Recompute the home page counters from the catalog tables and fix drift."
+
+    def handle(self, *args, **options):
+        drift = CatalogCounter.reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters are up to date."))
+            return
+        for name, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"{name}: {stored} -> {actual}")
+        self.stdout.write(self.style.WARNING(f"Fixed {len(drift)} drifted counter(s)."))
@@ -0,0 +1,54 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+from catalog.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the database queue until stopped (SIGTERM or "
+        "Ctrl-C finish the running jobs first)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queues",
+            default="default,email",
+            help="Comma-separated queues to take jobs from.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "JOB_WORKER_CONCURRENCY", 1),
+            help="Jobs run at the same time, one thread each.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more.",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serve this worker's job metrics for Prometheus on this port.",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            queues=[queue for queue in options["queues"].split(",") if queue],
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+            burst=options["burst"],
+        )
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(
+            f"Worker {worker.name} running {worker.concurrency} job(s) at a time "
+            f"from {', '.join(worker.queues)}"
+        )
+        worker.start()
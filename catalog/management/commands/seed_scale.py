@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.loadtest.scale import ScaleSeeder, can_fork
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a large, realistically skewed catalog for benchmarks: authors with "
+        "many books, Zipf-distributed copies per book and loans spread over due "
+        "dates. Rows go in with batched bulk_create, optionally from several "
+        "processes; signals do not run, the home page counters are reconciled "
+        "at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--genres", type=int, default=50)
+        parser.add_argument("--authors", type=int, default=20000)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--books", type=int, default=200000)
+        parser.add_argument("--copies", type=int, default=800000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes inserting books and copies; SQLite always uses one.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Exponent of the copies per book distribution.",
+        )
+        parser.add_argument("--random-seed", type=int)
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name]
+            for name in ("genres", "authors", "users", "books", "copies")
+        }
+        if any(count < 0 for count in counts.values()):
+            raise CommandError("Counts cannot be negative.")
+        workers = options["workers"]
+        if workers > 1 and not can_fork():
+            self.stderr.write(
+                self.style.WARNING("This database takes one writer; using 1 worker.")
+            )
+            workers = 1
+
+        start = time.perf_counter()
+        seeder = ScaleSeeder(
+            counts,
+            workers=workers,
+            batch_size=options["batch_size"],
+            exponent=options["zipf"],
+            seed=options["random_seed"],
+            stdout=self.stdout,
+        )
+        timings = seeder.run()
+        rows = sum(rows for rows, _ in timings.values())
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Added {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f}/s)."
+            )
+        )
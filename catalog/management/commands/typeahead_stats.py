@@ -0,0 +1,58 @@
+import random
+import string
+import tracemalloc
+from django.core.management.base import BaseCommand
+from catalog.typeahead import TypeaheadIndex
+from ._bench import format_stats, timed
+
+
+def random_title(rng):
+    words = rng.randint(1, 6)
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))).title()
+        for _ in range(words)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Report memory use and lookup latency of the typeahead index, either for "
+        "the current database (--from-db) or for synthetic titles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--titles", type=int, default=100_000)
+        parser.add_argument("--authors", type=int, default=10_000)
+        parser.add_argument("--lookups", type=int, default=10_000)
+        parser.add_argument("--from-db", action="store_true")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        index = TypeaheadIndex()
+        tracemalloc.start()
+        if options["from_db"]:
+            index.build()
+        else:
+            index.load(
+                ((pk, random_title(rng)) for pk in range(options["titles"])),
+                (
+                    (pk, random_title(rng), random_title(rng))
+                    for pk in range(options["authors"])
+                ),
+            )
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        entries = len(index)
+        self.stdout.write(f"entries: {entries}, keys: {len(index._keys)}")
+        self.stdout.write(
+            f"memory: {size / 2**20:.1f} MiB resident, {peak / 2**20:.1f} MiB peak "
+            f"while building, {size / max(entries, 1):.0f} bytes per entry"
+        )
+        prefixes = [
+            key[: rng.randint(1, 4)]
+            for key in rng.sample(index._keys, min(1000, len(index._keys)))
+        ] or ["a"]
+        lookups = iter(rng.choices(prefixes, k=options["lookups"]))
+        stats = timed(lambda: index.search(next(lookups)), options["lookups"])
+        self.stdout.write(format_stats("prefix lookup", stats))
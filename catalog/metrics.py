@@ -0,0 +1,237 @@
+"""Prometheus metrics for the site, scraped from ``/metrics``.
+
+Gunicorn runs several worker processes and each one has its own metric
+values. When ``PROMETHEUS_MULTIPROC_DIR`` is set (before prometheus_client is
+imported) every worker writes its samples to files in that directory and the
+``/metrics`` view merges all of them, so a scrape is correct no matter which
+worker answers it. The directory must be emptied when the server starts.
+"""
+
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.models import Count, Min
+from django.http import HttpResponse
+from django.utils import timezone
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from catalog.query_budget import acount_queries, count_queries
+
+UNRESOLVED_ROUTE = "<unresolved>"
+
+REQUEST_LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Time spent answering a request, by URL name.",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_EXCEPTIONS = Counter(
+    "django_http_exceptions_total",
+    "Requests that raised an unhandled exception, by URL name.",
+    ["route", "exception"],
+)
+DB_QUERIES = Histogram(
+    "django_db_queries_per_request",
+    "Number of SQL queries run while answering a request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_DURATION = Histogram(
+    "django_db_query_duration_seconds_per_request",
+    "Total time spent in SQL queries while answering a request.",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+TEMPLATE_RENDER = Histogram(
+    "django_template_render_duration_seconds",
+    "Time spent rendering a top-level template.",
+    ["template"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+JOBS_PROCESSED = Counter(
+    "jobs_processed_total",
+    "Background jobs run by this worker, by outcome (done, retry, failed).",
+    ["queue", "name", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds",
+    "Time spent running a background job.",
+    ["queue", "name"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "django_db_pool_connections",
+    "Connections held by the pool, by state (idle, in_use).",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter(
+    "django_db_pool_checkouts_total",
+    "Connections handed out by the pool, by outcome (reused, new, timeout).",
+    ["alias", "outcome"],
+)
+DB_POOL_WAIT = Histogram(
+    "django_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, connecting included.",
+    ["alias"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5),
+)
+DB_POOL_LEAKS = Counter(
+    "django_db_pool_leaks_total",
+    "Connections checked out for longer than the pool's leak timeout.",
+    ["alias"],
+)
+
+
+class JobQueueCollector:
+    """Queue depth read from the jobs table at scrape time.
+
+    Every worker and web process sees the same table, so these values are
+    collected by whichever process answers the scrape instead of being
+    tracked per process.
+    """
+
+    def describe(self):
+        return self.families()
+
+    def families(self):
+        return (
+            GaugeMetricFamily(
+                "jobs_queued",
+                "Jobs in the table, by queue and status.",
+                labels=["queue", "status"],
+            ),
+            GaugeMetricFamily(
+                "jobs_oldest_due_age_seconds",
+                "How long the oldest due job has been waiting, by queue.",
+                labels=["queue"],
+            ),
+        )
+
+    def collect(self):
+        from catalog.models import Job
+
+        depth, age = self.families()
+        now = timezone.now()
+        rows = (
+            Job.objects.values_list("queue", "status")
+            .annotate(count=Count("pk"), oldest=Min("run_at"))
+            .order_by()
+        )
+        for queue, status, count, oldest in rows:
+            depth.add_metric([queue, status], count)
+            if status == Job.QUEUED and oldest <= now:
+                age.add_metric([queue], (now - oldest).total_seconds())
+        return [depth, age]
+
+
+def get_route(request):
+    """URL name of the matched route; unmatched paths share one label."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    return match.view_name or UNRESOLVED_ROUTE
+
+
+class PrometheusMiddleware:
+    """Record latency and database usage for every request.
+
+    Keep it first in ``MIDDLEWARE`` so the timings include the other
+    middleware. Works under WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                response = self.get_response(request)
+        except Exception as exc:
+            self.record_exception(request, exc)
+            raise
+        self.record(request, response, start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        try:
+            async with acount_queries() as queries:
+                response = await self.get_response(request)
+        except Exception as exc:
+            self.record_exception(request, exc)
+            raise
+        self.record(request, response, start, queries)
+        return response
+
+    def record(self, request, response, start, queries):
+        route = get_route(request)
+        REQUEST_LATENCY.labels(route, request.method, response.status_code).observe(
+            time.perf_counter() - start
+        )
+        DB_QUERIES.labels(route).observe(queries.count)
+        DB_DURATION.labels(route).observe(queries.duration)
+
+    def record_exception(self, request, exc):
+        REQUEST_EXCEPTIONS.labels(get_route(request), type(exc).__name__).inc()
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_RENDER.labels(self.template.name or "<string>").observe(
+                time.perf_counter() - start
+            )
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend that times each top-level render.
+
+    Templates pulled in with ``{% include %}`` or ``{% extends %}`` are part
+    of the render that loaded them and are not timed separately.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def metrics_view(request):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(REGISTRY)
+    registry.register(JobQueueCollector())
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
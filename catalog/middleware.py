@@ -0,0 +1,160 @@
+import logging
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from catalog.log import log_context
+from catalog.routers import routing
+
+access_logger = logging.getLogger("catalog.access")
+# What a client or proxy may send as its own request id
+REQUEST_ID = re.compile(r"[\w.:-]{1,64}")
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise 6.5 is sync only, which makes Django run every request's
+    inner middleware and view from a thread under an ASGI server. Static
+    files are still served by the sync code, on the request's thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """Let safe requests read from a replica, unless the client wrote lately.
+
+    A request that writes sets a cookie pinning the client to the primary
+    for ``REPLICA_PIN_SECONDS``, longer than the replicas lag behind, so it
+    reads its own writes on the next pages. Keep it above the session
+    middleware, whose writes happen on the way out.
+    """
+
+    sync_capable = True
+    async_capable = True
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing(self.use_replica(request)) as state:
+            response = self.get_response(request)
+        self.pin(response, state)
+        return response
+
+    async def __acall__(self, request):
+        with routing(self.use_replica(request)) as state:
+            response = await self.get_response(request)
+        self.pin(response, state)
+        return response
+
+    def use_replica(self, request):
+        if request.method not in self.safe_methods:
+            return False
+        try:
+            pinned_until = float(request.COOKIES[settings.REPLICA_PIN_COOKIE])
+        except (KeyError, ValueError):
+            return True
+        return pinned_until < time.time()
+
+    def pin(self, response, state):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+
+
+class RequestLogMiddleware:
+    """Tag log records with the request's id and route, and log the request.
+
+    The id is the ``X-Request-ID`` a proxy sent, or a new one, and goes back
+    in the response headers. Keep it near the top of ``MIDDLEWARE`` so the
+    records of the middleware below are tagged too.
+    """
+
+    sync_capable = True
+    async_capable = True
+    header = "X-Request-ID"
+    meta_key = "HTTP_X_REQUEST_ID"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with log_context(self.request_id(request)) as context:
+            request.log_context = context
+            response = self.get_response(request)
+            self.finish(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with log_context(self.request_id(request)) as context:
+            request.log_context = context
+            response = await self.get_response(request)
+            self.finish(request, response, start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.log_context.route = request.resolver_match.view_name
+
+    def request_id(self, request):
+        value = request.META.get(self.meta_key)
+        return value if value and REQUEST_ID.fullmatch(value) else None
+
+    def finish(self, request, response, start):
+        response[self.header] = request.log_context.request_id
+        if access_logger.isEnabledFor(logging.INFO):
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            access_logger.info(
+                "%s %s %s %.2fms",
+                request.method,
+                request.path,
+                response.status_code,
+                duration_ms,
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": duration_ms,
+                },
+            )
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0006_alter_bookinstance_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogCounter",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("num_books", models.IntegerField(default=0)),
+                ("num_instances", models.IntegerField(default=0)),
+                ("num_instances_available", models.IntegerField(default=0)),
+                ("num_authors", models.IntegerField(default=0)),
+            ],
+        ),
+    ]
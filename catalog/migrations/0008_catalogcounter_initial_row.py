@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_counter_row(apps, schema_editor):
+    CatalogCounter = apps.get_model("catalog", "CatalogCounter")
+    Book = apps.get_model("catalog", "Book")
+    BookInstance = apps.get_model("catalog", "BookInstance")
+    Author = apps.get_model("catalog", "Author")
+    CatalogCounter.objects.update_or_create(
+        pk=1,
+        defaults={
+            "num_books": Book.objects.count(),
+            "num_instances": BookInstance.objects.count(),
+            "num_instances_available": BookInstance.objects.filter(
+                status__exact="a"
+            ).count(),
+            "num_authors": Author.objects.count(),
+        },
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0007_catalogcounter"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_counter_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+from catalog.operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0008_catalogcounter_initial_row"),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name="bookinstance",
+            index=models.Index(
+                fields=["borrower", "status", "due_back"],
+                name="bookinst_borrower_status_due",
+            ),
+        ),
+        AddIndexOnline(
+            model_name="bookinstance",
+            index=models.Index(
+                fields=["status", "due_back"], name="bookinst_status_due"
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# FULLTEXT indexes only exist on MySQL; catalog.search falls back to
+# substring matching elsewhere. The first FULLTEXT index on an InnoDB table
+# adds a hidden FTS_DOC_ID column, which means a table rebuild.
+FULLTEXT_INDEXES = [
+    ("catalog_book", "book_title_summary_ft", ("title", "summary")),
+    ("catalog_author", "author_name_ft", ("first_name", "last_name")),
+]
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    quote = schema_editor.quote_name
+    for table, name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f"ALTER TABLE {quote(table)} ADD FULLTEXT INDEX {quote(name)} "
+            f"({', '.join(quote(column) for column in columns)})"
+        )
+
+
+def remove_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    quote = schema_editor.quote_name
+    for table, name, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(f"ALTER TABLE {quote(table)} DROP INDEX {quote(name)}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0009_bookinstance_loan_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_indexes, remove_fulltext_indexes),
+    ]
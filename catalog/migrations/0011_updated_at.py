@@ -0,0 +1,28 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_fulltext_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="author",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="bookinstance",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
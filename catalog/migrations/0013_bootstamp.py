@@ -0,0 +1,24 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0012_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BootStamp",
+            fields=[
+                (
+                    "step",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("fingerprint", models.CharField(max_length=64)),
+                ("finished_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
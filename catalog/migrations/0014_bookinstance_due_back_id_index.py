@@ -0,0 +1,15 @@
+from django.db import migrations, models
+from catalog.operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0013_bootstamp"),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name="bookinstance",
+            index=models.Index(fields=["due_back", "id"], name="bookinst_due_back_id"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("catalog", "0014_bookinstance_due_back_id_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bookinstance",
+            name="borrower",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
 import uuid
@@ -18,6 +20,25 @@ class Genre(models.Model):
         return self.name
 
 
+class BookQuerySet(models.QuerySet):
+    def with_availability(self):
+        """Annotate ``num_copies`` and ``num_available`` in the same query."""
+        return self.annotate(
+            num_copies=models.Count("bookinstance"),
+            num_available=models.Count(
+                "bookinstance", filter=models.Q(bookinstance__status="a")
+            ),
+        )
+
+    def available(self):
+        """Books with at least one copy on the shelf."""
+        return self.with_availability().filter(num_available__gt=0)
+
+    def touch(self):
+        """Bump ``updated_at``, e.g. after a change to the books' copies."""
+        return self.update(updated_at=timezone.now())
+
+
 class Book(models.Model):
     """Model representing a book (but not a specific copy of a book)."""
 
@@ -33,6 +54,10 @@ class Book(models.Model):
         help_text='13 Character <ahref="https://www.isbn-international.org/content/what-isbn">ISBN number</a>',
     )
     genre = models.ManyToManyField(Genre, help_text="Select a genre for this book")
+    # Also bumped when a copy of the book changes, see catalog.signals
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self):
         """String for representing the Model object."""
@@ -44,7 +69,8 @@ class Book(models.Model):
 
     def display_genre(self):
         """Create a string for the Genre. This is required to display genre in Admin."""
-        return ", ".join(genre.name for genre in self.genre.all()[:3])
+        # Sliced in Python, so a prefetch_related("genre") is used
+        return ", ".join(genre.name for genre in list(self.genre.all())[:3])
 
     display_genre.short_description = "Genre"
 
@@ -60,7 +86,11 @@ class BookInstance(models.Model):
     book = models.ForeignKey("Book", on_delete=models.CASCADE)
     imprint = models.CharField(max_length=200)
     due_back = models.DateField(null=True, blank=True)
-    borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # bookinst_borrower_status_due starts with borrower, so it serves the
+    # foreign key too and a separate borrower index is only write overhead
+    borrower = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False
+    )
     status = models.CharField(
         max_length=1,
         choices=LOAN_STATUS,
@@ -68,6 +98,7 @@ class BookInstance(models.Model):
         default="m",
         help_text="Book availability",
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def is_overdue(self):
@@ -76,6 +107,19 @@ class BookInstance(models.Model):
 
     class Meta:
         ordering = ["due_back"]
+        # Access paths of the loan lists and the available-copies count. InnoDB
+        # appends the primary key to every secondary index, which covers the
+        # pk tie-breaker the views order by.
+        indexes = [
+            models.Index(
+                fields=["borrower", "status", "due_back"],
+                name="bookinst_borrower_status_due",
+            ),
+            models.Index(fields=["status", "due_back"], name="bookinst_status_due"),
+            # The admin changelist's order. InnoDB would append the pk anyway;
+            # naming it lets SQLite serve the ORDER BY from the index too
+            models.Index(fields=["due_back", "id"], name="bookinst_due_back_id"),
+        ]
         permissions = (
             ("view_list_on_loan", "Get all book on loan"),
             ("can_mark_returned", "Can mark returned book"),
@@ -93,6 +137,7 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField("Died", null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["last_name", "first_name"]
@@ -104,3 +149,132 @@ class Author(models.Model):
     def __str__(self):
         """String for representing the Model object."""
         return f"{self.last_name}, {self.first_name}"
+
+
+class CatalogCounter(models.Model):
+    """Denormalized record counts shown on the home page.
+
+    A single row kept in sync by the signal handlers in ``catalog.signals``.
+    Bulk ``update()``/``bulk_create()`` calls bypass signals, so drift is
+    corrected with ``manage.py reconcile_counters``.
+    """
+
+    num_books = models.IntegerField(default=0)
+    num_instances = models.IntegerField(default=0)
+    num_instances_available = models.IntegerField(default=0)
+    num_authors = models.IntegerField(default=0)
+
+    SINGLETON_ID = 1
+
+    def __str__(self):
+        """String for representing the Model object."""
+        return (
+            f"{self.num_books} books, {self.num_instances} copies "
+            f"({self.num_instances_available} available), {self.num_authors} authors"
+        )
+
+    @staticmethod
+    def compute():
+        """Count the catalog tables directly (the slow path)."""
+        return {
+            "num_books": Book.objects.count(),
+            "num_instances": BookInstance.objects.count(),
+            "num_instances_available": BookInstance.objects.filter(
+                status__exact="a"
+            ).count(),
+            "num_authors": Author.objects.count(),
+        }
+
+    @classmethod
+    def load(cls):
+        """Return the counter row, creating it from real counts on first use."""
+        try:
+            return cls.objects.get(pk=cls.SINGLETON_ID)
+        except cls.DoesNotExist:
+            counter, _ = cls.objects.get_or_create(
+                pk=cls.SINGLETON_ID, defaults=cls.compute()
+            )
+            return counter
+
+    @classmethod
+    async def aload(cls):
+        """Async ``load``."""
+        try:
+            return await cls.objects.aget(pk=cls.SINGLETON_ID)
+        except cls.DoesNotExist:
+            return await sync_to_async(cls.load)()
+
+    @classmethod
+    def reconcile(cls):
+        """Overwrite the counters with real counts; return the fields that drifted."""
+        actual = cls.compute()
+        counter = cls.load()
+        drift = {
+            name: (getattr(counter, name), value)
+            for name, value in actual.items()
+            if getattr(counter, name) != value
+        }
+        cls.objects.filter(pk=cls.SINGLETON_ID).update(**actual)
+        return drift
+
+    @classmethod
+    def increment(cls, **deltas):
+        """Atomically add ``deltas`` to the counter row, e.g. ``num_books=1``."""
+        changes = {
+            name: models.F(name) + delta for name, delta in deltas.items() if delta
+        }
+        if changes:
+            cls.objects.filter(pk=cls.SINGLETON_ID).update(**changes)
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_worker``.
+
+    See ``catalog.jobs``. Finished jobs are deleted; jobs that used up their
+    attempts stay behind with status ``failed`` and the last error.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    )
+
+    queue = models.CharField(max_length=50, default="default")
+    name = models.CharField(max_length=200, help_text="Dotted path of the function")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # The worker's claim query: status and queue equal, oldest run_at first
+        indexes = [
+            models.Index(fields=["status", "queue", "run_at"], name="job_claim"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts})"
+
+
+class BootStamp(models.Model):
+    """Fingerprint of the inputs a ``manage.py boot`` step last ran with.
+
+    Only steps whose output is the database keep their stamp here, so a new
+    database has no stamps and every step runs again.
+    """
+
+    step = models.CharField(max_length=100, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    finished_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.step
@@ -0,0 +1,26 @@
+"""Custom migration operations."""
+
+from django.db import migrations
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """``AddIndex`` that never blocks writes to the table on MySQL.
+
+    InnoDB builds secondary indexes in place, but only asking for
+    ``ALGORITHM=INPLACE, LOCK=NONE`` guarantees it: MySQL then refuses to run
+    the statement instead of silently falling back to a locking table copy.
+    Other databases use the regular ``AddIndex`` SQL.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "mysql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            sql = self.index.create_sql(model, schema_editor)
+            schema_editor.execute(f"{sql} ALGORITHM=INPLACE LOCK=NONE")
+
+    def describe(self):
+        return f"{super().describe()} without locking the table"
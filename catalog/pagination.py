@@ -0,0 +1,240 @@
+"""Keyset (cursor) pagination for the catalog list views.
+
+OFFSET pagination gets slower the deeper the page and needs a COUNT(*) to
+know how many pages exist. A cursor page instead remembers the ordering
+values of the last row it showed and asks for the rows that sort after it,
+so every page costs the same indexed range scan and no count is run.
+
+NULLs are assumed to sort before every other value in ascending order, which
+is how MySQL and SQLite order them.
+"""
+
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.translation import gettext
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    """One page of a CursorPaginator, usable like a Django ``Page``."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginate ``queryset`` by ``ordering`` plus the primary key as a tie-breaker.
+
+    ``ordering`` uses the same syntax as ``order_by()``, e.g.
+    ``("-due_back",)``. Tokens are signed so clients cannot forge filters.
+    """
+
+    salt = "catalog.pagination.cursor"
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-"))
+            for name in ordering
+            if name.lstrip("-") not in ("pk", queryset.model._meta.pk.name)
+        ]
+        last_descending = self.fields[-1][1] if self.fields else False
+        self.fields.append(("pk", last_descending))
+        self.nullable = {
+            name
+            for name, _ in self.fields
+            if name != "pk" and queryset.model._meta.get_field(name).null
+        }
+
+    def encode(self, obj, direction):
+        values = []
+        for name, _ in self.fields:
+            value = obj.pk if name == "pk" else obj.serializable_value(name)
+            values.append(
+                value if value is None or isinstance(value, int) else str(value)
+            )
+        return signing.dumps([direction, values], salt=self.salt, compress=True)
+
+    def decode(self, cursor):
+        try:
+            direction, values = signing.loads(cursor, salt=self.salt)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if direction not in ("next", "prev") or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _order_by(self, reverse):
+        return [
+            ("-" if descending != reverse else "") + name
+            for name, descending in self.fields
+        ]
+
+    def _after(self, fields, values):
+        """Q matching rows that sort strictly after ``values``; None if none can."""
+        (name, descending), value = fields[0], values[0]
+        if value is None:
+            # NULL is the lowest value: everything non-null is after it going
+            # up, nothing is after it going down.
+            beyond = None if descending else Q(**{f"{name}__isnull": False})
+            tie = Q(**{f"{name}__isnull": True})
+        else:
+            beyond = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            if descending and name in self.nullable:
+                beyond |= Q(**{f"{name}__isnull": True})
+            tie = Q(**{name: value})
+        if len(fields) > 1:
+            rest = self._after(fields[1:], values[1:])
+            if rest is not None:
+                tie &= rest
+                beyond = tie if beyond is None else beyond | tie
+        return beyond
+
+    def page(self, cursor=None):
+        if cursor:
+            direction, values = self.decode(cursor)
+        else:
+            direction, values = "next", None
+        backwards = direction == "prev"
+        fields = [(name, descending != backwards) for name, descending in self.fields]
+
+        queryset = self.queryset.order_by(*self._order_by(reverse=backwards))
+        if values is not None:
+            condition = self._after(fields, values)
+            queryset = (
+                queryset.filter(condition) if condition is not None else queryset.none()
+            )
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = has_more if not backwards else True
+        has_previous = has_more if backwards else values is not None
+        return CursorPage(
+            rows,
+            self.encode(rows[-1], "next") if rows and has_next else None,
+            self.encode(rows[0], "prev") if rows and has_previous else None,
+        )
+
+
+class CursorPaginationMixin:
+    """Opt-in keyset pagination for a ``ListView``.
+
+    Views declare ``cursor_ordering``; cursor mode is used when
+    ``settings.CATALOG_CURSOR_PAGINATION`` is on or the request carries a
+    ``cursor`` parameter, otherwise the usual page-number pagination applies.
+    """
+
+    cursor_ordering = None
+    cursor_query_param = "cursor"
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering or self.model._meta.ordering
+
+    def use_cursor_pagination(self):
+        return (
+            getattr(settings, "CATALOG_CURSOR_PAGINATION", False)
+            or self.cursor_query_param in self.request.GET
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size, self.get_cursor_ordering())
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise Http404(gettext("Invalid cursor"))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def estimated_count(model, using="default"):
+    """Rows in ``model``'s table according to the database's statistics.
+
+    Costs one cheap query, but may be some percent off. None when the
+    database keeps no statistics: MySQL always has them, SQLite only after
+    an ``ANALYZE``.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "mysql":
+        sql = (
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+        )
+    elif connection.vendor == "sqlite":
+        sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    # sqlite_stat1.stat starts with the row count, e.g. "1000000 2 1"
+    return int(str(row[0]).split()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that takes the table statistics' row count for big tables.
+
+    An exact ``COUNT(*)`` of an unfiltered InnoDB table reads a whole index,
+    seconds on millions of rows. Above ``threshold`` rows nobody pages to the
+    end, so the estimate is used there; filtered querysets, and tables below
+    the threshold, are still counted exactly. Pages past the real end come
+    out empty.
+    """
+
+    threshold = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return super().count
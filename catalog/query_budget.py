@@ -0,0 +1,138 @@
+"""Maximum number of SQL queries a view may run, whatever the page size.
+
+Views declare a budget with ``QueryBudgetMixin.query_budget`` or the
+``query_budget`` decorator. Going over it logs a warning, or raises
+``QueryBudgetExceeded`` when ``settings.QUERY_BUDGET_STRICT`` is on, which
+is how the tests catch N+1 regressions.
+"""
+
+import functools
+import logging
+import time
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Database execute wrapper that counts and times the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries():
+    """Count the queries run on every configured database inside the block."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        yield counter
+
+
+@asynccontextmanager
+async def acount_queries():
+    """``count_queries`` for async code.
+
+    Connections are per thread and the async ORM runs its queries on the
+    request's sync thread, so the counter is installed from that thread.
+    """
+    counting = count_queries()
+    counter = await sync_to_async(counting.__enter__)()
+    try:
+        yield counter
+    finally:
+        await sync_to_async(counting.__exit__)(None, None, None)
+
+
+def check_query_budget(view_name, budget, count):
+    if count <= budget:
+        return
+    message = f"{view_name} ran {count} SQL queries, budget is {budget}"
+    if getattr(settings, "QUERY_BUDGET_STRICT", False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def get_query_budget(view):
+    """Return the budget declared by a URL callback, or None."""
+    view_class = getattr(view, "view_class", None)
+    return getattr(view_class or view, "query_budget", None)
+
+
+class QueryBudgetMixin:
+    """Enforce ``query_budget`` on a class-based view, template rendering included."""
+
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None:
+            return super().dispatch(request, *args, **kwargs)
+        with count_queries() as counter:
+            response = super().dispatch(request, *args, **kwargs)
+            # TemplateResponses render lazily, after dispatch returns; render
+            # now so queries issued from templates count against the budget.
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        check_query_budget(type(self).__name__, self.query_budget, counter.count)
+        return response
+
+
+def query_budget(max_queries):
+    """Decorator enforcing a query budget on a function-based view, sync or async."""
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                async with acount_queries() as counter:
+                    response = await view_func(request, *args, **kwargs)
+                check_query_budget(view_func.__name__, max_queries, counter.count)
+                return response
+
+            async_wrapper.query_budget = max_queries
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with count_queries() as counter:
+                response = view_func(request, *args, **kwargs)
+            check_query_budget(view_func.__name__, max_queries, counter.count)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorator
+
+
+class QueryBudgetTestMixin:
+    """TestCase helpers that fail when a view goes over its declared budget."""
+
+    def assertWithinQueryBudget(self, url, method="get", data=None):
+        view = resolve(url.split("?")[0]).func
+        self.assertIsNotNone(
+            get_query_budget(view), f"{url} does not declare a query budget"
+        )
+        with self.settings(QUERY_BUDGET_STRICT=True):
+            return getattr(self.client, method)(url, data)
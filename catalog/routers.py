@@ -0,0 +1,87 @@
+"""Send reads to a replica database and writes to the primary.
+
+Reads only go to a replica inside a request that ``ReplicaRoutingMiddleware``
+let through: a GET or HEAD from a client that did not write anything in the
+last ``REPLICA_PIN_SECONDS``. Everything else (POSTs, management commands,
+the job worker, open transactions) reads from the primary, so it never sees
+data older than what it just wrote.
+"""
+
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing = contextvars.ContextVar("catalog_db_routing", default=None)
+
+
+class RoutingState:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def replica_databases():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+@contextlib.contextmanager
+def routing(use_replica):
+    """Route the queries of one request; yields its ``RoutingState``."""
+    replicas = replica_databases()
+    state = RoutingState(random.choice(replicas) if use_replica and replicas else None)
+    # Async views run their queries in other threads with a copy of this
+    # context; they share the state object, so they can mark it as written
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Read from the primary inside the block, e.g. right before a write."""
+    state = _routing.get()
+    replica = state.replica if state else None
+    if state:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state and not state.wrote:
+            state.replica = replica
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.replica is None:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # Read what was written for the rest of the request
+            state.wrote = True
+            state.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *replica_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_databases():
+            return False
+        return None
@@ -0,0 +1,163 @@
+"""Book search by title, summary and author name.
+
+On MySQL the lookup goes through the FULLTEXT indexes added in migration
+0010 and results are ordered by relevance. Other databases (SQLite for local
+runs) fall back to case-insensitive substring matching.
+"""
+
+import re
+from collections.abc import Sequence
+
+from django.db import connection
+from django.db.models import (
+    Case,
+    CharField,
+    FloatField,
+    Func,
+    IntegerField,
+    Lookup,
+    Q,
+    Value,
+    When,
+)
+from django.db.utils import NotSupportedError
+from catalog.models import Author, Book
+
+ISBN_RE = re.compile(r"^(?:\d{9}[\dX]|\d{13})$")
+
+BOOK_FULLTEXT_COLUMNS = ("title", "summary")
+AUTHOR_FULLTEXT_COLUMNS = ("first_name", "last_name")
+
+
+def normalize_isbn(query):
+    """Return ``query`` as a bare ISBN-10/13 if it looks like one, else None."""
+    candidate = re.sub(r"[\s-]", "", query).upper()
+    return candidate if ISBN_RE.match(candidate) else None
+
+
+class SearchColumns(Func):
+    """The column list inside ``MATCH (...)``."""
+
+    template = "%(expressions)s"
+    output_field = CharField()
+
+
+class MatchAgainst(Lookup):
+    """``WHERE MATCH (columns) AGAINST (query)``, which uses the FULLTEXT index."""
+
+    lookup_name = "match_against"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError("Full-text search requires MySQL.")
+
+    def as_mysql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        sql = f"MATCH ({lhs_sql}) AGAINST ({rhs_sql} IN NATURAL LANGUAGE MODE)"
+        return sql, [*lhs_params, *rhs_params]
+
+
+class Relevance(Func):
+    """Full-text relevance score of ``columns`` for ``query``."""
+
+    output_field = FloatField()
+
+    def __init__(self, *columns, query):
+        super().__init__(SearchColumns(*columns), Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError("Full-text search requires MySQL.")
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="MATCH (%(expressions)s IN NATURAL LANGUAGE MODE)",
+            arg_joiner=") AGAINST (",
+            **extra_context,
+        )
+
+
+def search_books(query):
+    """Books matching ``query``, best match first.
+
+    On MySQL this is a ``RankedBooks`` sequence rather than a queryset; both
+    paginate and only load the books of the page asked for.
+    """
+    books = Book.objects.select_related("author")
+    if connection.vendor == "mysql":
+        return _fulltext_search(books, query)
+    return _substring_search(books, query)
+
+
+class RankedBooks(Sequence):
+    """Books in the order of ``pks``, loaded one slice (page) at a time."""
+
+    model = Book
+
+    def __init__(self, queryset, pks):
+        self.queryset = queryset
+        self.pks = pks
+
+    def __len__(self):
+        return len(self.pks)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self.queryset.get(pk=self.pks[index])
+        pks = self.pks[index]
+        books = self.queryset.in_bulk(pks)
+        return [books[pk] for pk in pks if pk in books]
+
+
+def _fulltext_search(books, query):
+    # MySQL cannot use a FULLTEXT index for one side of an OR, so the book
+    # and author matches run as two index lookups and are merged here
+    ranks = dict(
+        Book.objects.filter(MatchAgainst(SearchColumns(*BOOK_FULLTEXT_COLUMNS), query))
+        .annotate(rank=Relevance(*BOOK_FULLTEXT_COLUMNS, query=query))
+        .values_list("pk", "rank")
+    )
+    authors = dict(
+        Author.objects.filter(
+            MatchAgainst(SearchColumns(*AUTHOR_FULLTEXT_COLUMNS), query)
+        )
+        .annotate(rank=Relevance(*AUTHOR_FULLTEXT_COLUMNS, query=query))
+        .values_list("pk", "rank")
+    )
+    if authors:
+        for pk, author_id in Book.objects.filter(author__in=authors).values_list(
+            "pk", "author_id"
+        ):
+            ranks[pk] = ranks.get(pk, 0.0) + authors[author_id]
+    pks = sorted(ranks, key=lambda pk: (-ranks[pk], pk))
+    return RankedBooks(books, pks)
+
+
+def _substring_search(books, query):
+    condition = Q()
+    for term in query.split():
+        condition &= (
+            Q(title__icontains=term)
+            | Q(summary__icontains=term)
+            | Q(author__first_name__icontains=term)
+            | Q(author__last_name__icontains=term)
+        )
+    return (
+        books.filter(condition)
+        .annotate(
+            rank=Case(
+                When(title__iexact=query, then=Value(4)),
+                When(title__icontains=query, then=Value(3)),
+                When(
+                    Q(author__last_name__icontains=query)
+                    | Q(author__first_name__icontains=query),
+                    then=Value(2),
+                ),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-rank", "title", "pk")
+    )
@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from catalog import typeahead
+from catalog.models import Author, Book, BookInstance, CatalogCounter, Genre
+
+AVAILABLE = "a"
+
+
+@receiver(post_init, sender=BookInstance)
+def remember_status(sender, instance, **kwargs):
+    # Keep the status the row was loaded with, so a save can tell whether
+    # the copy became (or stopped being) available. Read from __dict__ so a
+    # deferred status field is not fetched just for this.
+    instance._loaded_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    if created:
+        CatalogCounter.increment(num_books=1)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    CatalogCounter.increment(num_books=-1)
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if created:
+        CatalogCounter.increment(num_authors=1)
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    CatalogCounter.increment(num_authors=-1)
+
+
+@receiver(post_save, sender=BookInstance)
+def book_instance_saved(sender, instance, created, raw=False, **kwargs):
+    is_available = instance.status == AVAILABLE
+    if created:
+        CatalogCounter.increment(
+            num_instances=1, num_instances_available=int(is_available)
+        )
+    elif not raw:
+        # Fixture loads (raw) don't know the previous status of the row.
+        was_available = getattr(instance, "_loaded_status", None) == AVAILABLE
+        CatalogCounter.increment(
+            num_instances_available=int(is_available) - int(was_available)
+        )
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=BookInstance)
+def book_instance_deleted(sender, instance, **kwargs):
+    CatalogCounter.increment(
+        num_instances=-1,
+        num_instances_available=-int(instance.status == AVAILABLE),
+    )
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def book_instance_changed(sender, instance, raw=False, **kwargs):
+    # The book pages show copy counts and statuses, so a changed copy is a
+    # changed book as far as ETag/Last-Modified are concerned.
+    if not raw:
+        Book.objects.filter(pk=instance.book_id).touch()
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            Book.objects.filter(pk=instance.pk).touch()
+    elif action in ("post_add", "post_remove"):
+        Book.objects.filter(pk__in=pk_set).touch()
+    elif action == "pre_clear":
+        # Once cleared, the genre no longer knows which books it had
+        instance.book_set.touch()
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    # SET_NULL clears the books' author with an UPDATE that leaves their
+    # updated_at alone, and the author's own updated_at goes with the row
+    instance.book_set.touch()
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, raw=False, **kwargs):
+    # The book pages show genre names
+    if not created and not raw:
+        instance.book_set.touch()
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleting(sender, instance, **kwargs):
+    # The cascade on the through table sends no m2m_changed
+    instance.book_set.touch()
+
+
+def _patch_typeahead(update):
+    # Only a built index is patched; an unbuilt one loads everything anyway.
+    # Wait for the commit so rolled-back writes never show up in suggestions.
+    if typeahead.index.built_at is not None:
+        transaction.on_commit(update)
+
+
+@receiver(post_save, sender=Book)
+def book_saved_typeahead(sender, instance, **kwargs):
+    _patch_typeahead(lambda: typeahead.index.put_book(instance.pk, instance.title))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted_typeahead(sender, instance, **kwargs):
+    pk = instance.pk
+    _patch_typeahead(lambda: typeahead.index.discard(typeahead.BOOK, pk))
+
+
+@receiver(post_save, sender=Author)
+def author_saved_typeahead(sender, instance, **kwargs):
+    _patch_typeahead(
+        lambda: typeahead.index.put_author(
+            instance.pk, instance.first_name, instance.last_name
+        )
+    )
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted_typeahead(sender, instance, **kwargs):
+    pk = instance.pk
+    _patch_typeahead(lambda: typeahead.index.discard(typeahead.AUTHOR, pk))
@@ -0,0 +1,24 @@
+from django.contrib import admin
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+
+
+class CatalogAutocompleteJsonView(AutocompleteJsonView):
+    """Autocomplete that answers whoever may fill in the foreign key.
+
+    Django only serves users with view permission on the related model, so a
+    librarian allowed to lend copies would also need auth.view_user to pick a
+    borrower, which the <select> the widget replaced never asked for.
+    """
+
+    def has_perm(self, request, obj=None):
+        source_admin = self.admin_site._registry[self.source_field.model]
+        return (
+            super().has_perm(request, obj)
+            or source_admin.has_add_permission(request)
+            or source_admin.has_change_permission(request)
+        )
+
+
+class CatalogAdminSite(admin.AdminSite):
+    def autocomplete_view(self, request):
+        return CatalogAutocompleteJsonView.as_view(admin_site=self)(request)
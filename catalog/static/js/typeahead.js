@@ -0,0 +1,39 @@
+(function () {
+  var input = document.getElementById("nav-search-input");
+  var list = document.getElementById("nav-search-suggestions");
+  if (!input || !list) {
+    return;
+  }
+  var timer = null;
+  var urls = {};
+
+  input.addEventListener("input", function () {
+    // Jump straight to a suggestion the user picked from the list
+    if (urls[input.value]) {
+      window.location = urls[input.value];
+      return;
+    }
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      var query = input.value.trim();
+      if (!query) {
+        list.innerHTML = "";
+        return;
+      }
+      fetch(input.dataset.autocompleteUrl + "?q=" + encodeURIComponent(query))
+        .then(function (response) {
+          return response.json();
+        })
+        .then(function (data) {
+          list.innerHTML = "";
+          urls = {};
+          data.results.forEach(function (result) {
+            var option = document.createElement("option");
+            option.value = result.label;
+            urls[result.label] = result.url;
+            list.appendChild(option);
+          });
+        });
+    }, 100);
+  });
+})();
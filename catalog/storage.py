@@ -0,0 +1,115 @@
+import fnmatch
+import json
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+# Lists the variants made for each source image, read by {% responsive_image %}
+INDEX_NAME = "responsive-images.json"
+
+DEFAULTS = {
+    "PATTERNS": ["images/*.jpg", "images/*.jpeg", "images/*.png"],
+    "WIDTHS": [480, 768, 1280, 1920],
+    # format: encoder quality
+    "FORMATS": {"avif": 50, "webp": 75},
+}
+
+
+def responsive_images_settings():
+    return {**DEFAULTS, **getattr(settings, "RESPONSIVE_IMAGES", {})}
+
+
+def variant_name(name, width, fmt):
+    """``images/R.jpeg`` at 480 pixels in WebP is ``images/R-480w.webp``."""
+    return f"{posixpath.splitext(name)[0]}-{width}w.{fmt}"
+
+
+class ResponsiveImagesStorage(CompressedManifestStaticFilesStorage):
+    """Manifest storage that also makes resized AVIF/WebP copies of images.
+
+    Before the files are hashed, every collected image matching
+    ``RESPONSIVE_IMAGES["PATTERNS"]`` is resized to each of the ``WIDTHS`` no
+    wider than itself, in each of the ``FORMATS``. The copies then go through
+    the usual hashing and manifest like any other static file, and
+    ``INDEX_NAME`` records which copies exist for each image.
+
+    Copies newer than their source are kept from the previous run, so only
+    changed images are encoded again. Without Pillow, or a format Pillow
+    cannot write, there are fewer copies and the templates fall back to the
+    original file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            index = self.make_variants(paths)
+            for variants in index.values():
+                for fmt_variants in variants["formats"].values():
+                    for _, name in fmt_variants:
+                        paths[name] = (self, name)
+            if self.exists(INDEX_NAME):
+                self.delete(INDEX_NAME)
+            self._save(INDEX_NAME, ContentFile(json.dumps(index, indent=2).encode()))
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def make_variants(self, paths):
+        config = responsive_images_settings()
+        sources = [
+            name
+            for name in sorted(paths)
+            if any(fnmatch.fnmatch(name, pattern) for pattern in config["PATTERNS"])
+        ]
+        if not sources:
+            return {}
+        try:
+            from PIL import Image, features
+        except ImportError:
+            logger.warning("Pillow is not installed, no responsive images are made")
+            return {}
+        formats = {}
+        for fmt, quality in config["FORMATS"].items():
+            if features.check(fmt):
+                formats[fmt] = quality
+            else:
+                logger.warning("Pillow cannot write %s images, skipping them", fmt)
+
+        index = {}
+        for name in sources:
+            with self.open(name) as source:
+                image = Image.open(source)
+                image.load()
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            widths = sorted({min(w, image.width) for w in config["WIDTHS"]})
+            entry = {"width": image.width, "height": image.height, "formats": {}}
+            for fmt, quality in formats.items():
+                entry["formats"][fmt] = []
+                for width in widths:
+                    target = variant_name(name, width, fmt)
+                    if not self.is_fresh(target, name):
+                        self.save_variant(image, target, width, fmt, quality)
+                    entry["formats"][fmt].append((width, target))
+            index[name] = entry
+        return index
+
+    def is_fresh(self, target, source):
+        if not self.exists(target):
+            return False
+        return self.get_modified_time(target) >= self.get_modified_time(source)
+
+    def save_variant(self, image, target, width, fmt, quality):
+        from PIL import Image
+
+        height = round(image.height * width / image.width)
+        if width != image.width:
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, fmt.upper(), quality=quality)
+        if self.exists(target):
+            self.delete(target)
+        self._save(target, ContentFile(buffer.getvalue()))
@@ -0,0 +1,71 @@
+import functools
+import json
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from catalog.storage import INDEX_NAME
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def url_replace(context, **kwargs):
+    """The current query string with ``kwargs`` replaced, e.g. for page links."""
+    query = context["request"].GET.copy()
+    for key, value in kwargs.items():
+        query[key] = value
+    return query.urlencode()
+
+
+@functools.lru_cache(maxsize=None)
+def responsive_images_index():
+    """The variants collectstatic made, see catalog.storage; {} if none."""
+    try:
+        with staticfiles_storage.open(INDEX_NAME) as index:
+            return json.load(index)
+    except (OSError, ValueError):
+        return {}
+
+
+@register.simple_tag
+def responsive_image(name, alt="", sizes="100vw", lazy=True, **attrs):
+    """A <picture> of the static image ``name`` with its AVIF/WebP variants.
+
+    Browsers pick the smallest variant that fills ``sizes``; the original
+    file is only the fallback. Leave ``lazy`` on for images below the fold or
+    on hidden carousel slides, turn it off for the first thing on the page.
+    Extra keyword arguments become attributes of the <img>.
+    """
+    if settings.DEBUG:
+        responsive_images_index.cache_clear()
+    entry = responsive_images_index().get(name)
+    if lazy:
+        attrs.update(loading="lazy", decoding="async")
+    else:
+        attrs.update(fetchpriority="high")
+    sources = ""
+    if entry:
+        attrs.update(width=entry["width"], height=entry["height"])
+        sources = format_html_join(
+            "",
+            '<source type="image/{}" srcset="{}" sizes="{}">',
+            (
+                (
+                    fmt,
+                    ", ".join(f"{static(v)} {width}w" for width, v in variants),
+                    sizes,
+                )
+                for fmt, variants in entry["formats"].items()
+            ),
+        )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}"{}></picture>',
+        sources,
+        static(name),
+        alt,
+        format_html_join("", ' {}="{}"', sorted(attrs.items())),
+    )
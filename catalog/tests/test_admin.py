@@ -0,0 +1,172 @@
+import datetime
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from catalog.admin import BooksInstanceInline
+from catalog.factory import (
+    AuthorFactory,
+    BookFactory,
+    BookInstanceFactory,
+    GenreFactory,
+    UserFactory,
+)
+from catalog.models import Book, BookInstance
+from catalog.pagination import EstimatedCountPaginator, estimated_count
+from catalog.query_budget import count_queries
+
+
+class ChangelistQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserFactory(is_superuser=True)
+        cls.genres = GenreFactory.create_batch(3)
+
+    def add_rows(self, count):
+        borrower = UserFactory()
+        for _ in range(count):
+            book = BookFactory(author=AuthorFactory(), genres=self.genres)
+            BookInstanceFactory(book=book, borrower=borrower)
+
+    def queries(self, url):
+        with count_queries() as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return queries.count
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.client.force_login(self.admin)
+        for name in ("book", "bookinstance"):
+            url = reverse(f"admin:catalog_{name}_changelist")
+            with self.subTest(name):
+                self.add_rows(2)
+                few = self.queries(url)
+                self.add_rows(10)
+                self.assertEqual(self.queries(url), few)
+
+    def test_genre_column_uses_the_prefetch(self):
+        self.add_rows(1)
+        book = Book.objects.prefetch_related("genre").get()
+        with self.assertNumQueries(0):
+            self.assertEqual(book.display_genre().count(","), 2)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        BookInstanceFactory.create_batch(5, book=BookFactory())
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        BookInstanceFactory.create_batch(2, book=BookFactory())
+
+    def test_estimate_for_big_unfiltered_tables(self):
+        self.assertEqual(estimated_count(BookInstance), 5)
+        queryset = BookInstance.objects.all()
+        with mock.patch.object(EstimatedCountPaginator, "threshold", 5):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 5)
+            filtered = queryset.filter(status="o")
+            self.assertEqual(EstimatedCountPaginator(filtered, 10).count, 7)
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 7)
+
+
+class ChangeFormWidgetsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserFactory(is_superuser=True)
+        UserFactory.create_batch(30, password=None)
+        cls.book = BookFactory(title="Popular book", author=AuthorFactory())
+        cls.copies = BookInstanceFactory.create_batch(25, book=cls.book)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_foreign_keys_use_autocomplete(self):
+        url = reverse("admin:catalog_bookinstance_change", args=[self.copies[0].pk])
+        response = self.client.get(url)
+        self.assertContains(response, "admin-autocomplete")
+        # Only the selected book, not one <option> per user or book
+        self.assertLess(response.content.count(b"<option"), 10)
+
+    def test_autocomplete_pages_results(self):
+        url = reverse("admin:autocomplete")
+        params = {
+            "app_label": "catalog",
+            "model_name": "bookinstance",
+            "field_name": "borrower",
+            "term": "user",
+        }
+        data = self.client.get(url, params).json()
+        self.assertEqual(len(data["results"]), 20)
+        self.assertTrue(data["pagination"]["more"])
+        data = self.client.get(url, dict(params, field_name="book", term="popular"))
+        self.assertEqual(
+            data.json()["results"], [{"id": str(self.book.pk), "text": "Popular book"}]
+        )
+
+    def test_staff_who_can_lend_copies_can_look_up_borrowers(self):
+        url = reverse("admin:autocomplete")
+        params = {
+            "app_label": "catalog",
+            "model_name": "bookinstance",
+            "field_name": "borrower",
+            "term": "user",
+        }
+        staff = UserFactory()
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url, params).status_code, 403)
+
+        # No auth.view_user needed, as with the <select> the widget replaced
+        permission = Permission.objects.get(codename="change_bookinstance")
+        staff.user_permissions.add(permission)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 20)
+
+    def test_inline_is_paginated(self):
+        url = reverse("admin:catalog_book_change", args=[self.book.pk])
+        response = self.client.get(url)
+        formset = response.context["inline_admin_formsets"][0].formset
+        first = {form.instance.pk for form in formset.initial_forms}
+        self.assertEqual(len(first), 20)
+        self.assertContains(response, "Page 1 of 2, 25 in all")
+
+        response = self.client.get(url, {f"{formset.prefix}-page": 2})
+        formset = response.context["inline_admin_formsets"][0].formset
+        second = {form.instance.pk for form in formset.initial_forms}
+        self.assertEqual(first | second, {copy.pk for copy in self.copies})
+        self.assertEqual(len(second), 5)
+
+    def test_save_covers_the_rows_shown(self):
+        request = RequestFactory().get("/")
+        request.user = self.admin
+        inline = BooksInstanceInline(Book, admin.site)
+        FormSet = inline.get_formset(request, self.book)
+        shown = FormSet(instance=self.book)
+        data = {
+            f"{shown.prefix}-TOTAL_FORMS": len(shown.initial_forms),
+            f"{shown.prefix}-INITIAL_FORMS": len(shown.initial_forms),
+        }
+        for form in shown.initial_forms:
+            for name in form.fields:
+                value = form[name].value()
+                if value not in (None, False):
+                    data[form.add_prefix(name)] = value
+            data[form.add_prefix("imprint")] = "Reprint"
+        # A renewal between showing and saving moves a row to the next page
+        moved = shown.initial_forms[0].instance
+        BookInstance.objects.filter(pk=moved.pk).update(
+            due_back=datetime.date(2030, 1, 1)
+        )
+
+        formset = FormSet(data, instance=self.book)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        formset.save()
+        self.assertEqual(self.book.bookinstance_set.count(), 25)
+        self.assertEqual(
+            self.book.bookinstance_set.filter(imprint="Reprint").count(), 20
+        )
+        moved.refresh_from_db()
+        self.assertEqual(moved.imprint, "Reprint")
@@ -0,0 +1,108 @@
+import datetime
+import re
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import include, path, reverse
+
+from catalog import urls as catalog_urls
+from catalog.factory import AuthorFactory, BookFactory, BookInstanceFactory, UserFactory
+from catalog.models import Author, Book
+from catalog.query_budget import QueryBudgetExceeded, query_budget
+
+urlpatterns = [
+    path("catalog/", include(catalog_urls.with_async_views(catalog_urls.urlpatterns))),
+    path("accounts/", include("django.contrib.auth.urls")),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, QUERY_BUDGET_STRICT=True)
+class AsyncViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AuthorFactory()
+        cls.books = BookFactory.create_batch(12, author=cls.author)
+        cls.user = UserFactory()
+        cls.copy = BookInstanceFactory(
+            book=cls.books[0],
+            status="o",
+            borrower=cls.user,
+            due_back=datetime.date.today() + datetime.timedelta(days=3),
+        )
+
+    def sync_page(self, url):
+        with self.settings(ROOT_URLCONF="locallibrary.urls"):
+            return self.client.get(url)
+
+    def assertSamePage(self, response, expected):
+        # The CSRF token in the language form is masked differently every time
+        csrf = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+        self.assertEqual(
+            csrf.sub(b"", response.content), csrf.sub(b"", expected.content)
+        )
+
+    async def test_pages_match_sync_views(self):
+        urls = [
+            reverse("index"),
+            reverse("books"),
+            reverse("books") + "?page=2",
+            reverse("books") + "?available=1",
+            reverse("book-detail", args=[self.books[0].pk]),
+            reverse("authors"),
+            reverse("author-detail", args=[self.author.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.sync_page)(url)
+                self.assertSamePage(response, expected)
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    async def test_cursor_pages(self):
+        response = await self.async_client.get(reverse("books") + "?cursor=")
+        self.assertEqual(len(response.context["book_list"]), 10)
+        next_cursor = response.context["page_obj"].next_cursor
+        response = await self.async_client.get(
+            reverse("books"), {"cursor": next_cursor}
+        )
+        self.assertEqual(len(response.context["book_list"]), 2)
+        response = await self.async_client.get(reverse("books") + "?cursor=bogus")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_not_modified(self):
+        url = reverse("book-detail", args=[self.books[0].pk])
+        etag = (await self.async_client.get(url))["ETag"]
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_missing_objects(self):
+        response = await self.async_client.get(reverse("book-detail", args=[0]))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse("books") + "?page=9")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_my_borrowed(self):
+        url = reverse("my-borrowed")
+        response = await self.async_client.get(url)
+        self.assertRedirects(
+            response, f"/accounts/login/?next={url}", fetch_redirect_response=False
+        )
+
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(url)
+        self.assertEqual(list(response.context["bookinstance_list"]), [self.copy])
+        self.assertTemplateUsed(
+            response, "catalog/bookinstance_list_borrowed_user.html"
+        )
+
+    async def test_query_budget_counts_async_queries(self):
+        @query_budget(1)
+        async def view(request):
+            await Book.objects.acount()
+            await Author.objects.acount()
+            return HttpResponse()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            await view(AsyncRequestFactory().get("/"))
@@ -0,0 +1,117 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from catalog.boot import (
+    CollectStatic,
+    CompileMessages,
+    FileStampMixin,
+    LoadData,
+    Migrate,
+    Step,
+    run_step,
+)
+from catalog.models import BootStamp, Genre
+
+
+class BootTest(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_fixture(self, name):
+        path = self.directory / "genres.json"
+        path.write_text(
+            json.dumps([{"model": "catalog.genre", "pk": 1, "fields": {"name": name}}])
+        )
+        return str(path)
+
+    def test_migrate_skips_when_migrations_did_not_change(self):
+        self.assertEqual(run_step(Migrate()), "ran")
+        self.assertTrue(BootStamp.objects.filter(step="migrate").exists())
+        self.assertEqual(run_step(Migrate()), "up to date")
+        self.assertEqual(run_step(Migrate(), force=True), "ran")
+
+    def test_loaddata_runs_again_when_the_fixture_changes(self):
+        fixture = self.write_fixture("Poetry")
+        self.assertEqual(run_step(LoadData([fixture])), "ran")
+        self.assertEqual(run_step(LoadData([fixture])), "up to date")
+
+        self.write_fixture("Drama")
+        self.assertEqual(run_step(LoadData([fixture])), "ran")
+        self.assertEqual(Genre.objects.get(pk=1).name, "Drama")
+
+    def test_collectstatic_stamp_lives_with_the_output(self):
+        with override_settings(STATIC_ROOT=self.directory / "static"):
+            self.assertEqual(run_step(CollectStatic()), "ran")
+            self.assertTrue((self.directory / "static" / "css" / "styles.css").exists())
+            self.assertEqual(run_step(CollectStatic()), "up to date")
+
+            # An emptied static volume takes the stamp with it
+            shutil.rmtree(self.directory / "static")
+            self.assertEqual(run_step(CollectStatic()), "ran")
+
+    def test_compilemessages_notices_a_missing_mo_file(self):
+        messages = self.directory / "locale" / "vi" / "LC_MESSAGES"
+        messages.mkdir(parents=True)
+        (messages / "django.po").write_text('msgid "Home"\nmsgstr "Trang chủ"\n')
+        step = CompileMessages(self.directory)
+        step.write_stamp(step.fingerprint())
+        self.assertTrue(step.missing_output())
+
+        (messages / "django.mo").write_bytes(b"")
+        self.assertFalse(step.missing_output())
+        self.assertEqual(run_step(step), "up to date")
+
+    @override_settings(IS_PRODUCT=True)
+    def test_production_never_makes_migrations(self):
+        out = StringIO()
+        with override_settings(STATIC_ROOT=self.directory / "static"), mock.patch(
+            "catalog.boot.call_command"
+        ) as command:
+            call_command("boot", "--skip", "compilemessages", stdout=out)
+        ran = [call.args[0] for call in command.call_args_list]
+        self.assertEqual(ran, ["migrate", "loaddata", "collectstatic"])
+        self.assertIn("makemigrations: skipped (production)", out.getvalue())
+        self.assertIn("Ready in", out.getvalue())
+
+        out = StringIO()
+        with override_settings(STATIC_ROOT=self.directory / "static"), mock.patch(
+            "catalog.boot.call_command"
+        ) as command:
+            call_command("boot", "--skip", "compilemessages", stdout=out)
+        self.assertEqual(command.call_args_list, [])
+        self.assertIn("migrate: up to date", out.getvalue())
+
+    def test_development_makes_migrations(self):
+        with override_settings(STATIC_ROOT=self.directory / "static"), mock.patch(
+            "catalog.boot.call_command"
+        ) as command:
+            call_command(
+                "boot",
+                "--skip",
+                "compilemessages",
+                "--skip",
+                "loaddata",
+                stdout=StringIO(),
+            )
+        ran = [call.args[0] for call in command.call_args_list]
+        self.assertEqual(ran, ["makemigrations", "migrate", "collectstatic"])
+
+    def test_steps_must_define_run_and_stamp_path(self):
+        class NoStampPath(FileStampMixin, Step):
+            name = "incomplete"
+
+            def run(self, stdout):
+                pass
+
+        with self.assertRaisesMessage(TypeError, "stamp_path"):
+            NoStampPath()
+        with self.assertRaisesMessage(TypeError, "run"):
+            type("NoRun", (Step,), {"name": "no-run"})()
@@ -0,0 +1,170 @@
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from catalog.db import pool as pool_module
+from catalog.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+
+        return ConnectionPool(connect, **kwargs)
+
+    def test_reuses_released_connections(self):
+        pool = self.make_pool(size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_waits_for_a_connection_then_times_out(self):
+        pool = self.make_pool(size=1, timeout=5)
+        connection = pool.acquire()
+        threading.Timer(0.05, pool.release, [connection]).start()
+        self.assertIs(pool.acquire(), connection)
+
+        pool.timeout = 0.01
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_discards_broken_and_old_connections(self):
+        pool = self.make_pool(size=1, check_after=0, is_usable=lambda c: False)
+        broken = pool.acquire()
+        pool.release(broken)
+        self.assertIsNot(pool.acquire(), broken)
+        self.assertTrue(broken.closed)
+
+        pool = self.make_pool(size=1, max_lifetime=0)
+        old = pool.acquire()
+        pool.release(old)
+        self.assertTrue(old.closed)
+
+        pool = self.make_pool(size=1)
+        failed = pool.acquire()
+        pool.release(failed, discard=True)
+        self.assertTrue(failed.closed)
+        self.assertEqual(pool.total, 0)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(mock.Mock(side_effect=OSError), size=1)
+        with self.assertRaises(OSError):
+            pool.acquire()
+        self.assertEqual(pool.total, 0)
+
+    def test_reports_each_leak_once(self):
+        pool = self.make_pool(size=2, leak_timeout=0, leak_tracebacks=True)
+        pool.acquire()
+        with self.assertLogs("catalog.db.pool", "WARNING") as logs:
+            pool.report_leaks()
+            pool.report_leaks()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("test_reports_each_leak_once", logs.output[0])
+
+    def test_forked_process_does_not_reuse_parent_connections(self):
+        pool = self.make_pool(size=1)
+        parent = pool.acquire()
+        pool.release(parent)
+        with mock.patch("os.getpid", return_value=os.getpid() + 1):
+            self.assertIsNot(pool.acquire(), parent)
+        self.assertFalse(parent.closed)
+
+
+class PooledBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        patcher = mock.patch.dict(pool_module._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connections = ConnectionHandler(
+            {
+                "default": {
+                    "ENGINE": "catalog.db.sqlite3",
+                    "NAME": os.path.join(directory, "pool.sqlite3"),
+                    "POOL": {"SIZE": 2},
+                }
+            }
+        )
+        self.addCleanup(self.connections.close_all)
+
+    def test_closed_connections_go_back_to_the_pool(self):
+        connection = self.connections["default"]
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        self.assertIsNone(connection.connection)
+
+        # Another thread, as under ASGI, gets the same raw connection
+        def request():
+            other = self.connections["default"]
+            with other.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self.reused = other.connection is raw
+            other.close()
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+        self.assertTrue(self.reused)
+
+    def test_connection_closed_in_a_transaction_is_not_reused(self):
+        connection = self.connections["default"]
+        connection.set_autocommit(False)
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+        self.assertIsNot(connection.connection, raw)
+        connection.close()
+
+
+class GunicornConnectionBudgetTest(SimpleTestCase):
+    def load(self, **env):
+        env = dict(
+            {
+                "DJANGO_ASGI": "0",
+                "DB_POOL": "0",
+                "GUNICORN_THREADS": "8",
+                "GUNICORN_WORKERS": "",
+            },
+            **env,
+        )
+        with mock.patch.dict(os.environ, env), mock.patch(
+            "multiprocessing.cpu_count", return_value=32
+        ):
+            return runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+
+    def test_default_workers_stay_within_the_connection_budget(self):
+        self.assertEqual(self.load()["workers"], 15)
+        self.assertEqual(self.load(DB_POOL="1", DB_POOL_SIZE="10")["workers"], 12)
+        self.assertEqual(self.load(GUNICORN_DB_CONNECTIONS="1000")["workers"], 65)
+
+    def test_startup_warns_when_workers_exceed_the_budget(self):
+        config = self.load(GUNICORN_WORKERS="20")
+        server = mock.Mock()
+        server.cfg.workers = config["workers"]
+        server.cfg.preload_app = False
+        config["when_ready"](server)
+        server.log.warning.assert_called_once_with(
+            "Up to %d MySQL connections: %d workers x %d", 160, 20, 8
+        )
@@ -3,7 +3,7 @@ import datetime
 from django.test import TestCase
 from django.utils import timezone
 
-from catalog.forms import RenewBookModelForm
+from catalog.forms import BulkLoanForm, RenewBookModelForm
 
 
 class RenewBookFormTest(TestCase):
@@ -44,3 +44,27 @@ class RenewBookFormTest(TestCase):
         date = timezone.localtime() + datetime.timedelta(weeks=4)
         form = RenewBookModelForm(data={"due_back": date})
         self.assertTrue(form.is_valid())
+
+
+class BulkLoanFormTest(TestCase):
+    def test_renew_uses_renewal_date_rules(self):
+        for weeks, valid in [(-1, False), (2, True), (5, False)]:
+            due_back = datetime.date.today() + datetime.timedelta(weeks=weeks)
+            form = BulkLoanForm(
+                data={"action": "renew", "scope": "all", "due_back": due_back}
+            )
+            self.assertEqual(form.is_valid(), valid, weeks)
+
+    def test_renew_requires_date(self):
+        form = BulkLoanForm(data={"action": "renew", "scope": "all"})
+        self.assertIn("due_back", form.errors)
+
+    def test_selected_scope_requires_copies(self):
+        form = BulkLoanForm(data={"action": "return", "scope": "selected"})
+        self.assertIn("copies", form.errors)
+
+    def test_invalid_copy_id(self):
+        form = BulkLoanForm(
+            data={"action": "return", "scope": "selected", "copies": ["nope"]}
+        )
+        self.assertIn("copies", form.errors)
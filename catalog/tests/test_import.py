@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from catalog.importer import InvalidRecord, read_records
+from catalog.models import Author, Book, BookInstance, CatalogCounter, Genre
+
+CSV = """isbn,title,summary,author_first_name,author_last_name,genres,copies,imprint,status
+9780441013593,Dune,"Desert, planet",Frank,Herbert,Science Fiction;Classic,3,Ace,a
+9780441172719,Dune Messiah,Sequel,Frank,Herbert,Science Fiction,1,Ace,o
+9780553293357,Foundation,Empire,Isaac,Asimov,,0,,
+"""
+
+
+class ImportCatalogTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        call_command("import_catalog", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_import(self):
+        output = self.run_import(self.write("books.csv", CSV), "--batch-size=2")
+        self.assertIn("3 records imported", output)
+        dune = Book.objects.get(isbn="9780441013593")
+        self.assertEqual(dune.summary, "Desert, planet")
+        self.assertEqual(str(dune.author), "Herbert, Frank")
+        self.assertEqual(
+            set(dune.genre.values_list("name", flat=True)),
+            {"Science Fiction", "Classic"},
+        )
+        self.assertEqual(dune.bookinstance_set.filter(status="a").count(), 3)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+
+        counter = CatalogCounter.load()
+        self.assertEqual((counter.num_books, counter.num_authors), (3, 2))
+        self.assertEqual(
+            (counter.num_instances, counter.num_instances_available), (4, 3)
+        )
+
+    def test_import_again_updates_without_duplicates(self):
+        self.run_import(self.write("books.csv", CSV))
+        changed = CSV.replace("Dune Messiah,Sequel", "Dune Messiah,Second book")
+        output = self.run_import(self.write("books.csv", changed))
+        self.assertIn("books updated: 1", output)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(BookInstance.objects.count(), 4)
+        self.assertEqual(Book.genre.through.objects.count(), 3)
+        self.assertEqual(Book.objects.get(isbn="9780441172719").summary, "Second book")
+        self.assertEqual(CatalogCounter.reconcile(), {})
+
+    def test_jsonl_import(self):
+        rows = [
+            {"isbn": "9780441013593", "title": "Dune", "genres": ["Classic"]},
+            {"isbn": "9780553293357", "title": "Foundation", "copies": 2},
+        ]
+        path = self.write("books.jsonl", "\n".join(json.dumps(row) for row in rows))
+        self.run_import(path)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(BookInstance.objects.count(), 2)
+
+    def test_copies_are_inserted_batch_size_at_a_time(self):
+        row = {"isbn": "9780553293357", "title": "Foundation", "copies": 5}
+        path = self.write("books.jsonl", json.dumps(row))
+        with CaptureQueriesContext(connection) as captured:
+            self.run_import(path, "--batch-size=2")
+        inserts = [
+            sql
+            for sql in (query["sql"] for query in captured.captured_queries)
+            if sql.startswith("INSERT") and "catalog_bookinstance" in sql
+        ]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(BookInstance.objects.count(), 5)
+
+    def test_resume_after_invalid_record(self):
+        broken = CSV.replace("9780553293357,Foundation", ",Foundation")
+        path = self.write("books.csv", broken)
+        with self.assertRaisesMessage(CommandError, "line 4"):
+            self.run_import(path, "--batch-size=1")
+        self.assertEqual(Book.objects.count(), 2)
+        with open(f"{path}.checkpoint") as file:
+            self.assertEqual(json.load(file)["records"], 2)
+
+        self.write("books.csv", CSV)
+        output = self.run_import(path, "--resume", "--batch-size=1")
+        self.assertIn("Resuming after 2 records", output)
+        self.assertIn("records: 1", output)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_invalid_jsonl_records(self):
+        for text, message in [
+            ("[1]", "not a JSON object"),
+            ('"x"', "not a JSON object"),
+            ('{"isbn": "1", "title": "T", "genres": 5}', "genres must be a list"),
+            ('{"isbn": "1", "title": "T", "genres": [1]}', "genres must be a list"),
+            ('{"isbn": "1", "title": "T", "copies": [1]}', "copies must be a number"),
+        ]:
+            with self.subTest(text), self.assertRaisesMessage(InvalidRecord, message):
+                list(read_records(StringIO(f"{text}\n"), "jsonl"))
+
+    def test_authors_match_like_the_database(self):
+        rows = [
+            {"isbn": "1", "title": "A", "author_last_name": "Le Guin"},
+            {"isbn": "2", "title": "B", "author_last_name": "le guin "},
+            {"isbn": "3", "title": "C", "author_last_name": "Lé Guin"},
+            {"isbn": "4", "title": "D", "genres": ["Fantasy", "fantasy"]},
+        ]
+        path = self.write("books.jsonl", "\n".join(json.dumps(row) for row in rows))
+        self.run_import(path)
+        author = Author.objects.get()
+        self.assertEqual(author.last_name, "Le Guin")
+        self.assertEqual(author.book_set.count(), 3)
+        self.assertEqual(Genre.objects.get().name, "Fantasy")
+
+    def test_reimport_matches_stored_authors_like_the_database(self):
+        Author.objects.create(first_name="John", last_name="Smith")
+        Author.objects.create(first_name="Ursula", last_name="Le Guin")
+        rows = [
+            {
+                "isbn": "1",
+                "title": "A",
+                "author_first_name": "john",
+                "author_last_name": "smith",
+            },
+            {
+                "isbn": "2",
+                "title": "B",
+                "author_first_name": "Ursula",
+                "author_last_name": "LÉ GUIN",
+            },
+        ]
+        path = self.write("books.jsonl", "\n".join(json.dumps(row) for row in rows))
+        self.run_import(path)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Book.objects.get(isbn="1").author.last_name, "Smith")
+        self.assertEqual(Book.objects.get(isbn="2").author.last_name, "Le Guin")
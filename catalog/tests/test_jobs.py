@@ -0,0 +1,168 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import jobs
+from catalog.factory import UserFactory
+from catalog.models import Job
+
+calls = []
+
+
+def record(**kwargs):
+    calls.append(kwargs)
+
+
+def nap(seconds):
+    time.sleep(seconds)
+
+
+def explode():
+    raise RuntimeError("boom")
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_deletes_finished_job(self):
+        job = jobs.enqueue(record, value=1)
+        self.assertEqual(job.name, "catalog.tests.test_jobs.record")
+        claimed = jobs.claim("test")
+        self.assertEqual((claimed.pk, claimed.status), (job.pk, Job.RUNNING))
+        self.assertEqual(jobs.run(claimed), "done")
+        self.assertEqual(calls, [{"value": 1}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_skips_future_and_other_queues(self):
+        jobs.enqueue(record, delay=60)
+        jobs.enqueue(record, queue="other")
+        self.assertIsNone(jobs.claim("test"))
+        self.assertIsNotNone(jobs.claim("test", queues=["other"]))
+
+    @override_settings(JOB_BACKOFF_BASE=10)
+    def test_failures_back_off_then_fail(self):
+        job = jobs.enqueue(explode, max_attempts=2)
+        with self.assertLogs("catalog.jobs", "WARNING"):
+            self.assertEqual(jobs.run(jobs.claim("test")), "retry")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=4))
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("catalog.jobs", "ERROR"):
+            self.assertEqual(jobs.run(jobs.claim("test")), "failed")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNone(jobs.claim("test"))
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_requeue_stale(self):
+        jobs.enqueue(record)
+        jobs.claim("test")
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertIsNotNone(jobs.claim("test"))
+
+    @override_settings(JOB_LOCK_TIMEOUT=0.15)
+    def test_running_job_keeps_its_lock(self):
+        jobs.enqueue(nap, seconds=0.3)
+        job = jobs.claim("test")
+        with mock.patch("catalog.jobs.heartbeat") as heartbeat:
+            self.assertEqual(jobs.run(job), "done")
+        self.assertGreaterEqual(heartbeat.call_count, 2)
+
+        jobs.enqueue(record)
+        job = jobs.claim("test")
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertTrue(jobs.heartbeat(job))
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.update(locked_by="other")
+        self.assertFalse(jobs.heartbeat(job))
+
+    def test_finished_job_is_left_to_the_worker_that_took_it_over(self):
+        jobs.enqueue(record)
+        job = jobs.claim("test")
+        Job.objects.update(locked_by="other")
+        with self.assertLogs("catalog.jobs", "WARNING"):
+            self.assertEqual(jobs.run(job), "done")
+        self.assertEqual(Job.objects.get().locked_by, "other")
+
+    def test_run_worker_burst(self):
+        for value in range(3):
+            jobs.enqueue(record, value=value)
+        jobs.enqueue(explode, max_attempts=1)
+        with self.assertLogs("catalog.jobs", "ERROR"):
+            call_command("run_worker", "--burst", "--concurrency=1", stdout=StringIO())
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(list(Job.objects.values_list("status", flat=True)), ["failed"])
+
+    def test_queue_depth_metrics(self):
+        jobs.enqueue(record)
+        content = self.client.get("/metrics").content.decode()
+        self.assertIn('jobs_queued{queue="default",status="queued"} 1.0', content)
+        self.assertIn('jobs_oldest_due_age_seconds{queue="default"}', content)
+
+
+@override_settings(
+    EMAIL_BACKEND="catalog.mail.QueuedEmailBackend",
+    QUEUED_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class QueuedEmailTest(TestCase):
+    def test_mail_is_sent_by_the_worker(self):
+        message = mail.EmailMultiAlternatives(
+            "Subject", "Body", "library@example.com", ["reader@example.com"]
+        )
+        message.attach_alternative("<p>Body</p>", "text/html")
+        message.attach("notes.txt", "Due soon", "text/plain")
+        message.send()
+        self.assertEqual(len(mail.outbox), 0)
+
+        job = jobs.claim("test", queues=["email"])
+        self.assertEqual(jobs.run(job), "done")
+        self.assertEqual(len(mail.outbox), 1)
+        sent = mail.outbox[0]
+        self.assertEqual((sent.subject, sent.to), ("Subject", ["reader@example.com"]))
+        self.assertEqual(sent.alternatives, [("<p>Body</p>", "text/html")])
+        self.assertEqual(sent.attachments[0][:2], ("notes.txt", "Due soon"))
+
+    def test_fail_silently_reaches_the_worker(self):
+        mail.send_mail("Subject", "Body", None, ["a@example.com"], fail_silently=True)
+        mail.send_mail("Subject", "Body", None, ["b@example.com"])
+        self.assertEqual(
+            [job.payload["fail_silently"] for job in Job.objects.order_by("pk")],
+            [True, False],
+        )
+        with mock.patch("catalog.mail.get_connection") as get_connection:
+            jobs.run(jobs.claim("test", queues=["email"]))
+        self.assertIs(get_connection.call_args.kwargs["fail_silently"], True)
+
+    def test_failed_mail_keeps_only_the_envelope(self):
+        mail.send_mail("Reset", "secret-token", None, ["a@example.com"])
+        Job.objects.update(max_attempts=1)
+        with mock.patch(
+            "catalog.mail.get_connection", side_effect=OSError("down")
+        ), self.assertLogs("catalog.jobs", "ERROR"):
+            self.assertEqual(jobs.run(jobs.claim("test", queues=["email"])), "failed")
+        message = Job.objects.get().payload["message"]
+        self.assertEqual(message["to"], ["a@example.com"])
+        self.assertNotIn("body", message)
+        self.assertNotIn("secret-token", str(message))
+
+    def test_password_reset_does_not_send_inline(self):
+        UserFactory(email="reader@example.com")
+        response = self.client.post(
+            reverse("password_reset"), {"email": "reader@example.com"}
+        )
+        self.assertRedirects(response, reverse("password_reset_done"))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.filter(queue="email").count(), 1)
@@ -0,0 +1,70 @@
+import logging
+import os
+import random
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from catalog.loadtest import dataset, report, runner
+
+TINY = {"genres": 2, "authors": 3, "books": 12, "copies": 30, "members": 2}
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoadTestRunTest(LiveServerTestCase):
+    def setUp(self):
+        # The live server's threads share the test database connection, so
+        # each view's query budget counts the other threads' queries too
+        logger = logging.getLogger("catalog.query_budget")
+        patcher = mock.patch.object(logger, "disabled", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_mixed_traffic_against_a_live_server(self):
+        added = dataset.seed(TINY, rng=random.Random(1))
+        self.assertEqual(added["books"], 12)
+        self.assertEqual(dataset.seed(TINY)["books"], 0)
+
+        result = runner.run(
+            self.live_server_url,
+            dataset.Targets(),
+            mix="mixed",
+            users=10,
+            duration=2,
+            seed=1,
+        )
+        self.assertEqual(result["total"]["errors"], 0, result["routes"])
+        for route in ("index", "books", "book-detail", "my-borrowed", "login"):
+            self.assertGreater(result["routes"][route]["requests"], 0, route)
+        books = result["routes"]["books"]
+        self.assertLessEqual(books["p50_ms"], books["p99_ms"])
+        self.assertGreater(books["queries_per_request"], 0)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "result.json")
+        report.save(result, path)
+        self.assertEqual(
+            report.load(path)["total"]["requests"], result["total"]["requests"]
+        )
+
+
+class ReportTest(SimpleTestCase):
+    def test_assign_kinds(self):
+        self.assertEqual(
+            runner.assign_kinds("mixed", 10),
+            ["anonymous"] * 7 + ["member"] * 2 + ["librarian"],
+        )
+        self.assertEqual(len(runner.assign_kinds("mixed", 3)), 3)
+
+    def test_queries_per_request_from_metrics(self):
+        metrics = (
+            "# TYPE django_db_queries_per_request histogram\n"
+            'django_db_queries_per_request_sum{route="books"} %d\n'
+            'django_db_queries_per_request_count{route="books"} %d\n'
+        )
+        before = report.query_totals(metrics % (10, 2))
+        after = report.query_totals(metrics % (40, 8))
+        self.assertEqual(report.queries_per_request(before, after), {"books": 5.0})
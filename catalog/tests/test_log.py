@@ -0,0 +1,116 @@
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.log import BackgroundHandler, JsonFormatter, SamplingFilter, log_context
+
+
+class LogTestMixin:
+    def capture(self, name, **kwargs):
+        """Send ``name``'s records to a JSON BackgroundHandler; return its lines."""
+        stream = io.StringIO()
+        handler = BackgroundHandler(stream=stream, **kwargs)
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger(name)
+        level, propagate = logger.level, logger.propagate
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+
+        def cleanup():
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = propagate
+            handler.close()
+
+        self.addCleanup(cleanup)
+
+        def lines():
+            handler.flush()
+            return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+        return handler, lines
+
+
+class RequestLogMiddlewareTest(LogTestMixin, TestCase):
+    def test_access_log_has_request_id_and_route(self):
+        _, lines = self.capture("catalog.access")
+        response = self.client.get(reverse("books"), HTTP_X_REQUEST_ID="lb-42")
+        self.assertEqual(response["X-Request-ID"], "lb-42")
+        [entry] = lines()
+        self.assertEqual(entry["request_id"], "lb-42")
+        self.assertEqual(entry["route"], "books")
+        self.assertEqual(entry["status"], 200)
+        self.assertEqual(entry["path"], reverse("books"))
+
+    def test_unusable_request_id_is_replaced(self):
+        response = self.client.get(reverse("index"), HTTP_X_REQUEST_ID="a b\n")
+        self.assertRegex(response["X-Request-ID"], r"^[0-9a-f]{32}$")
+
+    def test_records_outside_a_request(self):
+        _, lines = self.capture("catalog.test")
+        logger = logging.getLogger("catalog.test")
+        with log_context("job-1"):
+            logger.info("inside %s", "context", extra={"job": 7})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("outside")
+        inside, outside = lines()
+        self.assertEqual(inside["message"], "inside context")
+        self.assertEqual(inside["request_id"], "job-1")
+        self.assertEqual(inside["job"], 7)
+        self.assertIsNone(outside["request_id"])
+        self.assertIn("ZeroDivisionError", outside["exception"])
+
+
+class BackgroundHandlerTest(LogTestMixin, TestCase):
+    def test_sampling_keeps_warnings(self):
+        handler, lines = self.capture("catalog.test")
+        handler.addFilter(SamplingFilter(0))
+        logger = logging.getLogger("catalog.test")
+        for _ in range(10):
+            logger.info("dropped")
+        logger.warning("kept")
+        self.assertEqual([entry["message"] for entry in lines()], ["kept"])
+
+    def test_mutable_arguments_are_rendered_when_logged(self):
+        _, lines = self.capture("catalog.test")
+        logger = logging.getLogger("catalog.test")
+        params = [1]
+        logger.info("params %s, id %d", params, 7)
+        params.append(2)
+        self.assertEqual(lines()[0]["message"], "params [1], id 7")
+
+    def test_full_queue_drops_records_below_warning(self):
+        handler, lines = self.capture("catalog.test", queue_size=0)
+        logger = logging.getLogger("catalog.test")
+        logger.debug("dropped")
+        logger.error("kept")
+        self.assertEqual([entry["message"] for entry in lines()], ["kept"])
+        self.assertEqual(handler.dropped, 1)
+
+    def test_size_rotation(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        handler = BackgroundHandler(
+            filename=os.path.join(directory, "site-{pid}.log"),
+            max_bytes=200,
+            backup_count=2,
+        )
+        handler.setFormatter(JsonFormatter())
+        for n in range(20):
+            handler.handle(
+                logging.makeLogRecord({"msg": f"record {n}", "levelno": logging.INFO})
+            )
+        handler.close()
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            [f"site-{os.getpid()}.log{suffix}" for suffix in ("", ".1", ".2")],
+        )
@@ -0,0 +1,42 @@
+from django.test import TestCase
+from django.urls import reverse
+from catalog.factory import BookFactory
+
+
+class MetricsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = BookFactory()
+
+    def test_metrics_endpoint(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+    def test_request_latency_labeled_by_url_name(self):
+        self.client.get(reverse("books"))
+        self.client.get(reverse("book-detail", kwargs={"pk": self.book.pk}))
+        self.client.get("/catalog/does-not-exist/")
+        content = self.client.get("/metrics").content.decode()
+        for route, status in (
+            ("books", 200),
+            ("book-detail", 200),
+            ("<unresolved>", 404),
+        ):
+            self.assertIn(
+                "django_http_request_duration_seconds_count{"
+                f'method="GET",route="{route}",status="{status}"}}',
+                content,
+            )
+
+    def test_db_and_template_metrics(self):
+        self.client.get(reverse("books"))
+        content = self.client.get("/metrics").content.decode()
+        self.assertIn('django_db_queries_per_request_count{route="books"}', content)
+        self.assertIn(
+            'django_db_query_duration_seconds_per_request_sum{route="books"}', content
+        )
+        self.assertIn(
+            'django_template_render_duration_seconds_count{template="catalog/book_list.html"}',
+            content,
+        )
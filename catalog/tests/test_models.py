@@ -1,13 +1,22 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from catalog.factory import (
     AuthorFactory,
     BookFactory,
     BookInstanceFactory,
     GenreFactory,
 )
-from catalog.models import Author, Genre, Book, BookInstance
+from catalog.models import Author, Genre, Book, BookInstance, CatalogCounter
 import datetime
+from io import StringIO
+from django.core.management import call_command
 from django.contrib.auth.models import User
+from unittest import mock
+from catalog.management.commands.benchmark_loan_indexes import (
+    BORROWER_INDEX,
+    LOAN_INDEXES,
+    Command as BenchmarkLoanIndexes,
+)
 
 
 class AuthorModelTest(TestCase):
@@ -120,3 +129,120 @@ class BookInstanceModelTest(TestCase):
         Author.objects.filter(id=self.bookInstance.book.author.id).delete()
         Book.objects.filter(id=self.bookInstance.book.id).delete()
         self.assertIsNone(BookInstance.objects.filter(self.bookInstance.id))
+
+
+def bookinstance_indexes():
+    """``{name: columns}`` of the indexes on the BookInstance table."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, BookInstance._meta.db_table
+        )
+    return {
+        name: constraint["columns"]
+        for name, constraint in constraints.items()
+        if constraint["index"] and not constraint["primary_key"]
+    }
+
+
+# Not TestCase: adding and dropping indexes commits on MySQL
+class LoanIndexesTest(TransactionTestCase):
+    def test_composite_indexes_are_declared_and_migrated(self):
+        declared = {index.name: index.fields for index in BookInstance._meta.indexes}
+        self.assertEqual(
+            declared["bookinst_borrower_status_due"],
+            ["borrower", "status", "due_back"],
+        )
+        self.assertEqual(declared["bookinst_status_due"], ["status", "due_back"])
+        indexes = bookinstance_indexes()
+        self.assertEqual(
+            indexes["bookinst_borrower_status_due"],
+            ["borrower_id", "status", "due_back"],
+        )
+        self.assertEqual(indexes["bookinst_status_due"], ["status", "due_back"])
+        # The composite serves the foreign key; no single-column borrower index
+        self.assertNotIn(["borrower_id"], list(indexes.values()))
+
+    def test_benchmark_restores_the_indexes_it_dropped(self):
+        BookInstanceFactory.create_batch(3, book=BookFactory(author=AuthorFactory()))
+        before = bookinstance_indexes()
+        during = {}
+
+        def report(command, title, queries, repeat):
+            during[title] = bookinstance_indexes()
+
+        with mock.patch.object(BenchmarkLoanIndexes, "report", report):
+            call_command(
+                "benchmark_loan_indexes",
+                "--no-seed",
+                "--borrowers=1",
+                "--repeat=1",
+                stdout=StringIO(),
+            )
+        without = during["without loan indexes"]
+        self.assertEqual(
+            set(before) - set(without), set(LOAN_INDEXES), "only the loan indexes"
+        )
+        self.assertEqual(without[BORROWER_INDEX.name], ["borrower_id"])
+        self.assertEqual(bookinstance_indexes(), before)
+        self.assertEqual(during["with loan indexes"], before)
+
+
+class CatalogCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AuthorFactory()
+        cls.book = BookFactory.create(genres=(GenreFactory(),), author=cls.author)
+        cls.available = BookInstanceFactory(book=cls.book, status="a")
+        cls.on_loan = BookInstanceFactory(book=cls.book, status="o")
+
+    def assertCountersMatch(self):
+        counter = CatalogCounter.load()
+        for name, value in CatalogCounter.compute().items():
+            self.assertEqual(getattr(counter, name), value, name)
+
+    def test_counts_created_objects(self):
+        self.assertCountersMatch()
+        counter = CatalogCounter.load()
+        self.assertEqual(counter.num_instances, 2)
+        self.assertEqual(counter.num_instances_available, 1)
+
+    def test_create_and_delete(self):
+        CatalogCounter.load()
+        book = BookFactory(author=AuthorFactory())
+        BookInstanceFactory(book=book, status="a")
+        self.assertCountersMatch()
+        book.author.delete()
+        book.delete()
+        self.assertCountersMatch()
+
+    def test_status_change(self):
+        CatalogCounter.load()
+        self.on_loan.status = "a"
+        self.on_loan.save()
+        self.assertEqual(CatalogCounter.load().num_instances_available, 2)
+        self.on_loan.save()
+        self.assertEqual(CatalogCounter.load().num_instances_available, 2)
+        instance = BookInstance.objects.get(pk=self.available.pk)
+        instance.status = "m"
+        instance.save()
+        self.assertCountersMatch()
+
+    def test_reconcile_command_fixes_drift(self):
+        CatalogCounter.load()
+        BookInstance.objects.update(status="a")
+        self.assertEqual(CatalogCounter.load().num_instances_available, 1)
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("num_instances_available: 1 -> 2", out.getvalue())
+        self.assertCountersMatch()
+
+
+class SeederFixtureTest(TestCase):
+    def test_loads_into_the_migrated_schema(self):
+        # docker-compose loads it on every start, through manage.py boot
+        call_command("loaddata", "seeder.json", verbosity=0)
+        book = Book.objects.select_related("author").get(isbn="9786042262521")
+        self.assertEqual(book.author.last_name, "Ánh")
+        self.assertIsNotNone(book.updated_at)
+        self.assertEqual(book.genre.count(), 2)
+        self.assertTrue(User.objects.filter(username="admin").exists())
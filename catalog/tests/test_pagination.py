@@ -0,0 +1,103 @@
+import datetime
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from catalog.factory import (
+    UserFactory,
+    AuthorFactory,
+    BookFactory,
+    BookInstanceFactory,
+)
+from catalog.models import Author, BookInstance
+from catalog.pagination import CursorPaginator, InvalidCursor
+from django.contrib.auth.models import Permission
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        book = BookFactory()
+        today = datetime.date.today()
+        for day in range(23):
+            # Repeated and missing due dates exercise the pk tie-breaker and NULLs
+            due_back = (
+                None if day % 7 == 0 else today + datetime.timedelta(days=day % 4)
+            )
+            BookInstanceFactory(book=book, due_back=due_back)
+
+    def walk(self, ordering):
+        paginator = CursorPaginator(BookInstance.objects.all(), 5, ordering)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def test_forward_matches_order_by(self):
+        for ordering in (("due_back",), ("-due_back",)):
+            _, pages = self.walk(ordering)
+            seen = [obj.pk for page in pages for obj in page]
+            expected = list(
+                BookInstance.objects.order_by(
+                    *ordering, "-pk" if ordering[0].startswith("-") else "pk"
+                ).values_list("pk", flat=True)
+            )
+            self.assertEqual(seen, expected)
+            self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+            self.assertFalse(pages[0].has_previous())
+
+    def test_backward_returns_same_pages(self):
+        for ordering in (("due_back",), ("-due_back",)):
+            paginator, pages = self.walk(ordering)
+            for number in range(len(pages) - 1, 0, -1):
+                previous = paginator.page(pages[number].previous_cursor)
+                self.assertEqual(list(previous), list(pages[number - 1]))
+            self.assertFalse(paginator.page(pages[1].previous_cursor).has_previous())
+
+    def test_tampered_cursor_is_rejected(self):
+        paginator, pages = self.walk(("due_back",))
+        with self.assertRaises(InvalidCursor):
+            paginator.page(pages[0].next_cursor + "x")
+
+
+class CursorPaginationViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for author_id in range(13):
+            AuthorFactory()
+        user = UserFactory(username="librarian")
+        user.user_permissions.add(Permission.objects.get(name="Get all book on loan"))
+        book = BookFactory()
+        for day in range(12):
+            BookInstanceFactory(
+                book=book,
+                status="o",
+                due_back=datetime.date.today() + datetime.timedelta(days=day),
+            )
+
+    @override_settings(CATALOG_CURSOR_PAGINATION=True)
+    def test_author_pages_follow_meta_ordering(self):
+        response = self.client.get(reverse("authors"))
+        self.assertTrue(response.context["is_paginated"])
+        page = response.context["page_obj"]
+        self.assertTrue(page.is_cursor)
+        self.assertContains(response, "?cursor=")
+        second = self.client.get(reverse("authors"), {"cursor": page.next_cursor})
+        authors = list(response.context["author_list"]) + list(
+            second.context["author_list"]
+        )
+        self.assertEqual(authors, list(Author.objects.all()))
+        self.assertFalse(second.context["page_obj"].has_next())
+
+    def test_cursor_parameter_opts_in(self):
+        self.client.login(username="librarian", password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("bookinst-manage") + "?cursor=")
+        self.assertTrue(response.context["page_obj"].is_cursor)
+        due_dates = [copy.due_back for copy in response.context["bookinstance_list"]]
+        self.assertEqual(due_dates, sorted(due_dates, reverse=True))
+
+    def test_offset_pagination_is_default(self):
+        response = self.client.get(reverse("authors"))
+        self.assertEqual(response.context["page_obj"].number, 1)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse("authors"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,101 @@
+import os
+import runpy
+import time
+from unittest import mock
+
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from catalog.middleware import ReplicaRoutingMiddleware
+from catalog.models import Book, Genre
+from catalog.routers import routing, use_primary
+from locallibrary import settings as project_settings
+
+
+class ReplicaSettingsTest(SimpleTestCase):
+    def test_db_replicas_become_mirrored_replica_aliases(self):
+        env = {"DB_REPLICAS": "localhost/mysite_replica,replica-2:3307"}
+        with mock.patch.dict(os.environ, env):
+            settings = runpy.run_path(project_settings.__file__)
+
+        self.assertEqual(settings["REPLICA_DATABASES"], ["replica1", "replica2"])
+        replica1 = settings["DATABASES"]["replica1"]
+        self.assertEqual(replica1["HOST"], "localhost")
+        self.assertEqual(replica1["NAME"], "mysite_replica")
+        self.assertEqual(replica1["TEST"], {"MIRROR": "default"})
+        replica2 = settings["DATABASES"]["replica2"]
+        self.assertEqual((replica2["HOST"], replica2["PORT"]), ("replica-2", 3307))
+        self.assertEqual(str(settings["LANGUAGES"][0][1]), "English")
+
+
+# Not TestCase: reads inside its transaction always go to the primary
+@override_settings(REPLICA_DATABASES=["replica1"])
+class PrimaryReplicaRouterTest(TransactionTestCase):
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(router.db_for_read(Book), "default")
+
+    def test_reads_in_a_safe_request_use_a_replica_until_it_writes(self):
+        with routing(use_replica=True) as state:
+            self.assertEqual(router.db_for_read(Book), "replica1")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Book), "default")
+            with use_primary():
+                self.assertEqual(router.db_for_read(Book), "default")
+            self.assertEqual(router.db_for_read(Book), "replica1")
+
+            self.assertEqual(router.db_for_write(Genre), "default")
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Book), "default")
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(router.allow_migrate("replica1", "catalog"), False)
+        self.assertIs(router.allow_migrate("default", "catalog"), True)
+
+
+@override_settings(REPLICA_DATABASES=["replica1"])
+class ReplicaRoutingMiddlewareTest(TransactionTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def view(self, request):
+        self.read_from = router.db_for_read(Book)
+        if request.GET.get("write"):
+            Genre.objects.create(name="Poetry")
+        return HttpResponse()
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        ReplicaRoutingMiddleware(self.view)(self.factory.post("/"))
+        self.assertEqual(self.read_from, "default")
+
+    def test_writing_pins_the_client_to_the_primary(self):
+        middleware = ReplicaRoutingMiddleware(self.view)
+        response = middleware(self.factory.get("/"))
+        self.assertEqual(self.read_from, "replica1")
+        self.assertNotIn("db_pin", response.cookies)
+
+        response = middleware(self.factory.get("/", {"write": 1}))
+        cookie = response.cookies["db_pin"]
+        self.assertEqual(cookie["max-age"], 10)
+
+        request = self.factory.get("/")
+        request.COOKIES["db_pin"] = cookie.value
+        middleware(request)
+        self.assertEqual(self.read_from, "default")
+
+        request.COOKIES["db_pin"] = str(time.time() - 1)
+        middleware(request)
+        self.assertEqual(self.read_from, "replica1")
+
+    async def test_async_views_share_the_routing(self):
+        async def view(request):
+            await Genre.objects.acreate(name="Drama")
+            return HttpResponse()
+
+        response = await ReplicaRoutingMiddleware(view)(self.factory.get("/"))
+        self.assertIn("db_pin", response.cookies)
@@ -0,0 +1,54 @@
+import io
+from collections import Counter
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog.factory import AuthorFactory, BookFactory, create_batch_bulk
+from catalog.models import Author, Book, BookInstance, CatalogCounter
+
+
+class SeedScaleTest(TestCase):
+    def test_seeds_a_skewed_catalog(self):
+        out = io.StringIO()
+        call_command(
+            "seed_scale",
+            genres=5,
+            authors=40,
+            users=20,
+            books=400,
+            copies=2000,
+            batch_size=100,
+            random_seed=1,
+            stdout=out,
+        )
+        self.assertIn("Added", out.getvalue())
+        self.assertEqual(Book.objects.count(), 400)
+        self.assertEqual(BookInstance.objects.count(), 2000)
+        self.assertFalse(Book.objects.filter(bookinstance=None).exists())
+        self.assertFalse(Book.objects.filter(genre=None).exists())
+
+        # A few authors and books take a large share
+        books_per_author = Counter(Book.objects.values_list("author", flat=True))
+        self.assertGreater(books_per_author.most_common(1)[0][1], 400 / 40 * 3)
+        copies_per_book = Counter(BookInstance.objects.values_list("book", flat=True))
+        self.assertGreater(copies_per_book.most_common(1)[0][1], 50)
+
+        on_loan = BookInstance.objects.filter(status="o")
+        self.assertFalse(on_loan.filter(due_back=None).exists())
+        self.assertFalse(on_loan.filter(borrower=None).exists())
+        due_dates = set(on_loan.values_list("due_back", flat=True))
+        self.assertGreater(len(due_dates), 10)
+        self.assertEqual(CatalogCounter.reconcile(), {})
+
+
+class FactoryTest(TestCase):
+    def test_each_object_gets_its_own_values(self):
+        authors = AuthorFactory.create_batch(10)
+        self.assertGreater(len({str(author) for author in authors}), 1)
+        self.assertGreater(len({book.title for book in BookFactory.build_batch(10)}), 1)
+
+    def test_create_batch_bulk(self):
+        with self.assertNumQueries(3):
+            create_batch_bulk(AuthorFactory, 25, batch_size=10, last_name="Bulk")
+        self.assertEqual(Author.objects.filter(last_name="Bulk").count(), 25)
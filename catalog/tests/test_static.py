@@ -0,0 +1,88 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from catalog.storage import INDEX_NAME, ResponsiveImagesStorage
+from catalog.templatetags.catalog_tags import responsive_images_index
+
+TAG = Template(
+    "{% load catalog_tags %}"
+    '{% responsive_image "images/banner.jpg" alt="Banner" lazy=lazy class="w-100" %}'
+)
+
+
+class ResponsiveImagesTest(SimpleTestCase):
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        (directory / "src" / "images").mkdir(parents=True)
+        Image.new("RGB", (300, 150), "teal").save(
+            directory / "src" / "images" / "banner.jpg"
+        )
+        self.static_root = directory / "static"
+        settings = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[directory / "src"],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STATICFILES_STORAGE="catalog.storage.ResponsiveImagesStorage",
+            RESPONSIVE_IMAGES={"WIDTHS": [100, 200, 400]},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        responsive_images_index.cache_clear()
+        self.addCleanup(responsive_images_index.cache_clear)
+
+    def collectstatic(self):
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def test_variants_are_hashed_and_listed(self):
+        self.collectstatic()
+        index = json.loads((self.static_root / INDEX_NAME).read_text())
+        entry = index["images/banner.jpg"]
+        self.assertEqual((entry["width"], entry["height"]), (300, 150))
+        self.assertEqual(
+            entry["formats"]["webp"],
+            [[width, f"images/banner-{width}w.webp"] for width in (100, 200, 300)],
+        )
+        manifest = json.loads((self.static_root / "staticfiles.json").read_text())
+        hashed = manifest["paths"]["images/banner-100w.avif"]
+        self.assertRegex(hashed, r"^images/banner-100w\.[0-9a-f]{12}\.avif$")
+        with Image.open(self.static_root / hashed) as variant:
+            self.assertEqual(variant.size, (100, 50))
+
+    def test_unchanged_images_are_not_encoded_again(self):
+        self.collectstatic()
+        with mock.patch.object(ResponsiveImagesStorage, "save_variant") as save:
+            self.collectstatic()
+        save.assert_not_called()
+
+    def test_tag_emits_srcset(self):
+        self.collectstatic()
+        html = TAG.render(Context({"lazy": False}))
+        self.assertRegex(
+            html,
+            r'<source type="image/avif" srcset="/static/images/banner-100w\.\w{12}'
+            r'\.avif 100w, .* 300w" sizes="100vw">',
+        )
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('fetchpriority="high" height="150" width="300"', html)
+        self.assertNotIn("loading", html)
+        self.assertIn('loading="lazy"', TAG.render(Context({"lazy": True})))
+
+    def test_tag_without_variants(self):
+        with override_settings(
+            STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+        ):
+            html = TAG.render(Context({"lazy": True}))
+        self.assertHTMLEqual(
+            html,
+            '<picture><img src="/static/images/banner.jpg" alt="Banner" '
+            'class="w-100" decoding="async" loading="lazy"></picture>',
+        )
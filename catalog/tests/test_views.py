@@ -1,6 +1,15 @@
+import json
+import runpy
 import uuid
-from django.test import TestCase
-from catalog.models import Author, Genre, Book, BookInstance
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
+from catalog.models import Author, Genre, Book, BookInstance, CatalogCounter
 from django.contrib.auth.models import Permission
 from catalog.factory import (
     UserFactory,
@@ -14,6 +23,9 @@ from django.urls import reverse
 from django.test import Client
 from django.contrib.auth.models import User
 from django.utils import timezone
+from catalog.query_budget import QueryBudgetTestMixin
+from catalog import typeahead
+from catalog.search import search_books
 
 
 class HomeViewTest(TestCase):
@@ -31,6 +43,26 @@ class HomeViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "base_generic.html")
 
+    def test_visits_are_counted_without_session_writes(self):
+        for visits in range(1, 4):
+            # Only the counter row is read; nothing is written
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse("index"))
+            self.assertEqual(response.context["num_visits"], visits)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+    def test_tampered_visits_cookie_is_ignored(self):
+        self.client.cookies["num_visits"] = "1000"
+        response = self.client.get(reverse("index"))
+        self.assertEqual(response.context["num_visits"], 1)
+
+    def test_visits_carry_over_from_session(self):
+        session = self.client.session
+        session["num_visits"] = 7
+        session.save()
+        self.assertEqual(self.client.get(reverse("index")).context["num_visits"], 7)
+        self.assertEqual(self.client.get(reverse("index")).context["num_visits"], 8)
+
 
 class BookListViewTest(TestCase):
     @classmethod
@@ -67,6 +99,25 @@ class BookListViewTest(TestCase):
         self.assertTrue(response.context["is_paginated"] == True)
         self.assertEqual(len(response.context["book_list"]), 3)
 
+    def test_availability_counts(self):
+        book = Book.objects.order_by("title", "pk").first()
+        BookInstanceFactory(book=book, status="a")
+        BookInstanceFactory(book=book, status="o")
+        BookInstanceFactory(book=book, status="a")
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("books"))
+            self.assertContains(response, "2 of 3 copies available")
+        listed = response.context["book_list"][0]
+        self.assertEqual((listed.num_copies, listed.num_available), (3, 2))
+
+    def test_available_filter(self):
+        books = Book.objects.order_by("pk")
+        BookInstanceFactory(book=books[0], status="a")
+        BookInstanceFactory(book=books[1], status="o")
+        response = self.client.get(reverse("books"), {"available": "1"})
+        self.assertEqual(list(response.context["book_list"]), [books[0]])
+        self.assertFalse(response.context["is_paginated"])
+
 
 class AuthorListViewTest(TestCase):
     @classmethod
@@ -155,6 +206,14 @@ class AuthorViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context["books"]), 1)
 
+    def test_books_show_availability(self):
+        BookInstanceFactory(book=self.book, status="a")
+        BookInstanceFactory(book=self.book, status="m")
+        response = self.client.get(
+            reverse("author-detail", kwargs={"pk": self.author.pk})
+        )
+        self.assertContains(response, "1 of 2 copies available")
+
 
 class LoanedBookInstancesByUserListViewTest(TestCase):
     @classmethod
@@ -430,7 +489,7 @@ class UpdateAuthorViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
-class DeleteAuthorViewTest(TestCase):
+class DeleteAuthorViewTest(QueryBudgetTestMixin, TestCase):
     @classmethod
     def setUpTestData(cls):
         # Create a user
@@ -468,3 +527,500 @@ class DeleteAuthorViewTest(TestCase):
             reverse("author-delete", kwargs={"pk": self.author.id})
         )
         self.assertEqual(response.status_code, 200)
+
+    def test_delete_within_query_budget(self):
+        book = BookFactory(author=self.author)
+        self.client.login(username="user1", password="1X<ISRUkw+tuK")
+        response = self.assertWithinQueryBudget(
+            reverse("author-delete", kwargs={"pk": self.author.id}), method="post"
+        )
+        self.assertRedirects(response, reverse("authors"))
+        self.assertFalse(Author.objects.filter(pk=self.author.pk).exists())
+        book.refresh_from_db()
+        self.assertIsNone(book.author)
+
+
+class QueryBudgetTestBase(QueryBudgetTestMixin):
+    """Every catalog view must stay within its query budget at any table size."""
+
+    rows = None
+
+    @classmethod
+    def setUpTestData(cls):
+        librarian = UserFactory(username="librarian")
+        librarian.user_permissions.add(
+            *Permission.objects.filter(
+                codename__in=[
+                    "view_list_on_loan",
+                    "can_mark_returned",
+                    "add_author",
+                    "change_author",
+                    "delete_author",
+                ]
+            )
+        )
+        genres = [GenreFactory(), GenreFactory()]
+        authors = Author.objects.bulk_create(
+            Author(first_name=f"First{n}", last_name=f"Last{n}")
+            for n in range(cls.rows)
+        )
+        cls.author = authors[0]
+        books = Book.objects.bulk_create(
+            Book(title=f"Title {n}", summary="Summary", isbn=f"{n:013d}", author=author)
+            for n, author in enumerate(authors)
+        )
+        cls.book = books[0]
+        Book.genre.through.objects.bulk_create(
+            Book.genre.through(book_id=book.pk, genre_id=genre.pk)
+            for book in books
+            for genre in genres
+        )
+        Book.objects.filter(pk__in=[book.pk for book in books[1:]]).update(
+            author=cls.author
+        )
+        today = datetime.date.today()
+        BookInstance.objects.bulk_create(
+            BookInstance(
+                book=cls.book,
+                imprint="Imprint",
+                status="o",
+                borrower=librarian,
+                due_back=today + datetime.timedelta(days=n % 30),
+            )
+            for n in range(cls.rows)
+        )
+        cls.book_instance = BookInstance.objects.first()
+
+    def setUp(self):
+        self.client.login(username="librarian", password="1X<ISRUkw+tuK")
+
+    def test_anonymous_views(self):
+        self.client.logout()
+        for url in [
+            reverse("index"),
+            reverse("books"),
+            reverse("books") + "?page=last",
+            reverse("books") + "?available=1",
+            reverse("authors"),
+            reverse("book-detail", kwargs={"pk": self.book.pk}),
+            reverse("author-detail", kwargs={"pk": self.author.pk}),
+        ]:
+            response = self.assertWithinQueryBudget(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_logged_in_views(self):
+        for url in [
+            reverse("index"),
+            reverse("books"),
+            reverse("books") + "?cursor=",
+            reverse("authors"),
+            reverse("book-detail", kwargs={"pk": self.book.pk}),
+            reverse("author-detail", kwargs={"pk": self.author.pk}),
+            reverse("my-borrowed"),
+            reverse("my-borrowed") + "?cursor=",
+            reverse("bookinst-manage"),
+            reverse("bookinst-manage") + "?page=last",
+            reverse("renew-book-librarian", kwargs={"pk": self.book_instance.pk}),
+            reverse("author-create"),
+            reverse("author-update", kwargs={"pk": self.author.pk}),
+            reverse("author-delete", kwargs={"pk": self.author.pk}),
+        ]:
+            response = self.assertWithinQueryBudget(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_renew_post(self):
+        response = self.assertWithinQueryBudget(
+            reverse("renew-book-librarian", kwargs={"pk": self.book_instance.pk}),
+            method="post",
+            data={"due_back": datetime.date.today() + datetime.timedelta(weeks=2)},
+        )
+        self.assertRedirects(response, reverse("bookinst-manage"))
+
+
+class QueryBudgetSmallTest(QueryBudgetTestBase, TestCase):
+    rows = 10
+
+
+class QueryBudgetLargeTest(QueryBudgetTestBase, TestCase):
+    rows = 1000
+
+
+class BookSearchViewTest(QueryBudgetTestMixin, TransactionTestCase):
+    # InnoDB adds rows to a FULLTEXT index when their transaction commits, so
+    # on MySQL the search would find nothing inside TestCase's transaction
+    def setUp(self):
+        herbert = AuthorFactory(first_name="Frank", last_name="Herbert")
+        self.dune = BookFactory(
+            title="Dune", summary="Desert planet", isbn="9780441013593", author=herbert
+        )
+        BookFactory(title="Children of Dune", summary="Sequel", author=herbert)
+        BookFactory(title="Neuromancer", summary="Cyberspace", author=AuthorFactory())
+        for number in range(12):
+            BookFactory(title=f"Planet story {number}", summary="Space")
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse("book-search"), {"q": "dune"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "catalog/book_search.html")
+
+    def test_matches_title_and_author(self):
+        response = self.client.get(reverse("book-search"), {"q": "dune"})
+        self.assertEqual(len(response.context["book_list"]), 2)
+        response = self.client.get(reverse("book-search"), {"q": "herbert"})
+        self.assertEqual(
+            {book.title for book in response.context["book_list"]},
+            {"Dune", "Children of Dune"},
+        )
+
+    def test_exact_title_ranks_first(self):
+        response = self.client.get(reverse("book-search"), {"q": "Dune"})
+        self.assertEqual(response.context["book_list"][0], self.dune)
+
+    def test_isbn_redirects_to_book(self):
+        response = self.client.get(reverse("book-search"), {"q": "978-0441-013593"})
+        self.assertRedirects(response, self.dune.get_absolute_url())
+
+    def test_empty_query(self):
+        response = self.client.get(reverse("book-search"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["book_list"]), 0)
+
+    def test_pagination_keeps_query(self):
+        response = self.assertWithinQueryBudget(reverse("book-search") + "?q=planet")
+        self.assertTrue(response.context["is_paginated"])
+        self.assertContains(response, "?q=planet&amp;page=2")
+
+
+    def test_matches_title_and_author_together(self):
+        results = search_books("herbert dune")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            {book.title for book in results[:10]}, {"Dune", "Children of Dune"}
+        )
+
+    @skipUnless(connection.vendor == "mysql", "FULLTEXT indexes are MySQL only")
+    def test_fulltext_lookups_use_the_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            search_books("herbert dune")[:10]
+        matches = [q["sql"] for q in captured.captured_queries if "MATCH" in q["sql"]]
+        self.assertEqual(len(matches), 2)
+        for sql in matches:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {sql}")
+                columns = [column[0] for column in cursor.description]
+                plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            with self.subTest(sql):
+                self.assertEqual([row["type"] for row in plan], ["fulltext"])
+                self.assertIn(
+                    plan[0]["key"], {"book_title_summary_ft", "author_name_ft"}
+                )
+
+
+class AutocompleteViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AuthorFactory(first_name="Émile", last_name="Zola")
+        cls.book = BookFactory(title="Germinal", author=cls.author)
+        BookFactory(title="Gerontius", author=cls.author)
+
+    def setUp(self):
+        typeahead.index.build()
+
+    def get_labels(self, query):
+        response = self.client.get(reverse("autocomplete"), {"q": query})
+        return [result["label"] for result in response.json()["results"]]
+
+    def test_prefix_matches_titles_and_authors(self):
+        self.assertEqual(self.get_labels("ger"), ["Germinal", "Gerontius"])
+        self.assertEqual(self.get_labels("germ"), ["Germinal"])
+        self.assertEqual(self.get_labels("ZOL"), ["Zola, Émile"])
+        self.assertEqual(self.get_labels("emile z"), ["Zola, Émile"])
+        self.assertEqual(self.get_labels(""), [])
+
+    def test_result_links_to_detail_page(self):
+        response = self.client.get(reverse("autocomplete"), {"q": "germinal"})
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "type": "book",
+                    "label": "Germinal",
+                    "url": self.book.get_absolute_url(),
+                }
+            ],
+        )
+
+    def test_built_index_does_not_query_the_database(self):
+        with self.assertNumQueries(0):
+            self.client.get(reverse("autocomplete"), {"q": "ger"})
+
+    def test_index_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "Nana"
+            self.book.save()
+            BookFactory(title="L'Assommoir", author=self.author)
+        self.assertEqual(self.get_labels("ger"), ["Gerontius"])
+        self.assertEqual(self.get_labels("nan"), ["Nana"])
+        self.assertEqual(self.get_labels("l'a"), ["L'Assommoir"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.delete()
+        self.assertEqual(self.get_labels("nan"), [])
+
+    def test_gunicorn_workers_build_the_index_at_start(self):
+        hooks = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        with mock.patch.object(typeahead, "index", typeahead.TypeaheadIndex()):
+            hooks["post_worker_init"](mock.Mock())
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get_labels("ger"), ["Germinal", "Gerontius"])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AuthorFactory()
+        cls.book = BookFactory(author=cls.author)
+        UserFactory(username="reader")
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=first["ETag"],
+            HTTP_IF_MODIFIED_SINCE=first["Last-Modified"],
+        )
+
+    def test_unchanged_pages_are_not_rendered(self):
+        for url in [
+            reverse("books"),
+            reverse("authors"),
+            self.book.get_absolute_url(),
+            self.author.get_absolute_url(),
+        ]:
+            response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertFalse(response.content)
+            self.assertIn("ETag", response)
+
+    def test_pages_vary_by_user_and_language(self):
+        for url in [reverse("books"), self.book.get_absolute_url()]:
+            first = self.client.get(url)
+            revalidated = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+            )
+            self.assertEqual(revalidated.status_code, 304, url)
+            for response in (first, revalidated):
+                vary = {value.strip() for value in response["Vary"].split(",")}
+                self.assertLessEqual({"Cookie", "Accept-Language"}, vary, url)
+
+    def test_copy_change_bumps_book(self):
+        updated_at = self.book.updated_at
+        copy = BookInstanceFactory(book=self.book, status="a")
+        self.book.refresh_from_db()
+        self.assertGreater(self.book.updated_at, updated_at)
+
+        response = self.client.get(self.book.get_absolute_url())
+        copy.status = "o"
+        copy.save()
+        response = self.client.get(
+            self.book.get_absolute_url(), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_author_page_follows_books(self):
+        url = self.author.get_absolute_url()
+        etag = self.client.get(url)["ETag"]
+        BookFactory(author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_book_changes_list(self):
+        BookFactory()
+        etag = self.client.get(reverse("books"))["ETag"]
+        self.book.delete()
+        response = self.client.get(reverse("books"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_author_changes_book_pages(self):
+        etags = {
+            url: self.client.get(url)["ETag"]
+            for url in (reverse("books"), self.book.get_absolute_url())
+        }
+        self.author.delete()
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_renamed_genre_changes_book_pages(self):
+        genre = GenreFactory()
+        self.book.genre.add(genre)
+        url = self.book.get_absolute_url()
+        etag = self.client.get(url)["ETag"]
+        genre.name = "Renamed"
+        genre.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Renamed")
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(reverse("books"))["ETag"]
+        self.client.login(username="reader", password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("books"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkLoanViewTest(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = UserFactory()
+        cls.librarian.user_permissions.add(
+            *Permission.objects.filter(
+                codename__in=["view_list_on_loan", "can_mark_returned"]
+            )
+        )
+        cls.reader = UserFactory()
+        cls.books = [BookFactory(), BookFactory()]
+        today = datetime.date.today()
+        BookInstance.objects.bulk_create(
+            BookInstance(
+                book=cls.books[n % 2],
+                imprint="Imprint",
+                status="o",
+                borrower=cls.reader,
+                due_back=today + datetime.timedelta(days=n % 10 - 5),
+            )
+            for n in range(2000)
+        )
+        CatalogCounter.objects.update(num_instances_available=0)
+
+    def setUp(self):
+        self.client.login(username=self.librarian.username, password="1X<ISRUkw+tuK")
+
+    def post(self, data):
+        return self.assertWithinQueryBudget(
+            reverse("bookinst-manage-bulk"), method="post", data=data
+        )
+
+    def test_requires_permission(self):
+        self.client.login(username=self.reader.username, password="1X<ISRUkw+tuK")
+        response = self.client.post(
+            reverse("bookinst-manage-bulk"), {"action": "return", "scope": "all"}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_manage_page_shows_bulk_form(self):
+        response = self.client.get(reverse("bookinst-manage"))
+        self.assertIn("bulk_form", response.context)
+        self.assertContains(response, 'name="copies"', count=10)
+
+    def test_return_selected(self):
+        copies = list(BookInstance.objects.values_list("pk", flat=True)[:3])
+        response = self.post(
+            {"action": "return", "scope": "selected", "copies": copies}
+        )
+        self.assertRedirects(response, reverse("bookinst-manage"))
+        returned = BookInstance.objects.filter(pk__in=copies)
+        self.assertEqual(set(returned.values_list("status", flat=True)), {"a"})
+        self.assertFalse(returned.filter(borrower__isnull=False).exists())
+        self.assertEqual(CatalogCounter.load().num_instances_available, 3)
+
+    def test_return_all_overdue(self):
+        updated_at = Book.objects.get(pk=self.books[0].pk).updated_at
+        self.post({"action": "return", "scope": "overdue"})
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 1000)
+        self.assertFalse(
+            BookInstance.objects.filter(
+                status="o", due_back__lt=datetime.date.today()
+            ).exists()
+        )
+        self.assertEqual(CatalogCounter.load().num_instances_available, 1000)
+        self.assertGreater(Book.objects.get(pk=self.books[0].pk).updated_at, updated_at)
+
+    def test_renew_all(self):
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        response = self.post({"action": "renew", "scope": "all", "due_back": due_back})
+        self.assertRedirects(response, reverse("bookinst-manage"))
+        self.assertEqual(BookInstance.objects.filter(due_back=due_back).count(), 2000)
+
+    def test_invalid_renewal_date_changes_nothing(self):
+        due_back = datetime.date.today() + datetime.timedelta(weeks=5)
+        response = self.post({"action": "renew", "scope": "all", "due_back": due_back})
+        self.assertRedirects(response, reverse("bookinst-manage"))
+        self.assertFalse(BookInstance.objects.filter(due_back=due_back).exists())
+
+
+class ExportLoansViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = UserFactory()
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename="view_list_on_loan")
+        )
+        cls.reader = UserFactory()
+        book = BookFactory(title="Dune")
+        today = datetime.date.today()
+        for days in range(5):
+            BookInstanceFactory(
+                book=book,
+                borrower=cls.reader,
+                due_back=today + datetime.timedelta(days=days),
+            )
+        BookInstanceFactory(book=book, status="a", due_back=None)
+
+    def setUp(self):
+        self.client.login(username=self.librarian.username, password="1X<ISRUkw+tuK")
+
+    def export(self, **params):
+        response = self.client.get(reverse("bookinst-export"), params)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_requires_permission(self):
+        self.client.login(username=self.reader.username, password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("bookinst-export"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_csv(self):
+        lines = self.export(format="csv").splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "isbn", "title"])
+        self.assertEqual(len(lines), 7)
+        self.assertIn(",Dune,", lines[1])
+
+    def test_format_defaults_to_csv(self):
+        for params in ({}, {"status": "o"}):
+            with self.subTest(params):
+                lines = self.export(**params).splitlines()
+                self.assertEqual(lines[0].split(",")[:3], ["id", "isbn", "title"])
+
+    def test_jsonl_with_filters(self):
+        today = datetime.date.today()
+        content = self.export(
+            format="jsonl",
+            status="o",
+            due_after=today + datetime.timedelta(days=1),
+            due_before=today + datetime.timedelta(days=3),
+            borrower=self.reader.username,
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row["borrower"] for row in rows}, {self.reader.username})
+
+    def test_invalid_filter(self):
+        response = self.client.get(reverse("bookinst-export"), {"status": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(ASGI=True)
+    async def test_streams_asynchronously_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.librarian)
+        response = await self.async_client.get(
+            reverse("bookinst-export"), {"format": "jsonl", "status": "o"}
+        )
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_command_reads_in_chunks(self):
+        out = StringIO()
+        with self.assertNumQueries(4):
+            call_command("export_loans", "--chunk-size=2", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 7)
@@ -0,0 +1,203 @@
+"""In-memory prefix index behind the navbar typeahead.
+
+Every worker process keeps book titles and author names in a sorted key list
+with a parallel integer array and answers prefix lookups with ``bisect``, so
+a keystroke never reaches the database. The index is built on first use,
+patched from the model signals in ``catalog.signals`` for writes made by this
+process, and rebuilt in the background every ``TYPEAHEAD_MAX_AGE`` seconds to
+pick up writes made by other workers.
+"""
+
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+
+BOOK = "book"
+AUTHOR = "author"
+KINDS = (BOOK, AUTHOR)
+
+
+def normalize(text):
+    """Case- and accent-insensitive form of ``text`` used as the sort key."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def book_keys(title):
+    return (normalize(title),)
+
+
+def author_keys(first_name, last_name):
+    return tuple(
+        {
+            normalize(last_name),
+            normalize(first_name),
+            normalize(f"{first_name} {last_name}"),
+        }
+    )
+
+
+def encode(kind, pk):
+    # A (kind, pk) pair packed into one machine integer for the refs array
+    return pk << 1 | KINDS.index(kind)
+
+
+def decode(ref):
+    return KINDS[ref & 1], ref >> 1
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self._keys = []
+        # Encoded (kind, pk) of the key at the same position in self._keys
+        self._refs = array("q")
+        self._labels = {}
+        self._author_keys = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._labels)
+
+    def load(self, books, authors):
+        """Replace the contents with ``books`` (pk, title) and ``authors``
+        (pk, first_name, last_name) iterables."""
+        rows, labels, extra = [], {}, {}
+        for pk, title in books:
+            ref = encode(BOOK, pk)
+            labels[ref] = title
+            rows.extend((key, ref) for key in book_keys(title))
+        for pk, first_name, last_name in authors:
+            ref = encode(AUTHOR, pk)
+            labels[ref] = f"{last_name}, {first_name}"
+            extra[ref] = author_keys(first_name, last_name)
+            rows.extend((key, ref) for key in extra[ref])
+        rows.sort()
+        keys = [key for key, _ in rows]
+        refs = array("q", (ref for _, ref in rows))
+        with self._lock:
+            self._keys, self._refs = keys, refs
+            self._labels, self._author_keys = labels, extra
+            self.built_at = time.monotonic()
+
+    def build(self):
+        from catalog.models import Author, Book
+
+        self.load(
+            Book.objects.values_list("pk", "title").iterator(),
+            Author.objects.values_list("pk", "first_name", "last_name").iterator(),
+        )
+
+    def search(self, prefix, limit=10):
+        """Up to ``limit`` (kind, pk, label) entries with a key starting with
+        ``prefix``."""
+        prefix = normalize(prefix.strip())
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            position = bisect_left(self._keys, prefix)
+            while (
+                position < len(self._keys)
+                and len(results) < limit
+                and self._keys[position].startswith(prefix)
+            ):
+                ref = self._refs[position]
+                if ref not in seen:
+                    seen.add(ref)
+                    results.append((*decode(ref), self._labels[ref]))
+                position += 1
+        return results
+
+    def _remove(self, ref):
+        for key in self._keys_of(ref):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._refs[position] == ref:
+                    del self._keys[position]
+                    del self._refs[position]
+                    break
+                position += 1
+        self._labels.pop(ref, None)
+        self._author_keys.pop(ref, None)
+
+    def _keys_of(self, ref):
+        # Titles are their own key; author names have several keys each
+        if ref in self._author_keys:
+            return self._author_keys[ref]
+        label = self._labels.get(ref)
+        return book_keys(label) if label is not None else ()
+
+    def _put(self, ref, label, keys):
+        with self._lock:
+            self._remove(ref)
+            self._labels[ref] = label
+            if decode(ref)[0] == AUTHOR:
+                self._author_keys[ref] = keys
+            for key in keys:
+                position = bisect_left(self._keys, key)
+                # Keep equal keys ordered by ref, as the full sort in load() does
+                while (
+                    position < len(self._keys)
+                    and self._keys[position] == key
+                    and self._refs[position] < ref
+                ):
+                    position += 1
+                self._keys.insert(position, key)
+                self._refs.insert(position, ref)
+
+    def put_book(self, pk, title):
+        self._put(encode(BOOK, pk), title, book_keys(title))
+
+    def put_author(self, pk, first_name, last_name):
+        self._put(
+            encode(AUTHOR, pk),
+            f"{last_name}, {first_name}",
+            author_keys(first_name, last_name),
+        )
+
+    def discard(self, kind, pk):
+        with self._lock:
+            self._remove(encode(kind, pk))
+
+    def is_stale(self):
+        max_age = getattr(settings, "TYPEAHEAD_MAX_AGE", None)
+        return max_age is not None and time.monotonic() - self.built_at > max_age
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.build()
+        finally:
+            self._refreshing = False
+            connection.close()
+
+
+index = TypeaheadIndex()
+_build_lock = threading.Lock()
+
+
+def get_index():
+    """The process-wide index, built on first use.
+
+    Gunicorn workers build it before taking requests, see gunicorn.conf.py.
+    """
+    if index.built_at is None:
+        with _build_lock:
+            if index.built_at is None:
+                index.build()
+    elif index.is_stale():
+        index.refresh_in_background()
+    return index
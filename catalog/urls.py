@@ -1,15 +1,47 @@
-from django.urls import include, path
-from . import views
+from django.conf import settings
+from django.urls import URLPattern, include, path
+from . import async_views, views
+
+# Async twins of the read-heavy pages, used under ASGI (see README "ASGI")
+ASYNC_VIEWS = {
+    "index": async_views.index,
+    "books": async_views.book_list,
+    "book-detail": async_views.book_detail,
+    "authors": async_views.author_list,
+    "author-detail": async_views.author_detail,
+    "my-borrowed": async_views.my_borrowed,
+}
+
+
+def with_async_views(patterns):
+    """``patterns`` with the views in ``ASYNC_VIEWS`` swapped for their twins."""
+    return [
+        (
+            path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+            if isinstance(pattern, URLPattern) and pattern.name in ASYNC_VIEWS
+            else pattern
+        )
+        for pattern in patterns
+    ]
+
 
 urlpatterns = [
     path("", views.index, name="index"),
     path("i18n/", include("django.conf.urls.i18n")),
     path("books/", views.BookListView.as_view(), name="books"),
+    path("search/", views.BookSearchView.as_view(), name="book-search"),
+    path("autocomplete/", views.autocomplete, name="autocomplete"),
     path(
         "bookinst-manage/",
         views.LoanedBooksManageListView.as_view(),
         name="bookinst-manage",
     ),
+    path(
+        "bookinst-manage/bulk/",
+        views.bulk_update_loans,
+        name="bookinst-manage-bulk",
+    ),
+    path("bookinst-manage/export/", views.export_loans, name="bookinst-export"),
     path(
         "book/<uuid:pk>/renew/", views.renew_book_librarian, name="renew-book-librarian"
     ),
@@ -21,3 +53,6 @@ urlpatterns = [
     path("author/<int:pk>/update/", views.AuthorUpdate.as_view(), name="author-update"),
     path("author/<int:pk>/delete/", views.AuthorDelete.as_view(), name="author-delete"),
 ]
+
+if settings.CATALOG_ASYNC_VIEWS:
+    urlpatterns = with_async_views(urlpatterns)
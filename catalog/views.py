@@ -1,48 +1,121 @@
-from django.utils.translation import gettext
+from django.conf import settings
+from django.utils.translation import gettext, ngettext
 from django.http import Http404
-from catalog.models import Book, Author, BookInstance
+from catalog.models import Book, Author, BookInstance, CatalogCounter
 from django.views import generic
 import datetime
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import PermissionRequiredMixin, LoginRequiredMixin
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponseRedirect
-from catalog.forms import RenewBookModelForm
+from django.http import HttpResponseRedirect, JsonResponse
+from django.db.models import Count, Max
+from catalog.conditional import ConditionalGetMixin, last_update, latest
+from django.contrib import messages
+from django.views.decorators.http import require_POST
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from catalog import exporter, loans
+from catalog.forms import (
+    BookSearchForm,
+    BulkLoanForm,
+    LoanExportForm,
+    RenewBookModelForm,
+)
+from catalog.pagination import CursorPaginationMixin
+from catalog.query_budget import QueryBudgetMixin, query_budget
+from catalog.search import normalize_isbn, search_books
+from catalog import typeahead
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
 
 # Create your views here.
 
 
+VISITS_COOKIE = "num_visits"
+VISITS_SALT = "catalog.visits"
+
+
+def get_visits(request):
+    """Home page visits so far, from the signed visits cookie."""
+    visits = request.get_signed_cookie(VISITS_COOKIE, None, salt=VISITS_SALT)
+    if visits is None and settings.SESSION_COOKIE_NAME in request.COOKIES:
+        # Visitors from before the cookie kept the count in their session
+        return request.session.get("num_visits", 1)
+    try:
+        return max(int(visits), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+@query_budget(5)
 def index(request):
     """View function for home page of site."""
-    # Generate counts of some of the main objects
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    num_instances_available = BookInstance.objects.filter(status__exact="a").count()
-    num_authors = Author.objects.count()
-    num_visits = request.session.get("num_visits", 1)
-    request.session["num_visits"] = num_visits + 1
-    age_cookie = request.session.get_session_cookie_age()
-    context = {
-        "num_books": num_books,
-        "num_instances": num_instances,
-        "num_instances_available": num_instances_available,
-        "num_authors": num_authors,
+    # Counts of the main objects come from the denormalized counter row
+    counter = CatalogCounter.load()
+    # The visit count lives in a signed cookie, not the session, so a home
+    # page view never writes a session row
+    num_visits = get_visits(request)
+    response = render(request, "index.html", home_context(request, counter, num_visits))
+    set_visits_cookie(request, response, num_visits + 1)
+    return response
+
+
+def home_context(request, counter, num_visits):
+    return {
+        "num_books": counter.num_books,
+        "num_instances": counter.num_instances,
+        "num_instances_available": counter.num_instances_available,
+        "num_authors": counter.num_authors,
         "num_visits": num_visits,
-        "age_cookie": datetime.timedelta(seconds=age_cookie),
+        "age_cookie": datetime.timedelta(
+            seconds=request.session.get_session_cookie_age()
+        ),
     }
 
-    return render(request, "index.html", context=context)
 
+def set_visits_cookie(request, response, num_visits):
+    response.set_signed_cookie(
+        VISITS_COOKIE,
+        num_visits,
+        salt=VISITS_SALT,
+        max_age=request.session.get_session_cookie_age(),
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
 
-class BookListView(generic.ListView):
+
+class BookListView(
+    QueryBudgetMixin, ConditionalGetMixin, CursorPaginationMixin, generic.ListView
+):
     model = Book
     # your own name for the list as a template variable
     paginate_by = 10
+    cursor_ordering = ("title",)
+    query_budget = 7
+
+    def get_validators(self):
+        # Deleted books only show up in the count
+        row = (
+            CatalogCounter.objects.filter(pk=CatalogCounter.SINGLETON_ID)
+            .annotate(
+                books_updated_at=last_update(Book.objects.all()),
+                authors_updated_at=last_update(Author.objects.all()),
+            )
+            .values_list("num_books", "books_updated_at", "authors_updated_at")
+            .first()
+        )
+        if row is None:
+            return None
+        num_books, *updated = row
+        return latest(*updated), (num_books,)
 
     def get_queryset(self):
-        return Book.objects.all()
+        books = Book.objects.select_related("author")
+        if self.request.GET.get("available") == "1":
+            books = books.available()
+        else:
+            books = books.with_availability()
+        return books.order_by("title", "pk")
 
     def get_context_data(self, **kwargs):
         # Call the base implementation first to get the context
@@ -50,8 +123,60 @@ class BookListView(generic.ListView):
         return context
 
 
-class BookDetailView(generic.DetailView):
+class BookSearchView(QueryBudgetMixin, generic.ListView):
+    """Ranked search over book titles, summaries and author names."""
+
+    model = Book
+    template_name = "catalog/book_search.html"
+    paginate_by = 10
+    # On MySQL the book and author matches are two lookups, then the page
+    query_budget = 8
+
+    def get(self, request, *args, **kwargs):
+        self.form = BookSearchForm(request.GET or None)
+        self.query = self.form.cleaned_data["q"] if self.form.is_valid() else ""
+        isbn = normalize_isbn(self.query)
+        if isbn:
+            # An exact ISBN goes straight to the book, no ranking needed
+            book = Book.objects.filter(isbn=isbn).only("pk").first()
+            if book:
+                return HttpResponseRedirect(book.get_absolute_url())
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        if not self.query:
+            return Book.objects.none()
+        return search_books(self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["form"] = self.form
+        context["query"] = self.query
+        return context
+
+
+def autocomplete(request):
+    """Typeahead suggestions for the navbar search box, served from memory."""
+    urls = {typeahead.BOOK: "book-detail", typeahead.AUTHOR: "author-detail"}
+    results = [
+        {"type": kind, "label": label, "url": reverse(urls[kind], args=[pk])}
+        for kind, pk, label in typeahead.get_index().search(request.GET.get("q", ""))
+    ]
+    return JsonResponse({"results": results})
+
+
+class BookDetailView(QueryBudgetMixin, ConditionalGetMixin, generic.DetailView):
     model = Book
+    query_budget = 8
+    queryset = Book.objects.select_related("author").prefetch_related("genre")
+
+    def get_validators(self):
+        row = (
+            Book.objects.filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", "author__updated_at")
+            .first()
+        )
+        return None if row is None else (latest(*row), ())
 
     def book_detail_view(request, primary_key):
         try:
@@ -70,10 +195,22 @@ class BookDetailView(generic.DetailView):
         return context
 
 
-class AuthorListView(generic.ListView):
+class AuthorListView(
+    QueryBudgetMixin, ConditionalGetMixin, CursorPaginationMixin, generic.ListView
+):
     model = Author
     # your own name for the list as a template variable
     paginate_by = 10
+    query_budget = 7
+
+    def get_validators(self):
+        row = (
+            CatalogCounter.objects.filter(pk=CatalogCounter.SINGLETON_ID)
+            .annotate(authors_updated_at=last_update(Author.objects.all()))
+            .values_list("num_authors", "authors_updated_at")
+            .first()
+        )
+        return None if row is None else (row[1], (row[0],))
 
     def get_queryset(self):
         return Author.objects.all()
@@ -86,8 +223,21 @@ class AuthorListView(generic.ListView):
         return context
 
 
-class AuthorDetailView(generic.DetailView):
+class AuthorDetailView(QueryBudgetMixin, ConditionalGetMixin, generic.DetailView):
     model = Author
+    query_budget = 7
+
+    def get_validators(self):
+        row = (
+            Author.objects.filter(pk=self.kwargs["pk"])
+            .annotate(books_updated_at=Max("book__updated_at"), num_books=Count("book"))
+            .values_list("updated_at", "books_updated_at", "num_books")
+            .first()
+        )
+        if row is None:
+            return None
+        updated_at, books_updated_at, num_books = row
+        return latest(updated_at, books_updated_at), (num_books,)
 
     def author_detail_view(request, primary_key):
         try:
@@ -99,27 +249,38 @@ class AuthorDetailView(generic.DetailView):
 
     def get_context_data(self, **kwargs):
         context = super(AuthorDetailView, self).get_context_data(**kwargs)
-        context["books"] = context["author"].book_set.all()
+        context["books"] = (
+            context["author"].book_set.with_availability().order_by("title", "pk")
+        )
         return context
 
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(
+    QueryBudgetMixin, LoginRequiredMixin, CursorPaginationMixin, generic.ListView
+):
     """Generic class-based view listing books on loan to current user."""
 
     model = BookInstance
     template_name = "catalog/bookinstance_list_borrowed_user.html"
     paginate_by = 10
+    cursor_ordering = ("due_back",)
+    query_budget = 6
 
     def get_queryset(self):
         return (
             BookInstance.objects.filter(borrower=self.request.user)
             .filter(status__exact="o")
-            .order_by("due_back")
+            .order_by("due_back", "pk")
+            .select_related("book")
         )
 
 
 class LoanedBooksManageListView(
-    LoginRequiredMixin, PermissionRequiredMixin, generic.ListView
+    QueryBudgetMixin,
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    CursorPaginationMixin,
+    generic.ListView,
 ):
     """Generic class-based view listing books on loan to current user."""
 
@@ -127,20 +288,87 @@ class LoanedBooksManageListView(
     permission_required = "catalog.view_list_on_loan"
     template_name = "catalog/bookinstance_manage.html"
     paginate_by = 10
+    cursor_ordering = ("-due_back",)
+    query_budget = 6
 
     def get_queryset(self):
         return (
             BookInstance.objects.all()
             .filter(status__exact="o")
-            .order_by("-due_back")
-            .select_related("borrower")
+            .order_by("-due_back", "-pk")
+            .select_related("book", "borrower")
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.user.has_perm("catalog.can_mark_returned"):
+            context["bulk_form"] = BulkLoanForm(
+                initial={
+                    "due_back": datetime.date.today() + datetime.timedelta(weeks=3)
+                }
+            )
+        return context
+
+
+@query_budget(10)
+@require_POST
+@login_required
+@permission_required("catalog.can_mark_returned", raise_exception=True)
+def bulk_update_loans(request):
+    """Return or renew many copies on loan at once."""
+    form = BulkLoanForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+    elif form.cleaned_data["action"] == BulkLoanForm.RETURN:
+        count = loans.mark_returned(form.get_queryset())
+        messages.success(
+            request,
+            ngettext(
+                "%(count)d copy marked returned.",
+                "%(count)d copies marked returned.",
+                count,
+            )
+            % {"count": count},
+        )
+    else:
+        count = loans.renew(form.get_queryset(), form.cleaned_data["due_back"])
+        messages.success(
+            request,
+            ngettext("%(count)d copy renewed.", "%(count)d copies renewed.", count)
+            % {"count": count},
         )
+    return HttpResponseRedirect(reverse("bookinst-manage"))
 
 
+# No query budget: the rows are fetched while the response streams, after
+# the view has returned, one keyset query per chunk.
+@login_required
+@permission_required("catalog.view_list_on_loan", raise_exception=True)
+def export_loans(request):
+    """Stream copies with their book, author and borrower as CSV or JSONL."""
+    form = LoanExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    format = form.cleaned_data["format"]
+    stream = exporter.arender if settings.ASGI else exporter.render
+    response = StreamingHttpResponse(
+        stream(exporter.filter_copies(**form.filters()), format),
+        content_type=exporter.CONTENT_TYPES[format],
+    )
+    filename = f"loans-{datetime.date.today():%Y%m%d}.{format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@query_budget(7)
 @login_required
 @permission_required("catalog.can_mark_returned", raise_exception=True)
 def renew_book_librarian(request, pk):
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(
+        BookInstance.objects.select_related("book", "borrower"), pk=pk
+    )
 
     # If this is a POST request then process the Form data
     if request.method == "POST":
@@ -151,7 +379,7 @@ def renew_book_librarian(request, pk):
         if form.is_valid():
             # process the data in form.cleaned_data as required (here we just write it to the model due_back field)
             book_instance.due_back = form.cleaned_data["due_back"]
-            book_instance.save()
+            book_instance.save(update_fields=["due_back", "updated_at"])
 
             # redirect to a new URL:
             return HttpResponseRedirect(reverse("bookinst-manage"))
@@ -169,21 +397,32 @@ def renew_book_librarian(request, pk):
     return render(request, "catalog/book_renew_librarian.html", context)
 
 
-class AuthorCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class AuthorCreate(
+    QueryBudgetMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView
+):
     model = Author
+    query_budget = 6
     permission_required = "catalog.add_author"
     fields = ["first_name", "last_name", "date_of_birth", "date_of_death"]
     initial = {"date_of_death": "11/06/2020"}
 
 
-class AuthorUpdate(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class AuthorUpdate(
+    QueryBudgetMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView
+):
     model = Author
+    query_budget = 6
     permission_required = "catalog.change_author"
 
     fields = "__all__"
 
 
-class AuthorDelete(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
+class AuthorDelete(
+    QueryBudgetMixin, LoginRequiredMixin, PermissionRequiredMixin, DeleteView
+):
     model = Author
+    # Session, user, two permission queries, the author, touching and
+    # unlinking its books, the delete and the counter update
+    query_budget = 9
     permission_required = "catalog.delete_author"
     success_url = reverse_lazy("authors")
@@ -0,0 +1,111 @@
+"""Gunicorn settings, picked up from the working directory by ``gunicorn``.
+
+Every value can be changed with an environment variable, e.g.
+``GUNICORN_WORKERS=8 gunicorn``. ``DJANGO_ASGI=1`` serves
+``locallibrary.asgi`` with uvicorn workers instead of threaded WSGI workers.
+"""
+
+import multiprocessing
+import os
+
+
+def env(name, default, cast=str):
+    value = os.environ.get(name)
+    return default if value in (None, "") else cast(value)
+
+
+def env_bool(name, default):
+    return env(name, default, lambda value: value.lower() in ("1", "true", "yes"))
+
+
+asgi = env_bool("DJANGO_ASGI", False)
+
+wsgi_app = "locallibrary.asgi:application" if asgi else "locallibrary.wsgi:application"
+bind = env("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Threads let one worker overlap requests waiting on MySQL; uvicorn workers
+# run an event loop instead
+worker_class = env(
+    "GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker" if asgi else "gthread"
+)
+threads = env("GUNICORN_THREADS", 8, int)
+
+# A worker holds up to one persistent MySQL connection per thread, or its
+# DB_POOL_SIZE pool. The default worker count keeps the total within
+# GUNICORN_DB_CONNECTIONS, under MySQL's default max_connections (151) with
+# room left for the job worker and manage.py commands.
+db_pool = env_bool("DB_POOL", asgi)
+connections_per_worker = env("DB_POOL_SIZE", 10, int) if db_pool else threads
+db_connections = env("GUNICORN_DB_CONNECTIONS", 120, int)
+workers_per_core = env("GUNICORN_WORKERS_PER_CORE", 2, float)
+workers = env(
+    "GUNICORN_WORKERS",
+    max(
+        2,
+        min(
+            int(workers_per_core * multiprocessing.cpu_count()) + 1,
+            db_connections // connections_per_worker,
+        ),
+    ),
+    int,
+)
+
+# Import Django once in the master: workers share its memory pages, start
+# faster, and a broken deploy fails before any worker is forked
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+
+timeout = env("GUNICORN_TIMEOUT", 30, int)
+graceful_timeout = env("GUNICORN_GRACEFUL_TIMEOUT", 30, int)
+keepalive = env("GUNICORN_KEEPALIVE", 5, int)
+
+# Recycle workers to bound slow leaks; the jitter keeps them from all
+# restarting at the same moment
+max_requests = env("GUNICORN_MAX_REQUESTS", 2000, int)
+max_requests_jitter = env("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10, int)
+
+# Heartbeat files on tmpfs, so a slow disk cannot get workers killed
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+loglevel = env("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    total = server.cfg.workers * connections_per_worker
+    log = server.log.warning if total > db_connections else server.log.info
+    log(
+        "Up to %d MySQL connections: %d workers x %d",
+        total,
+        server.cfg.workers,
+        connections_per_worker,
+    )
+    # Forked workers must not share a socket the master may have opened
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        from catalog.db.pool import close_pools
+
+        connections.close_all()
+        close_pools()
+
+
+def post_worker_init(worker):
+    # Build the typeahead index before the worker accepts requests, so no
+    # keystroke waits for the scan of the book and author tables
+    from django.db import connection
+
+    from catalog import typeahead
+
+    try:
+        typeahead.get_index()
+    except Exception:
+        worker.log.exception("Typeahead index not built, the first search will")
+    finally:
+        connection.close()
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
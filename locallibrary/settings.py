@@ -9,15 +9,28 @@ https://docs.djangoproject.com/en/3.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
+
 import os
 from django.utils.translation import gettext_lazy as _
 from pathlib import Path
-import logging
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 IS_PRODUCT = int(os.environ.get("PRODUCT", 0)) == 1
 HOST_MYSQL = "mysql" if IS_PRODUCT else "localhost"
+# Keyset pagination for the catalog list views instead of ?page=N
+CATALOG_CURSOR_PAGINATION = int(os.environ.get("CATALOG_CURSOR_PAGINATION", 0)) == 1
+# Raise instead of logging when a view runs more SQL than its query_budget
+QUERY_BUDGET_STRICT = int(os.environ.get("QUERY_BUDGET_STRICT", 0)) == 1
+# Seconds before a worker reloads its typeahead index to see other workers' writes
+TYPEAHEAD_MAX_AGE = int(os.environ.get("TYPEAHEAD_MAX_AGE", 300))
+# Served by an ASGI server (gunicorn with uvicorn workers), see README "ASGI"
+ASGI = int(os.environ.get("DJANGO_ASGI", 0)) == 1
+# Route the read-heavy catalog pages to their async views
+CATALOG_ASYNC_VIEWS = int(os.environ.get("CATALOG_ASYNC_VIEWS", ASGI)) == 1
+# Share a pool of MySQL connections between a worker's threads; on by default
+# under ASGI, where every request runs in a new thread (see README "Database connections")
+DB_POOL = int(os.environ.get("DB_POOL", ASGI)) == 1
 
 
 # Quick-start development settings - unsuitable for production
@@ -30,34 +43,77 @@ SECRET_KEY = os.environ.get(
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = not IS_PRODUCT
+# Logs go through a queue to a background thread, see README "Logging".
+# "prod" keeps warnings and the access log, "dev" adds debug output and SQL
+LOG_PROFILE = os.environ.get("LOG_PROFILE", "prod" if IS_PRODUCT else "dev")
+# "json" (one object per line) or "text"
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json" if IS_PRODUCT else "text")
+# Empty for stdout; "{pid}" in the name gives every worker its own file
+LOG_FILE = os.environ.get("LOG_FILE", "")
+# Rotate the file at this size, or on a schedule such as "midnight"
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 50 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.environ.get("LOG_ROTATE_WHEN", "")
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+# Share of the records below WARNING to keep per logger, e.g.
+# LOG_SAMPLING=django.db.backends=0.01,catalog.access=0.1
+LOG_SAMPLING = {
+    name: float(rate)
+    for name, _, rate in (
+        item.partition("=")
+        for item in os.environ.get("LOG_SAMPLING", "").split(",")
+        if item
+    )
+}
+LOG_LEVELS = {
+    "prod": {
+        "django": "WARNING",
+        "django.db.backends": "WARNING",
+        "catalog": "INFO",
+        "catalog.access": "INFO",
+    },
+    "dev": {
+        "django": "INFO",
+        # SQL is only logged with DEBUG on
+        "django.db.backends": "DEBUG",
+        "catalog": "DEBUG",
+        "catalog.access": "INFO",
+    },
+}[LOG_PROFILE]
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
-        "verbose": {
-            "format": "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s",
-            "datefmt": "%d/%b/%Y %H:%M:%S",
+        "json": {"()": "catalog.log.JsonFormatter"},
+        "text": {
+            "format": "[%(asctime)s] %(levelname)s [%(name)s] "
+            "[%(request_id)s %(route)s] %(message)s",
         },
-        "simple": {"format": "%(levelname)s %(message)s"},
+    },
+    "filters": {
+        f"sample:{name}": {"()": "catalog.log.SamplingFilter", "rate": rate}
+        for name, rate in LOG_SAMPLING.items()
     },
     "handlers": {
-        "file": {
-            "level": "DEBUG",
-            "class": "logging.FileHandler",
-            "filename": "mysite.log",
-            "formatter": "verbose",
+        "background": {
+            "()": "catalog.log.BackgroundHandler",
+            "filename": LOG_FILE or None,
+            "max_bytes": LOG_MAX_BYTES,
+            "when": LOG_ROTATE_WHEN or None,
+            "backup_count": LOG_BACKUP_COUNT,
+            "formatter": LOG_FORMAT,
         },
     },
+    "root": {"handlers": ["background"], "level": "WARNING"},
+    # Everything propagates to the root handler; handlers=[] drops Django's
+    # default console and mail_admins handlers
     "loggers": {
-        "django": {
-            "handlers": ["file"],
-            "propagate": True,
-            "level": "DEBUG",
-        },
-        "MYAPP": {
-            "handlers": ["file"],
-            "level": "DEBUG",
-        },
+        name: {
+            "handlers": [],
+            "level": LOG_LEVELS.get(name, "NOTSET"),
+            "filters": [f"sample:{name}"] if name in LOG_SAMPLING else [],
+        }
+        for name in {**LOG_LEVELS, **LOG_SAMPLING}
     },
 }
 
@@ -73,7 +129,7 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "catalog.apps.CatalogAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -87,8 +143,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "catalog.metrics.PrometheusMiddleware",
+    "catalog.middleware.RequestLogMiddleware",
+    "catalog.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "catalog.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -102,7 +161,8 @@ ROOT_URLCONF = "locallibrary.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that also reports render times to /metrics
+        "BACKEND": "catalog.metrics.InstrumentedDjangoTemplates",
         "DIRS": [
             os.path.join(BASE_DIR, "templates")
         ],  # chi dinh vi tri cu the de django tim kiem templates
@@ -133,8 +193,44 @@ DATABASES = {
         "PASSWORD": "chungtrinh1904",
         "HOST": HOST_MYSQL,
         "PORT": 3306,
+        # Pooled connections go back to the pool after every request; thread
+        # connections are only kept when threads live on (WSGI)
+        "CONN_MAX_AGE": (
+            0 if DB_POOL or ASGI else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {
+            "SIZE": int(os.environ.get("DB_POOL_SIZE", 10)),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+            "MAX_LIFETIME": int(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+            "LEAK_TIMEOUT": int(os.environ.get("DB_POOL_LEAK_TIMEOUT", 60)),
+            "LEAK_TRACEBACKS": not IS_PRODUCT,
+        },
     }
 }
+if DB_POOL:
+    DATABASES["default"]["ENGINE"] = "catalog.db.mysql"
+
+# Read replicas as host[:port][/database], comma separated, e.g.
+# DB_REPLICAS=mysql-replica or, for a local try, localhost/mysite_replica
+for number, replica in enumerate(
+    filter(None, os.environ.get("DB_REPLICAS", "").split(",")), 1
+):
+    address, sep, name = replica.partition("/")
+    host, sep, port = address.partition(":")
+    DATABASES[f"replica{number}"] = dict(
+        DATABASES["default"],
+        HOST=host,
+        PORT=int(port or DATABASES["default"]["PORT"]),
+        NAME=name or DATABASES["default"]["NAME"],
+        # Tests read the test primary instead of creating a replica
+        TEST={"MIRROR": "default"},
+    )
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["catalog.routers.PrimaryReplicaRouter"]
+# How long a client reads from the primary after writing; above the replica lag
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+REPLICA_PIN_COOKIE = "db_pin"
 
 
 # Password validation
@@ -196,6 +292,21 @@ INTERNAL_IPS = [
     # ...
 ]
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Mail is stored as a job and delivered by `manage.py run_worker` through
+# QUEUED_EMAIL_BACKEND, so a slow SMTP server never holds up a request
+EMAIL_BACKEND = "catalog.mail.QueuedEmailBackend"
+QUEUED_EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Background jobs, see catalog.jobs
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", 4))
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_BASE = 10  # seconds before the first retry, doubled for each next one
+JOB_BACKOFF_MAX = 3600
+JOB_LOCK_TIMEOUT = 600  # requeue running jobs whose worker went away
+# Whitenoise's manifest storage, plus resized AVIF/WebP copies of the images
+STATICFILES_STORAGE = "catalog.storage.ResponsiveImagesStorage"
+RESPONSIVE_IMAGES = {
+    "PATTERNS": ["images/*.jpg", "images/*.jpeg", "images/*.png"],
+    "WIDTHS": [480, 768, 1280, 1920],
+    "FORMATS": {"avif": 50, "webp": 75},  # format: encoder quality
+}
 CSRF_TRUSTED_ORIGINS = ["https://mysite.recurup.com"]
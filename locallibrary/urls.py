@@ -19,12 +19,14 @@ from django.urls import include
 from django.views.generic import RedirectView
 from django.conf.urls.static import static
 from locallibrary import settings
+from catalog.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("catalog/", include("catalog.urls")),
     path("", RedirectView.as_view(url="catalog/")),
     path("accounts/", include("django.contrib.auth.urls")),
+    path("metrics", metrics_view, name="prometheus-metrics"),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 # accounts/ login/ [name='login']